@@ -69,8 +69,31 @@ import pcs.pcap as pcap
 
 import exceptions
 import itertools
-
-# import fast
+import threading
+from copy import deepcopy
+
+import pcs.checksum as checksum
+
+# The compiled bit field codec, if it has been built.  Field falls
+# back to pure Python without it.  Set fast to None to force the pure
+# Python code.
+try:
+    import pcs.fast as fast
+except ImportError:
+    fast = None
+
+# Layouts compile the plain fields at their start into a Codec, which
+# decodes and encodes them in one go.  Set codecs to False to have every
+# field go through Field.decode and Field.encode instead.
+codecs = True
+
+# The POSIX clocks, if they have been built.  Timeouts are kept on the
+# monotonic clock when we have it, so that they do not move when the
+# time of day is set.
+try:
+    import pcs.clock as clock
+except ImportError:
+    clock = None
 
 def attribreprlist(obj, attrs):
     return map(lambda x, y = obj: '%s: %s' % (x.name, repr(getattr(y, x.name))), itertools.ifilter(lambda x, y = obj: hasattr(y, x.name), attrs))
@@ -91,6 +114,9 @@ class Field(object):
 value and can be marked as a dicriminator for higher level packet
 demultiplexing .  These classes are used by the packet to define the
 layout of the data and how it is addressed."""
+
+    __slots__ = ('packet', 'name', 'width', 'default', 'discriminator',
+                 'compare', 'value')
     
     def __init__(self, name = "", width = 1, default = None,
                  discriminator = False, compare=None):
@@ -132,9 +158,11 @@ layout of the data and how it is addressed."""
         curr - the current byte position in the bytes array
         byteBR - the number of Bits Remaining in the current byte
         """
-#         [ real_value, curr, byteBR ] = fast.decode(self.width, len(bytes), bytes, curr, byteBR)
-#         self.value = real_value
-#         return [ real_value, curr, byteBR ]
+        if fast is not None:
+            [real_value, curr, byteBR] = fast.decode(self.width, len(bytes),
+                                                     bytes, curr, byteBR)
+            self.value = real_value
+            return [real_value, curr, byteBR]
 
         real_value = 0
         fieldBR = self.width
@@ -179,7 +207,9 @@ layout of the data and how it is addressed."""
         # fieldBR is the bits remaining in the field to be encoded
         # byteBR is the bits remaining in the current byte being encoded
         
-#         return fast.encode(self.width, bytearray, value, byte, byteBR)
+        if fast is not None:
+            return fast.encode(self.width, bytearray, value, byte, byteBR)
+
         fieldBR = self.width
         while byteBR > 0:
             if fieldBR < byteBR:
@@ -227,10 +257,6 @@ layout of the data and how it is addressed."""
             (value > (2 ** self.width) - 1)):
             raise FieldBoundsError, "Value must be between 0 and %d but is %d" % ((2 ** self.width - 1), value)
 
-    def width(self):
-        """Return the width of a field."""
-        return self.width
-
     def __copy__(self):
         """Return a shallow copy of a Field; used by copy module.
            Fields may be copied, they are not immutable."""
@@ -287,6 +313,8 @@ class StringField(Field):
 default value.  The data is to be interpreted as a string, but does
 not encode the length into the packet.  Length encoded values are
 handled by the LengthValueField."""
+
+    __slots__ = ()
     
     def __init__(self, name = "", width = 1, default = None, \
                  compare = None ):
@@ -311,6 +339,18 @@ handled by the LengthValueField."""
         return "<pcs.StringField  name %s, %d bits, default %s>" % \
                (self.name, self.width, self.default)
 
+    def __deepcopy__(self, memo={}):
+        """Return a deep copy of a StringField; used by copy module.
+           StringFields cannot be discriminators, so unlike a Field
+           the copy is made without one."""
+        result = self.__class__()
+        memo[id(self)] = result
+        result.__init__(name=self.name, width=self.width, \
+                        default=self.default, compare=self.compare)
+        result.value = self.value
+        assert result.packet is None, "dangling reference to Packet"
+        return result
+
     def decode(self, bytes, curr, byteBR):
         """Decode the field and return the value as well as the new
         current position in the bytes array."""
@@ -357,6 +397,8 @@ class LengthValueField(object):
     packets.
     """
 
+    __slots__ = ('packet', 'name', 'compare', 'length', 'value', 'width')
+
     def __init__(self, name, length, value, compare=None):
         self.packet = None
         self.name = name
@@ -382,7 +424,7 @@ class LengthValueField(object):
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     def decode(self, bytes, curr, byteBR):
         """Decode a LengthValue field."""
@@ -406,7 +448,7 @@ class LengthValueField(object):
 	self.length.value = len(value)
         self.value.value = value
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     #def get_value(self):
     #    return self.value.value
@@ -450,6 +492,8 @@ class TypeValueField(object):
     """A type-value field handles parts of packets where a type
     is encoded before a value.  """
 
+    __slots__ = ('packet', 'name', 'type', 'value', 'width', 'compare')
+
     def __init__(self, name, type, value, compare=None):
         self.packet = None
         self.name = name
@@ -469,7 +513,7 @@ class TypeValueField(object):
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     def decode(self, bytes, curr, byteBR):
         [self.type.value, curr, byteBR] = self.type.decode(bytes, curr, byteBR)
@@ -523,6 +567,9 @@ class TypeLengthValueField(object):
     """A type-length-value field handles parts of packets where a type
     is encoded before a length and value.  """
 
+    __slots__ = ('packet', 'name', 'type', 'length', 'value', 'width',
+                 'inclusive', 'bytewise', 'compare')
+
     def __init__(self, name, type, length, value,
                  inclusive = True, bytewise = True, compare = None):
         self.packet = None
@@ -549,7 +596,7 @@ class TypeLengthValueField(object):
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     def decode(self, bytes, curr, byteBR):
         [self.type.value, curr, byteBR] = self.type.decode(bytes, curr, byteBR)
@@ -630,6 +677,8 @@ class TypeLengthValueField(object):
 class CompoundField(object):
     """A compound field may contain other fields."""
 
+    __slots__ = ()
+
 class OptionListError(Exception):
     """When a programmer tries to append to an option list and causes
     an error this exception is raised."""
@@ -643,13 +692,16 @@ class OptionListField(CompoundField, list):
     """A option list is a list of Fields.
        Option lists inhabit many protocols, including IP and TCP."""
 
+    __slots__ = ('_packet', 'name', 'width', '_options', 'compare',
+                 'default', 'value', 'index')
+
     def __init__(self, name, width = 0, option_list = [], compare = None):
         """Initialize an OptionListField."""
         list.__init__(self)
+        self._options = []
         self.packet = None
         self.name = name
         self.width = width
-        self._options = []
         if option_list != []:
             for option in option_list:
                 self._options.append(option)
@@ -658,6 +710,19 @@ class OptionListField(CompoundField, list):
         self.default = self
         self.value = self
         
+    def _getpacket(self):
+        return self._packet
+
+    def _setpacket(self, packet):
+        """Attach the list, and every option in it, to a packet.  The
+        options which are compound fields mark the packet for encoding
+        when they are changed, as the list does."""
+        self._packet = packet
+        for option in self._options:
+            option.packet = packet
+
+    packet = property(_getpacket, _setpacket)
+
     def __len__(self):
         return len(self._options)
     
@@ -730,6 +795,7 @@ class OptionListField(CompoundField, list):
         if (index < 0 or index > len(self._options)):
             raise IndexError, "index %d out of range" % index
         else:
+            self.changed()
             # Three part harmony
             # The caller can pass a list of (value, option) 
             if isinstance(value, list):
@@ -739,12 +805,14 @@ class OptionListField(CompoundField, list):
                     raise OptionListError, "Option must be a valid PCS Field."
                 self._options[index] = value[1]
                 self._options[index].value = value[0]
+                value[1].packet = self._packet
                 return
             # or the caller can pass a field, but we have to check the
             # underlying value
             if isinstance(value, _fieldlist):
                 value.bounds(self._options[index].value)
                 self._options[index] = value
+                value.packet = self._packet
                 return
             # of the caller can pass a value but we have to check the bounds
             self._options[index].bounds(value)
@@ -763,10 +831,18 @@ class OptionListField(CompoundField, list):
     def set_value(self, value):
         """Set the value of a field."""
         self._options = value
+        self.packet = self._packet
+        self.changed()
+
+    def changed(self):
+        """Tell the packet we are part of that it must be re-encoded."""
+        if self.packet is not None:
+            self.packet._needencode = True
 
     def __add__(self, other):
         if isinstance(other, _fieldlist):
             self._options += other
+            self.changed()
 
     def append(self, option):
         """Append an option, an option/value pair, or a value to an
@@ -779,6 +855,8 @@ class OptionListField(CompoundField, list):
         if not hasattr(self, '_options'):
             self._options = []
         self._options.append(option)
+        option.packet = self._packet
+        self.changed()
             
     def encode(self, bytearray, value, byte, byteBR):
         """Encode all the options in a list into a set of bytes"""
@@ -838,6 +916,278 @@ class OptionListField(CompoundField, list):
 # inherited from Field. User types may inherit from these types.
 _fieldlist = (Field, StringField, LengthValueField, TypeValueField, TypeLengthValueField, CompoundField)
 
+# Types whose width is always the number of bits they encode to.
+_fixedwidth = (Field, LengthValueField, TypeValueField, TypeLengthValueField)
+
+class Codec(object):
+    """A Codec is a layout compiled down to a single struct format.
+
+    Decoding a layout field by field costs several Python operations
+    per bit chunk.  A Codec walks the layout once, when it is built,
+    and turns the longest prefix of plain Fields and StringFields which
+    ends on a byte boundary into one struct.Struct plus a pair of
+    generated functions.  Runs of bit fields which together fill a
+    whole number of bytes are read as one integer and split up with
+    precomputed shifts and masks, so an IPv4 or TCP header is decoded
+    and encoded with one call each.
+
+    Fields after the compiled prefix (option lists, TLVs and anything
+    else with its own decode or encode method) are left to the per
+    field code in Packet.decode and Packet.encode.  Use Codec.compile()
+    rather than the constructor, so that layouts of the same shape
+    share one Codec.
+
+    A Codec can also patch() an existing encoding, packing only the
+    struct items which hold fields that have changed, which is what a
+    packet does when a few of its fields are set between reads of its
+    bytes."""
+
+    # Layout signature -> Codec
+    _cache = {}
+
+    def __init__(self, layout, compiled = True):
+        """Compile a layout.
+
+        layout - a list of Field objects
+        compiled - False for a Codec which leaves every field to the
+                   per field code
+        """
+        ## the names of all the fields in the layout, in order
+        self.names = [field.name for field in layout]
+        ## the number of fields in the compiled prefix
+        self.count = 0
+        ## the position of each compiled field in the layout, by name
+        self.index = {}
+
+        # Split the prefix into struct items.  Each item is a tuple of
+        # (struct code, width in bits, wide, [(index, shift, mask)]);
+        # wide items are integers that struct cannot unpack directly.
+        self.items = []
+        group = []	# bit fields which do not yet fill a whole byte
+        bits = 0
+        prefix = layout
+        if not compiled:
+            prefix = []
+        for field in prefix:
+            if type(field) is StringField and not group and \
+               (field.width % 8) == 0:
+                self._add_item([field], field.width, "%ds" % (field.width / 8))
+            elif type(field) is Field:
+                group.append(field)
+                bits += field.width
+                if (bits % 8) == 0:
+                    self._add_item(group, bits, None)
+                    group = []
+                    bits = 0
+            else:
+                break
+
+        ## the struct format of the compiled prefix
+        self.format = "!" + "".join([item[0] for item in self.items])
+        ## the size, in bytes, of the compiled prefix
+        self.size = struct.calcsize(self.format)
+        ## the struct item each compiled field is in, by position
+        self.item = []
+        ## the first and last byte, plus one, of each struct item
+        self.spans = []
+        offset = 0
+        for (k, (code, width, wide, members)) in enumerate(self.items):
+            self.spans.append((offset, offset + width / 8))
+            offset += width / 8
+            self.item.extend([k] * len(members))
+        self._projections = {}
+        self._patches = {}
+        ## decode(bytes) returns the list of values of the compiled prefix
+        self.decode = self._make_decoder(range(self.count))
+        ## encode(values) returns the bytes of the compiled prefix
+        self.encode = self._make_encoder()
+
+    def _add_item(self, fields, width, code):
+        """Add one struct item covering the given fields."""
+        wide = False
+        if code is None:
+            if width in (0, 8, 16, 32, 64):
+                code = {0: "", 8: "B", 16: "H", 32: "I", 64: "Q"}[width]
+            else:
+                # Odd sized integers travel as strings and are
+                # converted through hex, which is done in C.
+                code = "%ds" % (width / 8)
+                wide = True
+        shift = width
+        members = []
+        for field in fields:
+            if code[-1:] == "s" and not wide:
+                shift = 0
+                mask = None
+            else:
+                shift -= field.width
+                mask = (1 << field.width) - 1
+            self.index[field.name] = self.count
+            members.append((self.count, shift, mask))
+            self.count += 1
+        self.items.append((code, width, wide, members))
+
+    def _make_decoder(self, positions):
+        """Generate a function which decodes the fields at the given
+        positions, and only those, returning their values as a list in
+        the order given.
+        Items which hold none of the fields are skipped with pad bytes
+        so that the whole job is still one struct call."""
+        from binascii import hexlify
+        wanted = dict([(index, i) for (i, index) in enumerate(positions)])
+        format = "!"
+        expressions = [None] * len(positions)
+        prologue = []
+        nitems = 0
+        for (code, width, wide, members) in self.items:
+            needed = [m for m in members if m[0] in wanted]
+            if not needed:
+                format += "%dx" % (width / 8) if width else ""
+                continue
+            if code == "":
+                # Zero width fields take up no space on the wire.
+                for (index, shift, mask) in needed:
+                    expressions[wanted[index]] = "0"
+                continue
+            item = "_%d" % nitems
+            nitems += 1
+            format += code
+            if wide:
+                prologue.append("    %s = _int(_hexlify(%s), 16)\n" %
+                                (item, item))
+            for (index, shift, mask) in needed:
+                if len(members) == 1:
+                    expression = item
+                elif shift == 0:
+                    expression = "(%s & %#x)" % (item, mask)
+                else:
+                    expression = "((%s >> %d) & %#x)" % (item, shift, mask)
+                expressions[wanted[index]] = expression
+        source = "def decode(bytes):\n"
+        if nitems > 0:
+            source += "    (%s,) = _unpack_from(bytes)\n" % \
+                      ", ".join(["_%d" % i for i in xrange(nitems)])
+        source += "".join(prologue)
+        source += "    return [%s]\n" % ", ".join(expressions)
+        env = {"_unpack_from": struct.Struct(format).unpack_from,
+               "_hexlify": hexlify, "_int": int}
+        exec source in env
+        return env["decode"]
+
+    def _make_encoder(self, items = None):
+        """Generate a function which packs the values of the compiled
+        prefix, given as a list in layout order, into bytes.
+
+        items - the positions of the struct items to pack, which must
+                follow one another, or None to pack all of them"""
+        from binascii import unhexlify
+        if items is None:
+            items = range(len(self.items))
+        format = "!"
+        arguments = []
+        for k in items:
+            (code, width, wide, members) = self.items[k]
+            if code == "":
+                continue
+            format += code
+            parts = []
+            for (index, shift, mask) in members:
+                if mask is None:
+                    parts.append("v[%d]" % index)
+                elif shift == 0:
+                    parts.append("(v[%d] & %#x)" % (index, mask))
+                else:
+                    parts.append("((v[%d] & %#x) << %d)" %
+                                 (index, mask, shift))
+            if wide:
+                arguments.append("_unhexlify('%%0%dx' %% (%s))" %
+                                 (width / 4, " | ".join(parts)))
+            else:
+                arguments.append(" | ".join(parts))
+        source = "def encode(v):\n    return _pack(%s)\n" % \
+                 ", ".join(arguments)
+        env = {"_pack": struct.Struct(format).pack,
+               "_unhexlify": unhexlify}
+        exec source in env
+        return env["encode"]
+
+    def patch(self, bytes, values, positions):
+        """Return bytes, an encoding of the compiled prefix, with the
+        fields at the given positions, and any others which share a
+        struct item with them, packed afresh from values.  The rest of
+        the bytes are left as they are.
+
+        bytes - the bytes of the packet
+        values - the values of the packet's fields, in layout order
+        positions - the positions of the fields which have changed"""
+        key = frozenset(positions)
+        try:
+            runs = self._patches[key]
+        except KeyError:
+            items = sorted(set([self.item[i] for i in positions]))
+            runs = self._patches[key] = self._make_patch(items)
+        parts = []
+        last = 0
+        for (start, end, encode) in runs:
+            parts.append(bytes[last:start])
+            parts.append(encode(values))
+            last = end
+        parts.append(bytes[last:])
+        return "".join(parts)
+
+    def _make_patch(self, items):
+        """Split a sorted list of struct items into runs of neighbours
+        and return the span of each run with an encoder for it."""
+        runs = []
+        for k in items:
+            if runs and runs[-1][-1] == k - 1:
+                runs[-1].append(k)
+            else:
+                runs.append([k])
+        return [(self.spans[run[0]][0], self.spans[run[-1]][1],
+                 self._make_encoder(run)) for run in runs]
+
+    def sharing(self, positions):
+        """Return the positions of all of the fields which are packed
+        together with the fields at the given positions."""
+        result = []
+        for k in set([self.item[i] for i in positions]):
+            result.extend([index for (index, shift, mask)
+                           in self.items[k][3]])
+        return result
+
+    def project(self, names):
+        """Return a function which decodes only the named fields of the
+        compiled prefix.  Names outside the prefix are ignored.  The
+        function returns the values in the order the names were given
+        and is built once per set of names."""
+        names = tuple([name for name in names if name in self.index])
+        try:
+            return self._projections[names]
+        except KeyError:
+            decoder = self._make_decoder([self.index[name]
+                                          for name in names])
+            self._projections[names] = decoder
+            return decoder
+
+    def __repr__(self):
+        return "<pcs.Codec %d of %d fields, %d bytes, format %s>" % \
+               (self.count, len(self.names), self.size, self.format)
+
+    def compile(layout, compiled = True):
+        """Return the Codec for a layout, building it on first use.
+        Layouts are looked up by the type, width and name of every
+        field, so all packets of the same shape share one Codec."""
+        key = (compiled, tuple([(field.__class__, field.width, field.name)
+                                for field in layout]))
+        try:
+            return Codec._cache[key]
+        except KeyError:
+            codec = Codec._cache[key] = Codec(layout, compiled)
+            return codec
+
+    compile = staticmethod(compile)
+
 class LayoutDiscriminatorError(Exception):
     """When a programmer tries to set more than one field in a Layout as a 
     discriminator an error is raised."""
@@ -851,21 +1201,103 @@ class Layout(list):
     """The layout is a special attribute of a Packet which implements
     the layout of the packet on the wire.  It is actually a list of
     Fields and is implemented as a descriptor.  A layout can only be
-    set or get, but never deleted."""
+    set or get, but never deleted.
+
+    A Packet class normally declares its layout once, in the class
+    body, and every instance of the class shares it:
+
+        class udp(pcs.Packet):
+            _layout = pcs.Layout([pcs.Field("sport", 16),
+                                  pcs.Field("dport", 16),
+                                  pcs.Field("length", 16),
+                                  pcs.Field("checksum", 16)])
+
+    The Fields in the layout describe the packet, they do not hold
+    its data.  Each packet keeps its own values in a list, by field
+    position, and the Layout works out once, when it is built, where
+    each field lives, how wide the packet is, which field is the
+    discriminator and how to encode and decode the fixed part of the
+    packet.  Packets whose shape depends on their contents may still
+    pass a list of Fields to Packet.__init__(), which gives that
+    packet a layout of its own."""
 
     # No need to implement __deepcopy__, as Layout is a descriptor
     # modeled on the built-in type 'list' and will propagate deep-copies
     # to the objects it contains.
 
+    def __init__(self, fields = []):
+        """initialize a Layout
+
+        fields - the list of Fields, in the order they appear on the wire
+        """
+        list.__init__(self, fields)
+        ## set when the layout belongs to a class, rather than a packet
+        self.shared = False
+
+        ## the names of the fields, in order
+        self.names = [field.name for field in self]
+        ## the position of each field, by name
+        self.index = {}
+        ## the discriminator field, if there is one
+        self.discriminator = None
+        ## the width, in bits, of all of the fields
+        self.bitlength = 0
+        ## the offset, in bits, of each field up to the first one
+        ## whose width depends on what is in it
+        self.offsets = []
+        ## the value each field starts out with in a new packet
+        self.initial = []
+        ## the class of the view onto each field of a packet, or None
+        ## for compound fields which every packet has its own copy of
+        self.bound = []
+        ## the positions of the compound fields
+        self.compound = []
+
+        fixed = True
+        for (i, field) in enumerate(self):
+            self.index[field.name] = i
+            if getattr(field, 'discriminator', False) is True:
+                if self.discriminator is not None:
+                    raise LayoutDiscriminatorError, "Layout can only have one field marked as a discriminator, but there are at least two %s %s" % (field, self.discriminator)
+                self.discriminator = field
+            if fixed:
+                self.offsets.append(self.bitlength)
+            self.bitlength += field.width
+            if isinstance(field, Field):
+                self.initial.append(field.value)
+                self.bound.append(_bound(field.__class__))
+            else:
+                fixed = False
+                self.initial.append(None)
+                self.bound.append(None)
+                self.compound.append(i)
+        self._codec = Codec.compile(self)
+        self._plain = None
+
+    def _getcodec(self):
+        """Return the codec for the fixed prefix of the layout, or one
+        which compiles none of it when codecs are turned off."""
+        if codecs:
+            return self._codec
+        if self._plain is None:
+            self._plain = Codec.compile(self, False)
+        return self._plain
+
+    ## the codec for the fixed prefix of the layout
+    codec = property(_getcodec)
+
     def __get__(self, obj, typ=None): 
         """return the Layout"""
         ## the layout is the ordering of the fields in the packet
-        return self._layout
+        if obj is None:
+            return self
+        try:
+            return object.__getattribute__(obj, '_ilayout')
+        except AttributeError:
+            return self
 
     # Update the layout itself.  Right now this does not handle
     # removing fields or anything else but must do so in future.
-    # XXX Add code to check the type of the value, it must be a
-    # list of Field objects
 
     def __set__(self, obj, value): 
         """set the layout
@@ -873,15 +1305,243 @@ class Layout(list):
         obj - the object we are about to set
         value - the value we are setting the field to
         """
-        self._layout = value
-        for field in self._layout:
-            # This is a special case, we don't want to recurse back
-            # through the encapsulating class's __setattr__ routine.
-            # We want to set this directly in the class's dictionary
-            if not hasattr(field, 'default') or field.default is None:
-                obj.__dict__[field.name] = field.reset()
-            else:
-                obj.__dict__[field.name] = field.default
+        if not isinstance(value, Layout):
+            value = Layout(value)
+        obj._setlayout(value)
+
+class PacketMeta(type):
+    """The metaclass of Packet.
+
+    A Packet class may give its layout as a plain list of Fields, in
+    which case it is turned into a Layout.  Either way the class's
+    Layouts, including any alternates it keeps for packets of another
+    shape, are marked as shared, so that every packet gets its own copy
+    of any compound fields, such as option lists, which hold data."""
+
+    def __new__(meta, name, bases, dict):
+        layout = dict.get('_layout')
+        if isinstance(layout, list) and not isinstance(layout, Layout):
+            dict['_layout'] = Layout(layout)
+        for value in dict.itervalues():
+            if isinstance(value, Layout):
+                value.shared = True
+        return type.__new__(meta, name, bases, dict)
+
+def _fieldchanged(packet, i):
+    """Note that the plain field at position i of a packet has a new
+    value.  A field in the compiled prefix of the layout is packed on
+    its own, into the bytes the packet already has, the next time they
+    are asked for, any other field means encoding the whole packet."""
+    if i < object.__getattribute__(packet, '_ilayout').codec.count:
+        changed = object.__getattribute__(packet, '_changed')
+        if changed is None:
+            object.__setattr__(packet, '_changed', set([i]))
+        else:
+            changed.add(i)
+    else:
+        object.__setattr__(packet, '_needencode', True)
+
+def _ownvalues(packet):
+    """Return the values of a packet for writing.  A packet and its
+    clones share one list of values until one of them writes to it,
+    at which point that one gets a list of its own."""
+    values = object.__getattribute__(packet, '_values')
+    if object.__getattribute__(packet, '_shared'):
+        values = values[:]
+        object.__setattr__(packet, '_values', values)
+        object.__setattr__(packet, '_shared', False)
+    # A packet used as a pattern has its predicate made again when it
+    # is next matched, see Packet.matches().
+    object.__setattr__(packet, '_matcher', None)
+    return values
+
+def _matcher(packet):
+    """Return the predicate which matches other packets against a
+    packet, compiling it if the packet has none, see Packet.matches()."""
+    matcher = object.__getattribute__(packet, '_matcher')
+    if matcher is None:
+        matcher = packet._compile_matches()
+        object.__setattr__(packet, '_matcher', matcher)
+    return matcher
+
+def _peekfield(packet, name):
+    """Return the field called name of a packet, as _fieldnames does,
+    for reading only: compound fields come straight from its values,
+    so matching against a packet neither decodes it all nor marks it
+    for encoding."""
+    layout = object.__getattribute__(packet, '_ilayout')
+    i = layout.index[name]
+    if layout.bound[i] is None:
+        return object.__getattribute__(packet, '_values')[i]
+    return packet._field(name)
+
+def _field_bits(codec, i, value):
+    """Return (start, size, mask, bits) for a field in the compiled
+    prefix of a codec which is to hold value: taken as a big endian
+    integer, the size bytes from start have bits under mask.  Return
+    None if value does not fit the field."""
+    from binascii import hexlify
+    k = codec.item[i]
+    (code, width, wide, members) = codec.items[k]
+    for (index, shift, mask) in members:
+        if index == i:
+            break
+    if mask is None:
+        if not isinstance(value, str) or not width or \
+           len(value) != width / 8:
+            return None
+        bits = int(hexlify(value), 16)
+        mask = (1 << width) - 1
+    elif isinstance(value, (int, long)) and 0 <= value <= mask:
+        bits = value << shift
+        mask = mask << shift
+    else:
+        return None
+    return (codec.spans[k][0], width / 8, mask, bits)
+
+# Field class -> class of the views onto fields of that class
+_bound_classes = {}
+
+def _bound(cls):
+    """Return the class of views onto the fields of a packet for a
+    Field class.
+
+    A view is what a packet hands out from _fieldnames.  It looks like
+    the Field in the layout, and shares everything with it, except
+    that its value and comparison function are those of the packet
+    it came from.  A view holds nothing but the packet, the position
+    of the field and the field itself, everything else is looked up
+    in the field."""
+    try:
+        return _bound_classes[cls]
+    except KeyError:
+        pass
+
+    def getvalue(self):
+        packet = self._packet
+        if object.__getattribute__(packet, '_undecoded'):
+            packet._materialize()
+        return object.__getattribute__(packet, '_values')[self._index]
+
+    def setvalue(self, value):
+        packet = self._packet
+        undecoded = object.__getattribute__(packet, '_undecoded')
+        if undecoded:
+            undecoded.discard(self.name)
+        _ownvalues(packet)[self._index] = value
+        _fieldchanged(packet, self._index)
+
+    def getcompare(self):
+        compares = object.__getattribute__(self._packet, '_compares')
+        if compares is not None and self._index in compares:
+            return compares[self._index]
+        return self._field.compare
+
+    def setcompare(self, compare):
+        packet = self._packet
+        if object.__getattribute__(packet, '_compares') is None:
+            object.__setattr__(packet, '_compares', {})
+        object.__getattribute__(packet, '_compares')[self._index] = compare
+        object.__setattr__(packet, '_matcher', None)
+
+    def getpacket(self):
+        return self._packet
+
+    def copy(self, memo = None):
+        """Return a copy of the field, with its value, which is not
+        part of any packet."""
+        field = self._field
+        result = object.__new__(cls)
+        for name in slots:
+            if hasattr(field, name):
+                setattr(result, name, getattr(field, name))
+        if hasattr(field, '__dict__'):
+            result.__dict__.update(field.__dict__)
+        result.value = self.value
+        result.compare = self.compare
+        result.packet = None
+        return result
+
+    def delegate(name):
+        def get(self):
+            return getattr(self._field, name)
+        def set(self, value):
+            setattr(self._field, name, value)
+        return property(get, set)
+
+    # Everything else a field keeps in its slots comes from the field.
+    slots = []
+    for klass in cls.__mro__:
+        names = klass.__dict__.get('__slots__', ())
+        if isinstance(names, basestring):
+            names = (names,)
+        slots.extend([name for name in names if name not in slots and
+                      name not in ('__dict__', '__weakref__')])
+
+    members = {}
+    for name in slots:
+        members[name] = delegate(name)
+    members.update({"__slots__": ("_packet", "_index", "_field"),
+                    "value": property(getvalue, setvalue),
+                    "compare": property(getcompare, setcompare),
+                    "packet": property(getpacket),
+                    "__copy__": copy,
+                    "__deepcopy__": copy})
+    bound = _bound_classes[cls] = type("Bound" + cls.__name__, (cls,),
+                                       members)
+    return bound
+
+class FieldMap(object):
+    """The fields of a packet, by name.
+
+    This is what a packet's _fieldnames is.  Plain fields come back as
+    views, which read and write the packet's values, compound fields,
+    which every packet has its own copy of, come back as themselves."""
+
+    __slots__ = ("packet",)
+
+    def __init__(self, packet):
+        self.packet = packet
+
+    def __getitem__(self, name):
+        return self.packet._field(name)
+
+    def __setitem__(self, name, field):
+        self.packet._setfield(name, field)
+
+    def __contains__(self, name):
+        return name in self.packet._layout.index
+
+    has_key = __contains__
+
+    def __iter__(self):
+        return iter(self.packet._layout.names)
+
+    iterkeys = __iter__
+
+    def __len__(self):
+        return len(self.packet._layout)
+
+    def get(self, name, default = None):
+        if name in self.packet._layout.index:
+            return self.packet._field(name)
+        return default
+
+    def keys(self):
+        return list(self.packet._layout.names)
+
+    def values(self):
+        return [self.packet._field(name) for name in self.packet._layout.names]
+
+    def items(self):
+        return [(name, self.packet._field(name))
+                for name in self.packet._layout.names]
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
 
 class FieldError(Exception):
     """When a programmer tries to set a field that is not in the
@@ -892,7 +1552,67 @@ class FieldError(Exception):
         ## the error message passed when this error is raised
         self.message = message
         
-reserved_names = ["_layout", "_discriminator", "_map", "_head"]
+reserved_names = ["_layout", "_discriminator", "_map", "_head", "_keys"]
+
+class DecodeOptions(threading.local):
+    """The options which control how Packets decode their bytes.
+
+    By default every field of every packet is decoded as soon as the
+    packet is built.  In lazy mode a packet keeps its bytes and decodes
+    the compiled prefix of its layout one field at a time, the first
+    time each field is read, so fields nobody looks at cost nothing.
+
+    lazy - decode fields on first access rather than up front
+    fields - a dict mapping Packet classes to lists of field names;
+             the named fields are decoded together, in one struct
+             call, when a packet of that class is built, and all
+             other fields of that class are left for lazy decoding
+
+    The options are kept per thread.  Calling the module level
+    decoding object returns a context manager which changes them
+    for the duration of a with block:
+
+        with pcs.decoding(lazy=True):
+            packet = ethernet(bytes)
+    """
+
+    lazy = False
+    fields = None
+    depth = None
+    stop_at = None
+
+    def __call__(self, lazy = True, fields = None, depth = None,
+                 stop_at = None):
+        """Return a context manager which sets the decode options and
+        puts back the old ones on the way out.
+
+        depth - the number of layers to decode, counting the packet
+                being built, or None for no limit
+        stop_at - a Packet class, or tuple of classes, below which
+                  nothing is decoded
+
+        Whatever is left when either limit is reached becomes a
+        payload packet."""
+        import contextlib
+        def scope():
+            saved = self.save()
+            self.restore((lazy, fields, depth, stop_at))
+            try:
+                yield self
+            finally:
+                self.restore(saved)
+        return contextlib.contextmanager(scope)()
+
+    def save(self):
+        """Return the current options as a tuple."""
+        return (self.lazy, self.fields, self.depth, self.stop_at)
+
+    def restore(self, options):
+        """Set the options from a tuple returned by save()."""
+        (self.lazy, self.fields, self.depth, self.stop_at) = options
+
+## the decode options of the running thread
+decoding = DecodeOptions()
 
 class Packet(object):
     """A Packet is a base class for building real packets.
@@ -903,44 +1623,171 @@ class Packet(object):
        to be installed. This is to make it easy to specify match
        filters for Connector.expect().  """
 
+    __metaclass__ = PacketMeta
+
     # The layout is a list of fields without values that indicate how
     # the data in the packet is to be layed in terms of ordering and
-    # bit widths.  The update() method, below, uses this list to build
-    # the data in the packet.  The actual data is kept in
-    # auto-generated class entries that are built whenever the layout
-    # is changed.  A layout is implemented as a descriptor, above,
+    # bit widths.  The encode() method, below, uses this list to build
+    # the data in the packet.  The layout is declared once per class
+    # and the actual data is kept in each packet's _values, by field
+    # position.  A layout is implemented as a descriptor, above,
     # with only get() and set() methods and so cannot be deleted.
     # This allows the programmer to set fields in what might be
     # considered a natural way with a foo.bar = baz type of syntax.
 
+    _layout = Layout()
+
+    # The names of the fields, besides the discriminator, which tell
+    # packets of a class apart well enough for expect() to look
+    # patterns up by them, most telling first, see PatternIndex.
+
+    _keys = []
+
+    # Everything a packet holds is kept in slots, so that a packet
+    # costs no more than its values, however many of them are kept
+    # around.  Packet classes which add attributes of their own still
+    # get a __dict__ for them.
+    #
     # The bytes are the actual bytes in network byte order of a fully
-    # formed packet.  Packets are always fully formed as any setting
-    # of a packet field generates a call to the update() method.
+    # formed packet.  Setting a field, changing an option list or
+    # changing the layout marks the packet as needing to be encoded,
+    # in _needencode, and the bytes are brought up to date the next
+    # time they are asked for.  Reading a field is free, with the
+    # exception of compound fields, such as option lists, which are
+    # handed back to the caller to be changed in place and so mark
+    # the packet as well.  Plain fields in the compiled prefix of the
+    # layout are an exception, their positions are kept in _changed
+    # and only they are packed again, in place in the bytes.
+    #
+    # In lazy mode, _undecoded holds the names of the fields in the
+    # compiled prefix of the layout which have not been decoded from
+    # _bytes yet.
+    #
+    # The values of the fields are kept in _values, by position in the
+    # layout, the comparison functions which have been set on them in
+    # _compares, by position, and the views handed out by _fieldnames
+    # in _views.  A packet made by clone() shares its _values with the
+    # packet it came from, which _shared marks, until either of them
+    # sets a field.
+    #
+    # A packet which is matched against others, as a pattern, keeps
+    # the predicate matches() compiled for it in _matcher, until any of
+    # its fields or comparison functions change.
+
+    __slots__ = ('_ilayout', '_values', '_shared', '_compares', '_views',
+                 '_undecoded', '_bytes', '_needencode', '_changed',
+                 '_head', '_data', '_decap', '_discriminator_inited',
+                 '_matcher', 'timestamp', 'description')
 
-    _bytes = ""
     def getbytes(self):
         """return the bytes of the packet"""
-        if self._needencode:
+        get = object.__getattribute__
+        if get(self, '_needencode'):
             self._needencode = False
             self.encode()
-        return self._bytes
+        elif get(self, '_changed'):
+            self._patch()
+        return get(self, '_bytes')
 
     # decode must be defined before its used in the property
     # that is set below it.
     def decode(self, bytes):
         """Reset the bytes field and then update the associated
         attributes of the packet.  This method is used when a packet
-        is read in raw form."""
+        is read in raw form.
+
+        bytes - a string, or a buffer onto the bytes of an enclosing
+                packet, as handed out by decapsulate()
+
+        Only the bytes of this packet are copied out of a buffer, the
+        rest of it belongs to the packets which follow."""
         self._bytes = bytes
+        layout = self._ilayout
+        values = _ownvalues(self)
+        codec = layout.codec
+        names = layout.names
         curr = 0
         byteBR = 8
         length = len(bytes)
-        for field in self._layout:
+        # The compiled prefix of the layout is decoded in one go, as
+        # long as the bytes are long enough to hold all of it.
+        self._needencode = True
+        self._changed = None
+        start = 0
+        self._undecoded = None
+        if codec.count > 0 and length >= codec.size and decoding.lazy:
+            # Leave the prefix in the bytes, apart from any fields
+            # which the caller has asked for up front.
+            undecoded = set(names[:codec.count])
+            if decoding.fields is not None and \
+               type(self) in decoding.fields:
+                wanted = [name for name in decoding.fields[type(self)]
+                          if name in codec.index]
+                decoded = codec.project(wanted)(bytes)
+                for i in xrange(len(wanted)):
+                    values[codec.index[wanted[i]]] = decoded[i]
+                    undecoded.discard(wanted[i])
+            self._undecoded = undecoded
+            start = codec.count
+            curr = codec.size
+        elif codec.count > 0 and length >= codec.size:
+            values[0:codec.count] = codec.decode(bytes)
+            start = codec.count
+            curr = codec.size
+        for i in xrange(start, len(names)):
             if curr > length:
                 break
-            [value, curr, byteBR]  = field.decode(bytes, curr, byteBR)
+            if layout.bound[i] is None:
+                [value, curr, byteBR] = values[i].decode(bytes, curr, byteBR)
+            else:
+                [value, curr, byteBR] = self._field(names[i]).decode(bytes, curr, byteBR)
+        else:
+            # Every field came out of the bytes, so they are what we
+            # would encode, and we keep them as long as the fields
+            # are not changed.
+            if curr <= length:
+                self._bytes = bytes[0:curr]
+                self._needencode = False
+                return
+        # The fields did not fit, keep everything we were given, as a
+        # string, so that nothing holds on to an enclosing packet.
+        self._bytes = bytes[0:length]
 
     bytes = property(getbytes, decode)
+
+    def _materialize(self, names = None):
+        """Decode fields which were left in the bytes by a lazy decode.
+
+        names - the fields to decode, or None for all of them"""
+        undecoded = object.__getattribute__(self, '_undecoded')
+        values = _ownvalues(self)
+        codec = object.__getattribute__(self, '_ilayout').codec
+        if names is None:
+            names = [name for name in codec.names[:codec.count]
+                     if name in undecoded]
+        decoded = codec.project(names)(object.__getattribute__(self, '_bytes'))
+        for i in xrange(len(names)):
+            values[codec.index[names[i]]] = decoded[i]
+            undecoded.discard(names[i])
+
+    def _patch(self):
+        """Pack the fields which have changed since the bytes were last
+        brought up to date into the bytes, leaving the rest as it is."""
+        get = object.__getattribute__
+        codec = get(self, '_ilayout').codec
+        changed = get(self, '_changed')
+        object.__setattr__(self, '_changed', None)
+        undecoded = get(self, '_undecoded')
+        if undecoded:
+            # Fields packed together with a changed one are packed
+            # again too, so they have to be decoded first.
+            names = [codec.names[i] for i in codec.sharing(changed)
+                     if codec.names[i] in undecoded]
+            if names:
+                self._materialize(names)
+        object.__setattr__(self, '_bytes',
+                           codec.patch(get(self, '_bytes'),
+                                       get(self, '_values'), changed))
  
     def encode(self):
         """Update the internal bytes representing the packet.  This
@@ -955,83 +1802,195 @@ class Packet(object):
         # fieldBR is the bits remaining in the field to be encoded
         # byteBR is the bits remaining in the current byte being encoded
         #
-        
+        # The compiled prefix of the layout is packed by the Codec,
+        # only the remaining fields are encoded one at a time.
+
+        if self._undecoded:
+            self._materialize()
+        layout = self._ilayout
+        values = self._values
+        codec = layout.codec
+        count = codec.count
         byteBR = 8
         byte = 0
         bytearray = []
-        for field in self._layout:
-            value = self._fieldnames[field.name].value
-            [byte, byteBR] = field.encode(bytearray, value, byte, byteBR)
+        if count > 0:
+            bytearray.append(codec.encode(values))
+        for i in xrange(count, len(layout)):
+            if layout.bound[i] is None:
+                field = values[i]
+                [byte, byteBR] = field.encode(bytearray, field.value, byte, byteBR)
+            else:
+                [byte, byteBR] = layout[i].encode(bytearray, values[i], byte, byteBR)
 
         self._bytes = ''.join(bytearray) # Install the new value
+        self._changed = None
+
+    def encode_into(self, buf, offset = 0):
+        """Write the bytes of the packet into buf, starting at offset,
+        and return the offset just past them.
+
+        buf - a bytearray, mmap or anything else which takes slice
+              assignment, long enough to hold the packet"""
+        bytes = self.getbytes()
+        end = offset + len(bytes)
+        if offset < 0 or end > len(buf):
+            raise IndexError, "%d bytes do not fit at offset %d of a buffer of %d" % (len(bytes), offset, len(buf))
+        buf[offset:end] = bytes
+        return end
 
     def __init__(self, layout = None, bytes = None, **kv):
         """initialize a Packet object
 
-        layout - the layout of the packet, a list of Field objects
+        layout - the layout of the packet, a list of Field objects,
+                 only needed if the class does not declare a Layout or
+                 this packet's layout depends on what is in it
         bytes - if the packet is being set up now the bytes to set in it
         kv - if the packet is being set up now, the initial values of
              each named field, specified as keyword arguments. These
              are always passed as a dict from classes which inherit
              from Packet.
         """
-        # XXX
-        #self._bytes = ""
+        if layout is None:
+            layout = type(self)._layout
+        self._bytes = ""
+        self._data = None
+        self._decap = None
         self._layout = layout
-        self._fieldnames = {}
         self._head = None
-        for field in layout:
-            self._fieldnames[field.name] = field
-        self._needencode = True
-        if bytes is not None:
-            self.decode(bytes)
-
-        self._discriminator = None
         self._discriminator_inited = False
 
-        # The layout of the Packet, a list of Field objects.
-        for field in layout:
-            field.packet = self
-            if (not hasattr(field, 'discriminator')):
-                continue
-            if ((field.discriminator is True) and
-                (self._discriminator is not None)):
-                raise LayoutDiscriminatorError, "Layout can only have one field marked as a discriminator, but there are at least two %s %s" % (field, self._discriminator)
-            if (field.discriminator is True):
-                self._discriminator = field
+        if bytes is not None:
+            self.decode(bytes)
 
         # Set initial values of Fields using keyword arguments.
         # Ignore any keyword arguments which do not correspond to
         # packet fields in the Layout.
         if kv is not None:
+            index = self._ilayout.index
             for kw in kv.iteritems():
-                if kw[0] in self._fieldnames:
+                if kw[0] in index:
                     self.__setattr__(kw[0], kw[1])
 
+    def _setlayout(self, layout):
+        """Give the packet a layout and fresh values for its fields."""
+        object.__setattr__(self, '_ilayout', layout)
+        values = layout.initial[:]
+        for i in layout.compound:
+            # A class's layout is shared, so each packet gets its own
+            # copy of the compound fields, but a layout built for one
+            # packet keeps the fields it was given.
+            if layout.shared:
+                field = deepcopy(layout[i])
+            else:
+                field = layout[i]
+            values[i] = field
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_shared', False)
+        object.__setattr__(self, '_compares', None)
+        object.__setattr__(self, '_views', None)
+        object.__setattr__(self, '_undecoded', None)
+        object.__setattr__(self, '_needencode', True)
+        object.__setattr__(self, '_changed', None)
+        object.__setattr__(self, '_matcher', None)
+        for i in layout.compound:
+            values[i].packet = self
+
+    def _field(self, name):
+        """Return the field called name, a view for plain fields or the
+        field itself for compound ones.  A compound field marks the
+        packet for encoding itself when it is changed."""
+        layout = self._ilayout
+        i = layout.index[name]
+        bound = layout.bound[i]
+        if bound is None:
+            return self._values[i]
+        views = self._views
+        if views is None:
+            views = {}
+            object.__setattr__(self, '_views', views)
+        try:
+            return views[i]
+        except KeyError:
+            field = layout[i]
+            view = object.__new__(bound)
+            if hasattr(field, '__dict__'):
+                view.__dict__ = field.__dict__
+            view._packet = self
+            view._index = i
+            view._field = field
+            views[i] = view
+            return view
+
+    def _setfield(self, name, field):
+        """Replace the field called name with a copy of field, taking
+        its value and comparison function."""
+        layout = self._ilayout
+        i = layout.index[name]
+        if layout.bound[i] is None:
+            self._values[i] = field
+            field.packet = self
+            self._needencode = True
+        else:
+            view = self._field(name)
+            view.value = field.value
+            view.compare = field.compare
+
+    def _fieldmap(self):
+        """Return the fields of the packet by name."""
+        return FieldMap(self)
+
+    _fieldnames = property(_fieldmap)
+
+    def _getdiscriminator(self):
+        """Return the discriminator field of the packet's layout."""
+        return self._ilayout.discriminator
+
+    _discriminator = property(_getdiscriminator)
+
+    def _getcodec(self):
+        """Return the Codec of the packet's layout."""
+        return self._ilayout.codec
+
+    _codec = property(_getcodec)
+
     def __add__(self, layout = None):
         """add two packets together
 
         This is really an append operation, of one packet after another.
         """
-        for field in layout:
-            self._layout.append(field)
-            self._needencode = True
+        old = self._ilayout
+        values = self._values
+        compares = self._compares
+        self._layout = Layout(list(old) + list(layout))
+        # Keep what we had, the new fields start out as _setlayout()
+        # left them.
+        new = self._values
+        for i in xrange(len(old)):
+            new[i] = values[i]
+        self._compares = compares
 
     def __setattr__(self, name, value):
         """Setting the layout is a special case because of the
         ramifications this has on the packet.  Only fields represented
         in the layout may be set, no other attributes may be added"""
 
-        # Handle special fields first.
-        if name == '_fieldnames':
+        try:
+            layout = object.__getattribute__(self, '_ilayout')
+        except AttributeError:
+            object.__setattr__(self, name, value)
+            return
+        i = layout.index.get(name)
+        if i is None:
             object.__setattr__(self, name, value)
-            self._bitlength = 0
-            for field in self._layout:
-                self._bitlength += field.width
             return
 
-        if (name in self._fieldnames):
-            field = self._fieldnames[name]
+        undecoded = object.__getattribute__(self, '_undecoded')
+        if undecoded:
+            undecoded.discard(name)
+        values = _ownvalues(self)
+        if layout.bound[i] is None:
+            field = values[i]
             if hasattr(field, 'bounds'):
                 field.bounds(value)
             field.set_value(value)
@@ -1039,32 +1998,44 @@ class Packet(object):
             # install the default comparison functor.
             if field.compare is None:
                 field.compare = field.default_compare
-            # If the field we're initializing is the discriminator field,
-            # record that we have initialized it, so that the / operator
-            # will not clobber its value.
-            if self._discriminator is not None and \
-               name == self._discriminator.name:
-                self._discriminator_inited = True
-            self._needencode = True
+            object.__setattr__(self, '_needencode', True)
         else:
-            object.__setattr__(self, name, value)
+            field = layout[i]
+            field.bounds(value)
+            values[i] = value
+            compares = object.__getattribute__(self, '_compares')
+            if compares is None:
+                compares = {}
+                object.__setattr__(self, '_compares', compares)
+            if compares.get(i, field.compare) is None:
+                compares[i] = field.default_compare
+            _fieldchanged(self, i)
+        # If the field we're initializing is the discriminator field,
+        # record that we have initialized it, so that the / operator
+        # will not clobber its value.
+        if layout.discriminator is not None and \
+           name == layout.discriminator.name:
+            object.__setattr__(self, '_discriminator_inited', True)
 
     def __getattribute__(self, name):
-        """Getting an attribute means we may have extended an option.
+        """Getting a field is free.  Compound fields, such as option
+        lists, tell the packet when they are changed in place."""
 
-        If we append to an options list we have to reencode the bytes."""
-        object.__setattr__(self, '_needencode', True)
-
-        try: 
-            fieldnames = object.__getattribute__(self, '_fieldnames')
-        except:
-            return {}
-        if name in fieldnames:
-            if isinstance(fieldnames[name], Field) and not \
-                   isinstance(fieldnames[name], (LengthValueField, TypeValueField, TypeLengthValueField)):
-                return fieldnames[name].get_value()
-            else:
-                return fieldnames[name]
+        try:
+            layout = object.__getattribute__(self, '_ilayout')
+        except AttributeError:
+            return object.__getattribute__(self, name)
+        undecoded = object.__getattribute__(self, '_undecoded')
+        if undecoded:
+            # Anyone who asks for the fields themselves gets them
+            # fully decoded.
+            if name == '_fieldnames':
+                self._materialize()
+            elif name in undecoded:
+                self._materialize([name])
+        i = layout.index.get(name)
+        if i is not None:
+            return object.__getattribute__(self, '_values')[i]
 
         return object.__getattribute__(self, name)
 
@@ -1074,8 +2045,17 @@ class Packet(object):
             return False
         if (self.bytes != other.bytes):
             return False
-        for field in self._layout:
-            if self._fieldnames[field.name].value != other._fieldnames[field.name].value:
+        layout = self._ilayout
+        values = self._values
+        index = other._ilayout.index
+        for i in xrange(len(layout)):
+            name = layout.names[i]
+            if name not in index:
+                return False
+            if layout.bound[i] is None:
+                if values[i].value != other._values[index[name]].value:
+                    return False
+            elif values[i] != getattr(other, name):
                 return False
         return True
 
@@ -1088,27 +2068,195 @@ class Packet(object):
 
            Each contains a reference to a comparison function. If the
            reference is None, we assume no comparison need be performed.
-           This allows full flexibility in performing matches."""
+           This allows full flexibility in performing matches.
+
+           The comparisons are compiled into a predicate the first time
+           a packet is matched, see _compile_matches(), which is kept
+           until any of the packet's fields or comparisons change."""
+        return _matcher(self)(other)
+
+    def _compile_matches(self):
+        """Return a function which tells whether another packet matches
+        this one, as a pattern.
+
+        Plain fields in the compiled prefix of the layout which use the
+        default comparison are matched in the other packet's bytes,
+        without decoding it: the bytes under them are pulled out with
+        one struct call, whole bytes as strings and bytes which are
+        only partly compared as integers, and compared with this
+        packet's, masked where need be.  Every other field which is
+        compared, in layout order, has its comparison function called,
+        as it would be on its own.  Compound fields, such as option
+        lists, may have their comparison functions changed in place, so
+        theirs are looked up on each call.  A packet whose bytes are too
+        short to hold the compiled prefix, or whose layout is not the
+        same as this one's, down to the width of every string field, is
+        matched field by field."""
+        (mask, want, rest) = self._match_bytes()
+        layout = self._ilayout
+        codec = layout.codec
+        values = self._values
+        compares = self._compares or {}
+        env = {"_cls": self.__class__, "_self": self, "_size": codec.size,
+               "_codec": codec, "_peek": _peekfield,
+               "_slow": self._slow_matches, "_get": object.__getattribute__}
+        tests = []
+        for i in rest:
+            name = layout.names[i]
+            if layout.bound[i] is None:
+                env["_f%d" % i] = values[i]
+                tests.append("    compare = _f%d.compare\n"
+                             "    if compare is not None and not "
+                             "compare(_self, _f%d, other, "
+                             "_peek(other, %r)):\n"
+                             "        return False\n" % (i, i, name))
+                continue
+            compare = compares.get(i, layout[i].compare)
+            if compare is not Field.default_compare:
+                env["_c%d" % i] = compare
+                env["_l%d" % i] = self._field(name)
+                tests.append("    if not _c%d(_self, _l%d, other, "
+                             "_peek(other, %r)):\n"
+                             "        return False\n" % (i, i, name))
+                continue
+            value = values[i]
+            env["_v%d" % i] = value
+            tests.append("    if getattr(other, %r) != _v%d:\n"
+                         "        return False\n" % (name, i))
+
+        # Pull the bytes which are compared out of the other packet, as
+        # strings for runs of whole bytes and integers for the rest.
+        format = "!"
+        expected = []
+        partial = []
+        j = 0
+        while j < codec.size:
+            if mask[j] == 0:
+                run = j
+                while j < codec.size and mask[j] == 0:
+                    j += 1
+                format += "%dx" % (j - run)
+            elif mask[j] == 0xff:
+                run = j
+                while j < codec.size and mask[j] == 0xff:
+                    j += 1
+                format += "%ds" % (j - run)
+                expected.append("".join([chr(b) for b in want[run:j]]))
+            else:
+                format += "B"
+                partial.append((len(expected), mask[j], want[j]))
+                expected.append(want[j])
+                j += 1
+        source = "def match(other):\n" \
+                 "    if not isinstance(other, _cls):\n" \
+                 "        return False\n"
+        if expected:
+            env["_unpack_from"] = struct.Struct(format).unpack_from
+            env["_expected"] = tuple(expected)
+            # Codecs are shared by layouts of the same widths, so the
+            # bytes are only where we expect them with the same codec.
+            source += "    if _get(other, '_ilayout').codec is not _codec:\n" \
+                      "        return _slow(other)\n"
+            source += "    if _get(other, '_needencode') or " \
+                      "_get(other, '_changed'):\n" \
+                      "        bytes = other.getbytes()\n" \
+                      "    else:\n" \
+                      "        bytes = _get(other, '_bytes')\n" \
+                      "    if len(bytes) < _size:\n" \
+                      "        return _slow(other)\n"
+            if not partial:
+                source += "    if _unpack_from(bytes) != _expected:\n" \
+                          "        return False\n"
+            else:
+                names = ["_%d" % n for n in xrange(len(expected))]
+                source += "    (%s,) = _unpack_from(bytes)\n" % \
+                          ", ".join(names)
+                terms = []
+                for n in xrange(len(expected)):
+                    for (m, bmask, bwant) in partial:
+                        if m == n:
+                            terms.append("_%d & %#x != %#x" %
+                                         (n, bmask, bwant))
+                            break
+                    else:
+                        env["_e%d" % n] = expected[n]
+                        terms.append("_%d != _e%d" % (n, n))
+                source += "    if %s:\n        return False\n" % \
+                          " or ".join(terms)
+        source += "".join(tests)
+        source += "    return True\n"
+        exec source in env
+        return env["match"]
+
+    def _match_bytes(self):
+        """Return (mask, want, rest) for this packet as a pattern.
+
+        mask and want are lists of integers, one for each byte of the
+        compiled prefix of the layout.  The bits set in mask are those
+        of the plain fields which use the default comparison and whose
+        values fit them, and want holds their values.  rest lists the
+        positions of the other fields which are compared, in layout
+        order."""
+        if self._undecoded:
+            self._materialize()
+        layout = self._ilayout
+        codec = layout.codec
+        values = self._values
+        compares = self._compares or {}
+        mask = [0] * codec.size
+        want = [0] * codec.size
+        rest = []
+        for i in xrange(len(layout)):
+            if layout.bound[i] is None:
+                rest.append(i)
+                continue
+            compare = compares.get(i, layout[i].compare)
+            if compare is None:
+                continue
+            if compare is Field.default_compare and i < codec.count:
+                found = _field_bits(codec, i, values[i])
+                if found is not None:
+                    (start, size, fmask, bits) = found
+                    for j in xrange(size):
+                        down = 8 * (size - 1 - j)
+                        mask[start + j] |= (fmask >> down) & 0xff
+                        want[start + j] |= (bits >> down) & 0xff
+                    continue
+            rest.append(i)
+        return (mask, want, rest)
+
+    def _slow_matches(self, other):
+        """Match another packet field by field, as matches() does, for
+        packets whose bytes do not hold the whole compiled prefix, or
+        which have another layout."""
         if not isinstance(other, self.__class__):
-            #if __debug__:
-            #    print "Skipping match: isinstance(%s,%s) is False" % \
-            #          (type(self), type(other))
             return False
-        nocomps = True
-        for fn in self._layout:
-            f = self._fieldnames[fn.name]
-            if f.compare is None:
+        layout = self._ilayout
+        values = self._values
+        compares = self._compares
+        for i in xrange(len(layout)):
+            name = layout.names[i]
+            if layout.bound[i] is None:
+                f = values[i]
+                compare = f.compare
+            else:
+                if compares is not None and i in compares:
+                    compare = compares[i]
+                else:
+                    compare = layout[i].compare
+                f = None
+            if compare is None:
                 continue
-            nocomps = False
-            #if __debug__ and f.compare is not f.default_compare:
-            #    print "WARNING: %s.%s not using default_compare." % \
-            #          (type(self), fn.name)
-            #if __debug__ and isinstance(f, Field):
-            #    print " comparing", f.value, "with", other._fieldnames[fn.name].value
-            if not f.compare(self, f, other, other._fieldnames[fn.name]):
+            # The default comparison of plain fields only looks at
+            # their values, so there is no need to build views.
+            if compare is Field.default_compare and f is None:
+                if values[i] != getattr(other, name):
+                    return False
+                continue
+            if f is None:
+                f = self._field(name)
+            if not compare(self, f, other, _peekfield(other, name)):
                 return False
-        #if __debug__ and nocomps is True:
-        #    print "WARNING: no comparisons were made"
         return True
 
     def wildcard_mask(self, fieldnames=[], unmask=True):
@@ -1147,13 +2295,31 @@ class Packet(object):
         for field in self._layout:
             retval += "%s %s\n" % (field.name,
                                    self._fieldnames[field.name].value)
-        #for field in self._layout:
-        #    retval += "%s %s\n" % (field.name, field.value)
         return retval
 
     def __len__(self):
-        """Return the count of the number of bytes in the packet."""
-        return len(self.bytes)
+        """Return the count of the number of bytes in the packet.
+
+        The count comes from the widths of the fields, so the packet
+        is not encoded just to find out how long it is.  Option lists
+        count the widths of their options, and anything whose width
+        cannot be trusted, such as a compound option, falls back to
+        encoding the packet."""
+        if not self._needencode:
+            return len(self._bytes)
+        layout = self._ilayout
+        values = self._values
+        bits = layout.bitlength
+        for i in layout.compound:
+            field = values[i]
+            if isinstance(field, OptionListField):
+                for option in field._options:
+                    if not isinstance(option, _fixedwidth):
+                        return len(self.bytes)
+                    bits += option.width
+            elif not isinstance(field, _fixedwidth):
+                return len(self.bytes)
+        return bits / 8
 
     def __div__(self, packet):
         """/ operator: Insert a packet after this packet in a chain.
@@ -1186,28 +2352,139 @@ class Packet(object):
     def __copy__(self):
         """Return a shallow copy of a Packet; used by copy module.
            This is always implemented as a deep copy."""
-        return self.__deepcopy__()
+        return self.clone()
 
     def __deepcopy__(self, memo={}):
         """Return a deep copy of a Packet; used by copy module.
-
-           All derived classes of Packet create a new instance of Layout
-           and what it contains every time they are constructed. We need
-           to preserve that API contract down here in the lower layers;
-           and we need to return an instance of the derived class, so we
-           call its default constructor, and make a deep copy of all the
-           field values here.
-           The backing store in self.bytes is an immutable buffer
-           which is dynamically reallocated when changed, so we can
-           either copy it or forget about it."""
-        from copy import deepcopy
-        newp = self.__class__()
-        for field in newp._layout:
-            newp._fieldnames[field.name] = \
-                deepcopy(self._fieldnames[field.name], memo)
+           This is a clone() of the packet."""
+        return self.clone(memo)
+
+    def clone(self, memo = None):
+        """Return a copy of the packet, without its next packet.
+
+        The copy is made without calling the constructor of the
+        packet's class.  The plain fields of the two packets share one
+        list of values until either of them sets a field, and the
+        bytes, which are never changed in place, are shared for as
+        long as they are up to date, so cloning a packet, such as a
+        header which is used as a template, costs little more than
+        allocating it.  Compound fields, such as option lists, are
+        changed in place and so are copied straight away, and a packet
+        which has any gets a list of values of its own."""
+        get = object.__getattribute__
+        put = object.__setattr__
+        if memo is None:
+            memo = {}
+        newp = object.__new__(type(self))
         memo[id(self)] = newp
+        layout = get(self, '_ilayout')
+        values = get(self, '_values')
+        if layout.compound:
+            values = values[:]
+            for i in layout.compound:
+                field = deepcopy(values[i], memo)
+                field.packet = newp
+                values[i] = field
+            put(newp, '_shared', False)
+        else:
+            put(self, '_shared', True)
+            put(newp, '_shared', True)
+        put(newp, '_ilayout', layout)
+        put(newp, '_values', values)
+        compares = get(self, '_compares')
+        if compares is not None:
+            compares = dict(compares)
+        put(newp, '_compares', compares)
+        put(newp, '_views', None)
+        undecoded = get(self, '_undecoded')
+        if undecoded is not None:
+            undecoded = set(undecoded)
+        put(newp, '_undecoded', undecoded)
+        changed = get(self, '_changed')
+        if changed is not None:
+            changed = set(changed)
+        put(newp, '_changed', changed)
+        put(newp, '_bytes', get(self, '_bytes'))
+        put(newp, '_needencode', get(self, '_needencode'))
+        put(newp, '_head', None)
+        put(newp, '_data', None)
+        put(newp, '_decap', None)
+        put(newp, '_matcher', None)
+        put(newp, '_discriminator_inited', get(self, '_discriminator_inited'))
+        for name in ('timestamp', 'description'):
+            try:
+                put(newp, name, get(self, name))
+            except AttributeError:
+                pass
+        try:
+            attributes = get(self, '__dict__')
+        except AttributeError:
+            attributes = None
+        if attributes:
+            newp.__dict__.update(deepcopy(attributes, memo))
         return newp
 
+    # The next packet is kept in _data, and the work needed to decode
+    # it from our bytes, if that has not been done yet, in _decap.
+
+    def getdata(self):
+        """Return the next packet, decoding it on first use."""
+        decap = self._decap
+        if decap is not None:
+            (bytes, timestamp, fallback, options) = decap
+            saved = decoding.save()
+            decoding.restore(options)
+            try:
+                data = self.next(bytes, timestamp = timestamp)
+                if data is None and fallback is not None:
+                    data = fallback(bytes, timestamp = timestamp)
+            finally:
+                decoding.restore(saved)
+            self._decap = None
+            self._data = data
+        return self._data
+
+    def setdata(self, data):
+        """Set the next packet."""
+        self._decap = None
+        self._data = data
+
+    data = property(getdata, setdata)
+
+    def decapsulate(self, bytes, timestamp = None, fallback = None):
+        """Set up the next packet to be decoded from bytes, by next(),
+        the first time data is used.  If next() does not know what
+        the bytes are then fallback, a Packet class, is used instead,
+        and if there is no fallback data is None.
+
+        The bytes are best passed as a buffer onto our own, such as
+        buffer(bytes, offset), rather than a slice of them, so that
+        the rest of the packet is never copied on the way down the
+        chain.  Each packet copies out only its own header, and a
+        payload its data.  Whatever the bytes were taken from must
+        not change afterwards, which is why PcapConnector copies what
+        pcap hands it before decoding it.
+
+        The decode options in force are remembered and used for the
+        next packet.  If they limit the depth of decoding, or say to
+        stop at this packet, then the bytes become a payload packet
+        straight away."""
+        depth = decoding.depth
+        stop_at = decoding.stop_at
+        if (depth is not None and depth <= 1) or \
+           (stop_at is not None and isinstance(self, stop_at)):
+            from pcs.packets.payload import payload
+            if len(bytes) > 0:
+                self.data = payload(bytes, timestamp = timestamp)
+            else:
+                self.data = None
+            return
+        if depth is not None:
+            depth -= 1
+        self._data = None
+        self._decap = (bytes, timestamp, fallback,
+                       (decoding.lazy, decoding.fields, depth, stop_at))
+
     def chain(self):
         """Return the packet and its next packets as a chain."""
         chain = Chain([])
@@ -1233,13 +2510,17 @@ class Packet(object):
         # current packet does not contain knowledge about what comes
         # next.
 
+        # The discriminator is read as an attribute, rather than from
+        # _fieldnames, so that a lazily decoded packet only has to
+        # decode that one field.
         if ((discriminator is not None) and (self._map is not None)):
             if (discriminator in self._map):
-                return self._map[self._fieldnames[discriminator.name].value](bytes, timestamp = timestamp)
+                return self._map[getattr(self, discriminator.name)](bytes, timestamp = timestamp)
             
         if ((self._discriminator is not None) and (self._map is not None)):
-            if (self._fieldnames[self._discriminator.name].value in self._map):
-                return self._map[self._fieldnames[self._discriminator.name].value](bytes, timestamp = timestamp)
+            value = getattr(self, self._discriminator.name)
+            if (value in self._map):
+                return self._map[value](bytes, timestamp = timestamp)
         
         return None
 
@@ -1284,6 +2565,7 @@ class Packet(object):
                 field.value = i[0]
                 if field.compare is None:
                     field.compare = field.default_compare
+                self._needencode = True
                 return True
 
         return False
@@ -1301,7 +2583,7 @@ class Packet(object):
 
     def sizeof(self):
         """Return the size, in bytes, of the packet."""
-        return (self._bitlength / 8)
+        return (self._ilayout.bitlength / 8)
 
     def toXML(self):
         """Transform the Packet into XML."""
@@ -1321,14 +2603,27 @@ class Packet(object):
 
     def field(self, name):
         """Return a field by name"""
-        for field in self._layout:
-            if field.name == name:
-                return (field)
+        if name in self._ilayout.index:
+            return self._fieldnames[name]
         raise FieldError()
 
 class Chain(list):
     """A chain is simply a list of packets.  Chains are used to
-    aggregate related sub packets into one chunk for transmission."""
+    aggregate related sub packets into one chunk for transmission.
+
+    The bytes of a chain are put together from the bytes of its
+    packets when they are asked for, in one go, so building a chain
+    packet by packet costs nothing until the bytes are used.  The
+    result is kept, along with the bytes of each packet it was made
+    from, and handed out again for as long as none of the packets
+    has changed.
+
+    The position of each packet, and of the packets of each type
+    which have been looked for, are kept too, until the packets in
+    the chain change, as are the one's complement sums of the bytes
+    of each packet, so that the helpers used by calc_length() and
+    calc_checksum() do not go over the chain, or its bytes, again for
+    each layer."""
 
     def __init__(self, packets=[]):
         """initialize a Chain object
@@ -1342,7 +2637,35 @@ class Chain(list):
             #if __debug__ and p._head is not None:
             #    print "WARNING: clobbering head pointer"
             p._head = self
-        self.encode()
+        # The bytes of each packet, and of the whole chain, as they
+        # were when they were last put together.
+        self._parts = None
+        self._bytes = ""
+        # The packets, and their ids, as they were when the index was
+        # made, the index of each packet by its id and the indices of
+        # the packets of each type.
+        self._indexed = None
+        self._ids = None
+        self._index = None
+        self._types = None
+        # The bytes of each packet and their one's complement sums.
+        self._sums = None
+
+    def getbytes(self):
+        """Return the bytes of all the packets in the chain."""
+        parts = [packet.bytes for packet in self.packets]
+        last = self._parts
+        if last is not None and len(last) == len(parts):
+            for i in xrange(len(parts)):
+                if parts[i] is not last[i]:
+                    break
+            else:
+                return self._bytes
+        self._parts = parts
+        self._bytes = "".join(parts)
+        return self._bytes
+
+    bytes = property(getbytes)
 
     def __eq__(self, other):
         """test two Chain objects for equality
@@ -1393,38 +2716,48 @@ class Chain(list):
     def __copy__(self):
         """Return a shallow copy of a Chain; used by copy module.
            This is always implemented as a deep copy."""
-        return self.__deepcopy__()
+        return self.clone()
 
     def __deepcopy__(self, memo={}):
         """Return a deep copy of a Chain; used by copy module.
 
            Chain is derived from list. We can't rely on the default deepcopy
            handler for list, as it doesn't know our representation.
-
-           Chain may contain Packets, and Packets may refer back to their
-           parent Chain. Because of this, we need to make deep copies of
-           all Packets contained within a Chain to avoid clobbering
-           the contents of existing Chains, and set their head pointer
-           to point to the newly created Chain.
-
-           Also, the constructor for Chain needs a list of Packet, so we
-           pass it an empty list and then append each copied Packet to
-           its internal list."""
-        from copy import deepcopy
+           This is a clone() of the chain."""
+        return self.clone(memo)
+
+    def clone(self, memo = None):
+        """Return a copy of the chain.
+
+        Chain may contain Packets, and Packets may refer back to their
+        parent Chain, so each packet is cloned, and its head pointer
+        set to point to the new Chain.  A cloned packet shares its
+        values and bytes with the one it came from until either of
+        them is changed, so the packets which are not changed in the
+        copy cost next to nothing, as do the bytes of the copy, until
+        they change.  Packets which lead to the next packet in the
+        chain still do so in the copy."""
+        if memo is None:
+            memo = {}
         newchain = self.__class__([])
         memo[id(self)] = newchain
+        packets = newchain.packets
         for p in self.packets:
-            newp = deepcopy(p, memo)
+            newp = p.clone(memo)
             newp._head = newchain
-            newchain.packets.append(newp)
-        newchain.encode()
+            packets.append(newp)
+        get = object.__getattribute__
+        for i in xrange(len(packets) - 1):
+            if get(self.packets[i], '_data') is self.packets[i + 1]:
+                object.__setattr__(packets[i], '_data', packets[i + 1])
+        newchain._parts = self._parts
+        newchain._bytes = self._bytes
         return newchain
 
     def append(self, packet):
-        """Append a packet to a chain.  Appending a packet requires
-        that we update the bytes as well."""
+        """Append a packet to a chain.  The bytes of the chain are
+        put together again when they are next asked for."""
         self.packets.append(packet)
-        self.encode()
 
     def insert_after(self, p1, p2, rdiscriminate=True):
         """Insert a packet into a chain after a given packet instance.
@@ -1436,7 +2769,6 @@ class Chain(list):
                 if rdiscriminate is True:
                     p1.rdiscriminate(p2)
                 self.packets.insert(i, p2)
-                self.encode()
                 return True
         return False
 
@@ -1466,7 +2798,7 @@ class Chain(list):
         i = 0
         for p in self.packets:
             #print "comparing %s", type(p)
-            if not p.matches(chain.packets[i]):
+            if not _matcher(p)(chain.packets[i]):
                 return False
             i += 1
         return True
@@ -1480,50 +2812,118 @@ class Chain(list):
 
     def encode(self):
         """Encode all the packets in a chain into a set of bytes for the Chain"""
-        self.bytes = ""
+        self.getbytes()
+
+    def encode_into(self, buf, offset = 0):
+        """Write the bytes of all the packets in the chain into buf,
+        starting at offset, and return the offset just past them.
+
+        buf - a bytearray, mmap or anything else which takes slice
+              assignment, long enough to hold the chain
+
+        The bytes of the chain as a whole are never put together, so
+        a buffer may be used over and over again to send chains."""
         for packet in self.packets:
-            self.bytes += packet.bytes
+            offset = packet.encode_into(buf, offset)
+        return offset
     
     def decode(self, bytes):
         """Decode all the bytes of all the packets in a Chain into the underlying packets"""
         for packet in self.packets:
             packet.decode(packet.bytes)
 
+    def _reindex(self):
+        """Return the index of each packet in the chain by its id,
+        making it again if the packets in the chain have changed."""
+        ids = map(id, self.packets)
+        if ids != self._ids:
+            index = {}
+            for i in xrange(len(ids) - 1, -1, -1):
+                index[ids[i]] = i
+            # Keeping the packets themselves means that none of their
+            # ids can be handed to another packet while they are kept.
+            self._indexed = list(self.packets)
+            self._ids = ids
+            self._index = index
+            self._types = {}
+        return self._index
+
+    def _positions(self, ptype):
+        """Return the indices of all the packets in the chain which
+        are instances of ptype."""
+        self._reindex()
+        positions = self._types.get(ptype)
+        if positions is None:
+            positions = [i for i in xrange(len(self.packets))
+                         if isinstance(self.packets[i], ptype)]
+            self._types[ptype] = positions
+        return positions
+
     # XXX We are a model of list so if we proxy this to member
     # self.packets this can be renamed index() and go away.
     def index_of(self, packet):
         """Return the index of 'packet' in this chain."""
-        n = 0
-        for i in self.packets:
-            if i is packet:
-                pseen = True
-                break
-            n += 1
-        #print "index of %s is %d" % (type(packet), n)
-        assert pseen is True, "Chain inconsistent: packet not found"
+        n = self._reindex().get(id(packet))
+        assert n is not None, "Chain inconsistent: packet not found"
         return n
 
     def collate_following(self, packet):
         """Given a packet which is part of this chain, return a string
            containing the bytes of all packets following it in this chain.
            Helper method used by Internet transport protocols."""
-        tmpbytes = ""
         n = self.index_of(packet)
-        if n == len(self.packets)-1:
-            return tmpbytes
+        return "".join([p.getbytes() for p in self.packets[n+1:]])
+
+    def length_following(self, packet):
+        """Given a packet which is part of this chain, return the number
+           of bytes in all the packets following it in this chain, as
+           len(collate_following(packet)) would, without putting them
+           together.  Helper method used by Internet protocols."""
+        n = self.index_of(packet)
+        length = 0
         for p in self.packets[n+1:]:
-            #print "collating %s" % (type(p))
-            tmpbytes += p.getbytes()
-        return tmpbytes
+            length += len(p.getbytes())
+        return length
+
+    def sum_following(self, packet, start = 0):
+        """Given a packet which is part of this chain, return the 16 bit
+           one's complement sum, folded but not complemented, of the
+           bytes of all the packets following it in this chain, as if
+           they began start bytes into the data being summed.
+
+           The sum of each packet's bytes is only worked out again when
+           they have changed, so a checksum over a large payload costs
+           little more than one over the headers in front of it.
+           Helper method used by Internet transport protocols."""
+        n = self.index_of(packet)
+        parts = [p.getbytes() for p in self.packets]
+        last = self._sums
+        if last is None or len(last) != len(parts):
+            last = [(None, 0)] * len(parts)
+        sums = last[:n+1]
+        odd = start & 1
+        total = 0
+        for i in xrange(n + 1, len(parts)):
+            part = parts[i]
+            if last[i][0] is part:
+                partial = last[i][1]
+            else:
+                partial = checksum.wordsum(part)
+            sums.append((part, partial))
+            if odd:
+                partial = checksum.swap(partial)
+            total += partial
+            odd ^= len(part) & 1
+        self._sums = sums
+        return checksum.fold(total)
 
     def find_first_of(self, ptype):
         """Find the first packet of type 'ptype' in this chain.
            Return a tuple (packet, index)."""
-        n = 0
-        for p in self.packets:
-            if isinstance(p, ptype):
-                return (p, n)
-            n += 1
+        positions = self._positions(ptype)
+        if positions:
+            n = positions[0]
+            return (self.packets[n], n)
         return (None, None)
 
     def find_preceding(self, packet, ptype, adjacent=True):
@@ -1535,15 +2935,14 @@ class Chain(list):
            immediately preceding 'packet' must be an instance of type.
            Helper method used by Internet transport protocols."""
         n = self.index_of(packet)
-        if n == 0:
-            return (None, None)
         lower = 0
         if adjacent is True:
             lower = max(n - 2, 0)
-        for p in reversed(self.packets[lower:n]):
-            n -= 1
-            if isinstance(p, ptype):
-                return (p, n)
+        for i in reversed(self._positions(ptype)):
+            if i < n:
+                if i >= lower:
+                    return (self.packets[i], i)
+                break
         return (None, None)
 
     def calc_checksums(self):
@@ -1565,11 +2964,263 @@ class Chain(list):
             packet.calc_length()
 
     def fixup(self):
-        """Convenience method to calculate lengths, checksums, and encode."""
-        self.calc_lengths()
-        self.calc_checksums()
+        """Convenience method to calculate lengths, checksums, and encode.
+
+        This is done in one pass, from the last packet to the first,
+        each packet's lengths and then its checksum, so that when a
+        packet is fixed up the bytes of all the packets it carries are
+        already final.  Their length, and the one's complement sum of
+        their bytes, are then worked out from those of each packet,
+        which are kept by the chain, rather than by going over all of
+        the payload again for each layer."""
+        for packet in reversed(self.packets):
+            packet.calc_length()
+            packet.calc_checksum()
         self.encode()
 
+    def template(self, variables):
+        """Return a Template which builds copies of this chain with the
+        given fields changed.  See Template."""
+        return Template(self, variables)
+
+class TemplateError(Exception):
+    """When a field is given as a variable of a Template which cannot be
+    changed in the template's bytes alone this exception is raised."""
+
+    def __init__(self, message):
+        self.message = message
+    def __str__(self):
+        return repr(self.message)
+
+def _wordsum(start, end):
+    """Return a function which returns the sum, as a plain integer, of
+    the 16 bit words which bytes make up when they are found from
+    offset start to end of a packet."""
+    lead = "\0" * (start & 1)
+    trail = "\0" * ((end - start + len(lead)) & 1)
+    unpack = struct.Struct("!%dH" % ((end - start + len(lead) +
+                                      len(trail)) / 2)).unpack
+    def wordsum(bytes):
+        return sum(unpack(lead + bytes + trail))
+    return wordsum
+
+_pack16 = struct.Struct("!H").pack
+
+class Template(object):
+    """A Template builds the bytes of many packets from one chain, where
+    only a few fields, the variables, change from one packet to the
+    next.
+
+    The chain is fixed up once, when the template is made, and after
+    that each packet is made by packing the variables into a copy of
+    the chain's bytes, without any Packet objects, and adjusting any
+    Internet checksums which cover them, as RFC 1624 describes,
+    rather than computing them again.  For example:
+
+        c = ethernet(...) / ipv4(...) / icmpv4(type=8) / \
+            icmpv4echo(id=12345) / payload(payload="foobar")
+        t = c.template(["ipv4.id", "icmpv4echo.sequence"])
+        for n in xrange(count):
+            output.write(t.stamp(n, n), len(t.bytes))
+
+    A variable is either a (packet, name) pair, naming a field of one
+    of the packets of the chain, or a string such as "ipv4.dst" which
+    names a field of the first packet of that class in the chain.
+    Only fields in the compiled prefix of a packet's layout, see
+    Codec, can be variables.
+
+    When the template is made each variable is tried out on a clone of
+    the chain, which is fixed up as usual, to find which checksums
+    cover it.  A variable which changes anything else, such as a
+    length or a checksum which is not an Internet checksum, raises a
+    TemplateError."""
+
+    def __init__(self, chain, variables):
+        """initialize a Template
+
+        chain - the Chain, or the first Packet of one, to build from
+        variables - the fields which change from packet to packet
+        """
+        if isinstance(chain, Packet):
+            chain = chain.chain()
+        chain.fixup()
+        ## the chain the template was made from
+        self.chain = chain
+        ## the bytes of the chain, as they were when it was fixed up
+        self.bytes = chain.bytes
+        packets = chain.packets
+        offsets = []
+        offset = 0
+        for packet in packets:
+            offsets.append(offset)
+            offset += len(packet.bytes)
+
+        # Each struct item of a packet's Codec which holds a variable
+        # is a patch, which is packed from its own copy of the
+        # packet's values.
+        patches = {}
+        self._patches = []
+        self._variables = []
+        names = []
+        for variable in variables:
+            (n, name) = self._find(variable)
+            packet = packets[n]
+            if packet._undecoded:
+                packet._materialize()
+            codec = packet._codec
+            if name not in codec.index:
+                raise TemplateError, "%s.%s is not in the compiled prefix of its layout" % (type(packet).__name__, name)
+            i = codec.index[name]
+            k = codec.item[i]
+            if (n, k) not in patches:
+                (start, end) = codec.spans[k]
+                patches[(n, k)] = len(self._patches)
+                self._patches.append([offsets[n] + start, offsets[n] + end,
+                                      codec._make_encoder([k]),
+                                      packet._values[:], [],
+                                      _wordsum(offsets[n] + start,
+                                               offsets[n] + end)])
+            self._variables.append((patches[(n, k)], i))
+            names.append((n, name))
+
+        # The Internet checksums of the chain, by their offset.
+        checksums = []
+        for n in xrange(len(packets)):
+            codec = packets[n]._codec
+            if "checksum" not in codec.index:
+                continue
+            k = codec.item[codec.index["checksum"]]
+            if codec.items[k][1] != 16:
+                continue
+            start = offsets[n] + codec.spans[k][0]
+            if start not in [patch[0] for patch in self._patches]:
+                checksums.append(start)
+
+        # Try each variable out on a clone of the chain.
+        probes = []
+        for v in xrange(len(names)):
+            (n, name) = names[v]
+            probe = chain.clone()
+            value = self._probe(getattr(packets[n], name),
+                                packets[n]._ilayout[packets[n]._ilayout.index[name]].width)
+            setattr(probe.packets[n], name, value)
+            probe.fixup()
+            probes.append((value, probe.bytes))
+            covered = self._patches[self._variables[v][0]][4]
+            for start in checksums:
+                if probe.bytes[start:start + 2] != \
+                   self.bytes[start:start + 2] and start not in covered:
+                    covered.append(start)
+
+        # Only the checksums which cover a variable are adjusted.
+        checksums = [start for start in checksums
+                     if [patch for patch in self._patches
+                         if start in patch[4]]]
+        for patch in self._patches:
+            patch[4] = [checksums.index(start) for start in patch[4]]
+
+        # Start each checksum from its value in the chain, less the
+        # bytes of the patches it covers, so that stamp() need only
+        # add the new bytes in.
+        self._checksums = checksums
+        self._base = []
+        for c in xrange(len(checksums)):
+            start = checksums[c]
+            (value,) = struct.unpack("!H", self.bytes[start:start + 2])
+            base = 0xffff - value
+            for (pstart, pend, encode, values, covered, wordsum) \
+                    in self._patches:
+                if c in covered:
+                    base += 0xffff * 0xffff - wordsum(self.bytes[pstart:pend])
+            self._base.append(base)
+
+        # The pieces of the bytes, in order, with the patches and
+        # checksums which go between them.
+        pieces = [(patch[0], patch[1], p)
+                  for (p, patch) in enumerate(self._patches)]
+        pieces += [(start, start + 2, len(self._patches) + c)
+                   for (c, start) in enumerate(checksums)]
+        pieces.sort()
+        self._parts = []
+        self._where = [None] * len(pieces)
+        last = 0
+        for (start, end, p) in pieces:
+            self._parts.append(self.bytes[last:start])
+            self._where[p] = len(self._parts)
+            self._parts.append(None)
+            last = end
+        self._parts.append(self.bytes[last:])
+        self._cwhere = self._where[len(self._patches):]
+
+        initial = [self._patches[patch][3][i]
+                   for (patch, i) in self._variables]
+        for v in xrange(len(names)):
+            (value, bytes) = probes[v]
+            args = initial[:]
+            args[v] = value
+            if self.stamp(*args) != bytes:
+                (n, name) = names[v]
+                raise TemplateError, "%s.%s cannot be changed without changing the rest of the chain" % (type(packets[n]).__name__, name)
+
+    def _find(self, variable):
+        """Return the position in the chain of the packet a variable is
+        a field of, and the name of the field."""
+        packets = self.chain.packets
+        if isinstance(variable, basestring):
+            (kind, name) = variable.split(".", 1)
+            for n in xrange(len(packets)):
+                if type(packets[n]).__name__ == kind:
+                    return (n, name)
+            raise TemplateError, "there is no %s in the chain" % kind
+        (packet, name) = variable
+        for n in xrange(len(packets)):
+            if packets[n] is packet:
+                return (n, name)
+        raise TemplateError, "%s is not in the chain" % type(packet).__name__
+
+    def _probe(self, value, width):
+        """Return a value, other than value, for a field, which differs
+        from it in every byte."""
+        if isinstance(value, str):
+            return "".join([chr(ord(value[i]) ^ (0xc3, 0x5a)[i & 1])
+                            for i in xrange(len(value))])
+        return value ^ (int("c35a" * (width / 16 + 1) + "c3", 16) &
+                        ((1 << width) - 1))
+
+    def stamp(self, *values):
+        """Return the bytes of a packet with the variables set to the
+        values given, in the order the variables were given in.  The
+        values are packed as they are, they are not checked against
+        the widths of their fields."""
+        variables = self._variables
+        if len(values) != len(variables):
+            raise TypeError, "%d values given for %d variables" % \
+                  (len(values), len(variables))
+        patches = self._patches
+        for v in xrange(len(values)):
+            (p, i) = variables[v]
+            patches[p][3][i] = values[v]
+        sums = self._base[:]
+        parts = self._parts[:]
+        where = self._where
+        for p in xrange(len(patches)):
+            (start, end, encode, fields, covered, wordsum) = patches[p]
+            bytes = parts[where[p]] = encode(fields)
+            if covered:
+                total = wordsum(bytes)
+                for c in covered:
+                    sums[c] += total
+        where = self._cwhere
+        for c in xrange(len(sums)):
+            parts[where[c]] = _pack16(0xffff - (sums[c] % 0xffff or 0xffff))
+        return "".join(parts)
+
+    def stamp_many(self, rows):
+        """Return a list of the bytes of many packets, one for each
+        sequence of values in rows."""
+        stamp = self.stamp
+        return [stamp(*row) for row in rows]
+
 class ConnNotImpError(Exception):
     """Calling a method that is not implemented raises this exception.
 
@@ -1621,6 +3272,175 @@ class LIMIT(object):
     def __init__(self):
         pass
 
+class PatternIndex(object):
+    """An index of the patterns given to Connector.expect(), which
+    hands back the patterns a chain may match without trying each of
+    them in turn.
+
+    Each Chain pattern is keyed on one field which it must match
+    exactly: the first of the fields named in _keys, or else the
+    discriminator, of its innermost packet which has one, working
+    outwards, whose field is plain and uses the default comparison.
+    The patterns keyed on the same field, of the same class of packet
+    at the same place in the chain, are kept together, by value.  A
+    chain is only tried against the patterns whose key it has, and
+    those which have no key at all, in the order they were given."""
+
+    def __init__(self, patterns):
+        """initialize an index of a list of patterns"""
+        self.patterns = patterns
+        # (position, class, name) -> {value: [index, ...]}
+        self.keys = {}
+        # the indices of Chain patterns without a key
+        self.rest = []
+        for i in xrange(len(patterns)):
+            pattern = patterns[i]
+            if not isinstance(pattern, Chain):
+                continue
+            key = self.key(pattern)
+            if key is None:
+                self.rest.append(i)
+            else:
+                (where, value) = key
+                self.keys.setdefault(where, {}).setdefault(value,
+                                                           []).append(i)
+        self.keys = self.keys.items()
+
+    def key(self, pattern):
+        """Return ((position, class, name), value) for the field a
+        Chain pattern is keyed on, or None if it has none."""
+        for position in xrange(len(pattern.packets) - 1, -1, -1):
+            packet = pattern.packets[position]
+            if packet._undecoded:
+                packet._materialize()
+            layout = packet._ilayout
+            names = list(type(packet)._keys)
+            if layout.discriminator is not None:
+                names.append(layout.discriminator.name)
+            compares = packet._compares or {}
+            for name in names:
+                i = layout.index.get(name)
+                if i is None or layout.bound[i] is None:
+                    continue
+                if compares.get(i, layout[i].compare) is not \
+                   Field.default_compare:
+                    continue
+                value = packet._values[i]
+                if isinstance(value, (int, long)):
+                    return ((position, type(packet), name), value)
+        return None
+
+    def candidates(self, chain):
+        """Return the indices of the patterns chain may match, in the
+        order the patterns were given."""
+        found = self.rest
+        packets = chain.packets
+        sort = False
+        for ((position, cls, name), values) in self.keys:
+            if position >= len(packets):
+                continue
+            packet = packets[position]
+            if not isinstance(packet, cls):
+                continue
+            indices = values.get(getattr(packet, name))
+            if indices is None:
+                continue
+            if found:
+                found = found + indices
+                sort = True
+            else:
+                found = indices
+        if sort:
+            found = sorted(found)
+        return found
+
+    def match(self, chain):
+        """Return the index of the first pattern which matches chain,
+        or None if none of them does."""
+        patterns = self.patterns
+        for i in self.candidates(chain):
+            if patterns[i].matches(chain):
+                return i
+        return None
+
+def monotonic():
+    """Return the time in seconds on the monotonic clock, or on the
+    time of day clock if pcs.clock has not been built."""
+    if clock is not None:
+        now = clock.gettime(clock.CLOCK_MONOTONIC)
+        if now is not None:
+            return now
+    from time import time
+    return time()
+
+def _asyncio():
+    """Return the asyncio module, or trollius, its back port to
+    Python 2.  Nothing else needs them, so they are only imported when
+    a Connector is used from an event loop."""
+    try:
+        import asyncio
+    except ImportError:
+        import trollius as asyncio
+    return asyncio
+
+def _try(call, *args):
+    """Return call(*args), or None if the socket call would have
+    blocked."""
+    from errno import EAGAIN, EWOULDBLOCK
+    try:
+        return call(*args)
+    except error, e:
+        if e.args[0] in (EAGAIN, EWOULDBLOCK):
+            return None
+        raise
+
+class Poller(object):
+    """A set of file descriptors to wait on for reads.
+
+    The descriptors stay registered from one wait to the next, with
+    poll() where the system has it, rather than being handed to
+    select() every time.  epoll() is not used because it will not
+    take the regular files that pcap savefiles are read from."""
+
+    def __init__(self):
+        import select
+        self.fds = []
+        if hasattr(select, "poll"):
+            self._poll = select.poll()
+        else:
+            self._poll = None
+
+    def register(self, fd):
+        """Wait for reads on fd as well."""
+        if fd in self.fds:
+            return
+        if self._poll is not None:
+            from select import POLLIN, POLLPRI
+            self._poll.register(fd, POLLIN | POLLPRI)
+        self.fds.append(fd)
+
+    def unregister(self, fd):
+        """Stop waiting for reads on fd."""
+        if self._poll is not None:
+            self._poll.unregister(fd)
+        self.fds.remove(fd)
+
+    def wait(self, timeout=None):
+        """Wait until some of the file descriptors may be read, for
+        at most timeout seconds, or for ever if timeout is None.
+        Return the list of them, which is empty on a timeout.  A file
+        descriptor with an error or hang up to report counts as one
+        which may be read, so that the read will report it."""
+        if self._poll is None:
+            from select import select
+            return select(self.fds, [], [], timeout)[0]
+        if timeout is not None:
+            # poll() counts whole milliseconds, round up so that we
+            # never wake up before the timeout.
+            from math import ceil
+            timeout = max(int(ceil(timeout * 1000)), 0)
+        return [fd for (fd, event) in self._poll.poll(timeout)]
+
 class Connector(object):
     """Connectors are a way of have a very generic socket like
     mechanism over which the packets can be sent.  Unlike the current
@@ -1632,6 +3452,11 @@ class Connector(object):
     The Connector class is a virtual base class upon which all the
     real classes are based."""
 
+    # the Poller for poll_read(), made on first use
+    poller = None
+    # the steps of the Futures waiting to read, and to write, see _async()
+    waiting = None
+
     def __init__(self):
         self.matches = None
         self.match_index = None
@@ -1658,6 +3483,16 @@ class Connector(object):
            Return TIMEOUT if the timeout was reached."""
         raise ConnNotImpError, "Cannot use base class"
 
+    def _poll_read(self, fd, timeout):
+        """Wait for a read on fd, which stays registered with
+           the poller between calls, for poll_read()."""
+        if self.poller is None:
+            self.poller = Poller()
+            self.poller.register(fd)
+        if not self.poller.wait(timeout):
+            return TIMEOUT()
+        return None
+
     def read_packet(self):
         """Read a packet from the underlying I/O layer, and return
            an instance of a class derived from pcs.Packet appropriate
@@ -1696,6 +3531,155 @@ class Connector(object):
     def write(self):
         raise ConnNotImpError, "Cannot use base class"
 
+    def selectable_fd(self):
+        """Return the file descriptor which an event loop waits on
+           for reads and writes."""
+        raise ConnNotImpError, "Cannot use base class"
+
+    # The asynchronous counterparts of the calls above.  Each returns
+    # an asyncio Future for what its counterpart returns, and never
+    # blocks, so that many conversations can be held at once from one
+    # event loop.  loop is the event loop to use, by default the
+    # current one.  Connectors which can be used like this provide
+    # _try_read_packet(), and may provide _try_read_n_chains() and
+    # _try_write(), which do what their counterparts do but return
+    # None rather than block.
+
+    def read_packet_async(self, loop=None):
+        """Return a Future for the next packet, see read_packet()."""
+        return self._async(self._try_read_packet, loop)
+
+    def read_chain_async(self, loop=None):
+        """Return a Future for the next packet chain, see
+           read_chain()."""
+        def attempt():
+            p = self._try_read_packet()
+            if p is None:
+                return None
+            return p.chain()
+        return self._async(attempt, loop)
+
+    def try_read_n_chains_async(self, n, loop=None):
+        """Return a Future for at least one, and at most n, packet
+           chains, see try_read_n_chains()."""
+        def attempt():
+            return self._try_read_n_chains(n) or None
+        return self._async(attempt, loop)
+
+    def write_async(self, *args, **kwargs):
+        """Return a Future for the result of write(), which is given
+           the same arguments, and the event loop as loop.  A socket
+           is written to as send() does it, and the result is the
+           number of bytes which were sent."""
+        loop = kwargs.pop('loop', None)
+        def attempt():
+            return self._try_write(*args, **kwargs)
+        return self._async(attempt, loop, True)
+
+    def expect_async(self, patterns=[], timeout=None, limit=None,
+                     loop=None):
+        """Return a Future for the index of the first pattern to
+           match, see expect().  The matches property is set when it
+           is done.  An exception which expect() would raise is set
+           on the Future instead."""
+        if loop is None:
+            loop = _asyncio().get_event_loop()
+        index = PatternIndex(patterns)
+        remaining = [limit]
+        def attempt():
+            chains = self._try_read_n_chains(remaining[0])
+            if not chains:
+                return None
+            (match_index, remaining[0]) = \
+                self._expect_chains(patterns, index, chains, remaining[0])
+            if match_index is None and limit is not None and \
+               remaining[0] == 0:
+                return self._expect_event(patterns, LIMIT,
+                                          LimitReachedError)
+            return match_index
+        self.matches = None
+        self.match_index = None
+        future = self._async(attempt, loop)
+        if timeout is not None and not future.done():
+            def expire():
+                if future.done():
+                    return
+                try:
+                    future.set_result(self._expect_event(patterns, TIMEOUT,
+                                                         TimeoutError))
+                except TimeoutError, e:
+                    future.set_exception(e)
+            timer = loop.call_later(timeout, expire)
+            future.add_done_callback(lambda f: timer.cancel())
+        return future
+
+    def _try_read_packet(self):
+        raise ConnNotImpError, "Cannot use base class"
+
+    def _try_read_n_chains(self, n):
+        """Read at most n packet chains without blocking, as
+           try_read_n_chains() does."""
+        result = []
+        if n is None or n == 0:
+            n = 1
+        for i in xrange(n):
+            p = self._try_read_packet()
+            if p is None:
+                break
+            result.append(p.chain())
+        return result
+
+    def _try_write(self, *args, **kwargs):
+        return self.write(*args, **kwargs)
+
+    def _async(self, attempt, loop=None, write=False):
+        """Return a Future for the result of attempt(), which must
+           not block, and must return None until it has a result.
+           It is tried at once, and then each time the event loop finds
+           the connector ready to read, or to write if write is set,
+           until it returns something else or raises an exception.
+           The Futures waiting on the connector are tried in the order
+           they were made, so that the packets which are read go to
+           the oldest of them first."""
+        asyncio = _asyncio()
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        future = asyncio.Future(loop=loop)
+        def step():
+            if future.done():
+                return
+            try:
+                result = attempt()
+            except Exception, e:
+                future.set_exception(e)
+                return
+            if result is not None:
+                future.set_result(result)
+        step()
+        if future.done():
+            return future
+
+        if self.waiting is None:
+            self.waiting = ([], [])
+        steps = self.waiting[write]
+        fd = self.selectable_fd()
+        if write:
+            (add, remove) = (loop.add_writer, loop.remove_writer)
+        else:
+            (add, remove) = (loop.add_reader, loop.remove_reader)
+        def ready():
+            for s in list(steps):
+                s()
+        def done(f):
+            steps.remove(step)
+            if not steps:
+                remove(fd)
+        if not steps:
+            add(fd, ready)
+        steps.append(step)
+        future.add_done_callback(done)
+        return future
+
     def send(self):
         raise ConnNotImpError, "Cannot use base class"
 
@@ -1735,46 +3719,30 @@ class Connector(object):
               was not encountered, this function may potentially block forever.
             * NOTE: Packets can no longer be specified on their own as filters.
 
-           TODO: Make this drift and jitter robust (CLOCK_MONOTONIC)."""
-        from time import time
-        start = time()
-        then = start
-        remaining = limit
+           The timeout is kept on the monotonic clock, see monotonic()."""
+        if timeout is not None:
+            deadline = monotonic() + timeout
         delta = timeout
+        remaining = limit
         self.matches = None
         self.match_index = None
+        index = PatternIndex(patterns)
         while True:
             result = self.poll_read(delta)
 
-            # Compute the wait quantum for the next read attempt.
-            if timeout is not None:
-                now = time()
-                delta = now - then
-                then = now
-
             # Check if the user tried to match exceptional conditions
             # as patterns. We need to check for timer expiry upfront.
-            length = len(patterns)
-            if timeout is not None and (now - start) > timeout:
-                for i in xrange(length):
-                    if isinstance(patterns[i], TIMEOUT):
-                        self.matches = [patterns[i]]
-                        self.match_index = i
-                        return i
-                raise TimeoutError
+            if timeout is not None:
+                delta = deadline - monotonic()
+            if timeout is not None and delta <= 0:
+                return self._expect_event(patterns, TIMEOUT, TimeoutError)
 
             if isinstance(result, TIMEOUT):
-                if delta > 0:
-                    #print "woken up early"
-                    continue
+                #print "woken up early"
+                continue
 
             if isinstance(result, EOF):
-                for i in xrange(length):
-                    if isinstance(patterns[i], EOF):
-                        self.matches = [patterns[i]]
-                        self.match_index = i
-                        return i
-                raise EOFError
+                return self._expect_event(patterns, EOF, EOFError)
 
             # Try to read as many pending packet chains as we can; some
             # Connectors override this as their I/O layers expect to return
@@ -1782,64 +3750,146 @@ class Connector(object):
             # a race with the ring buffer (e.g. pcap_dispatch()).
             chains = self.try_read_n_chains(remaining)
 
-            next_chain = 0
-            matches = []
-            match_index = None
-
-            # Check for a first match in the filter list.
-            # If we exceed the remaining packet count, break.
-            for i in xrange(len(chains)):
-                c = chains[i]
-                #print "expect() firstpass: saw", str(type(c.packets[2]))[:-2].split('.')[-1]
-                if limit is not None:
-                    remaining -= 1
-                for j in xrange(length):
-                    filter = patterns[j]
-                    if isinstance(filter, Chain) and filter.matches(c):
-                        #print "matched at index", i
-                        #print "appending ip proto ", c.packets[1].protocol, \
-                        #   "with type ", type(c.packets[2]), "as match"
-                        matches.append(c)
-                        match_index = j
-                        next_chain = i+1
-                        break
-                # We need to break out of the outer loop too if we match.
-                if match_index is not None or \
-                   limit is not None and remaining == 0:
-                    break
-
-            # If one of our filters matched, try to match all the other
-            # packets we got in a batch from a possibly live capture.
+            (match_index, remaining) = self._expect_chains(patterns, index,
+                                                           chains, remaining)
             if match_index is not None:
-                filter = patterns[match_index]
-                #print "scanning", next_chain, "to", len(chains)
-                for i in xrange(next_chain, len(chains)):
-                    c = chains[i]
-                    #print "expect() lastpass: saw", str(type(c.packets[2]))[:-2].split('.')[-1]
-                    if isinstance(filter, Chain) and filter.matches(c):
-                        #print "matched at index", i
-                        #print "appending ip proto ", c.packets[1].protocol, \
-                        #   "with type ", type(c.packets[2]), "as match"
-                        matches.append(c)
-
-                self.matches = matches
-                self.match_index = match_index
                 return match_index
 
             # If we never got a match, and we reached our limit,
             # return an error.
             if limit is not None and remaining == 0:
-                for i in xrange(length):
-                    if isinstance(patterns[i], LIMIT):
-                        self.matches = [patterns[i]]
-                        self.match_index = i
-                        return i
-                raise LimitReachedError
+                return self._expect_event(patterns, LIMIT,
+                                          LimitReachedError)
 
             #print "next expect() iteration"
 
         return None
 
+    def _expect_event(self, patterns, event, error):
+        """Match the first pattern of class event, one of EOF, LIMIT
+           or TIMEOUT, for expect(); raise error if there is none."""
+        for i in xrange(len(patterns)):
+            if isinstance(patterns[i], event):
+                self.matches = [patterns[i]]
+                self.match_index = i
+                return i
+        raise error
+
+    def _expect_chains(self, patterns, index, chains, remaining):
+        """Look for the first of chains to match one of patterns, whose
+           PatternIndex is index, for expect().  Count the chains looked
+           at off remaining, unless it is None, and stop when it gets
+           to 0.  Return the index of the pattern which matched, or
+           None, and what is left of remaining."""
+        next_chain = 0
+        matches = []
+        match_index = None
+
+        # Check for a first match in the filter list.
+        # If we exceed the remaining packet count, break.
+        for i in xrange(len(chains)):
+            c = chains[i]
+            #print "expect() firstpass: saw", str(type(c.packets[2]))[:-2].split('.')[-1]
+            if remaining is not None:
+                remaining -= 1
+            j = index.match(c)
+            if j is not None:
+                #print "matched at index", i
+                matches.append(c)
+                match_index = j
+                next_chain = i+1
+            # We need to break out of the outer loop too if we match.
+            if match_index is not None or \
+               remaining is not None and remaining == 0:
+                break
+
+        # If one of our filters matched, try to match all the other
+        # packets we got in a batch from a possibly live capture.
+        if match_index is not None:
+            filter = patterns[match_index]
+            #print "scanning", next_chain, "to", len(chains)
+            for i in xrange(next_chain, len(chains)):
+                c = chains[i]
+                #print "expect() lastpass: saw", str(type(c.packets[2]))[:-2].split('.')[-1]
+                if isinstance(filter, Chain) and filter.matches(c):
+                    #print "matched at index", i
+                    #print "appending ip proto ", c.packets[1].protocol, \
+                    #   "with type ", type(c.packets[2]), "as match"
+                    matches.append(c)
+
+            self.matches = matches
+            self.match_index = match_index
+        return (match_index, remaining)
+
+def expect_any(connectors, patterns=[], timeout=None, limit=None):
+    """Read from all of connectors at once, as Connector.expect() reads
+    from one, and return (connector, index) for the first connector to
+    read a chain which matches one of patterns, and the index of the
+    pattern.  The matches property of that connector holds the chains
+    which matched.
+
+    The connectors are waited on together, with their file
+    descriptors registered in one Poller, and all the chains which are
+    ready on a connector are read at once.  limit counts the packets
+    read from all of them.  When a TIMEOUT or LIMIT pattern matches,
+    connector is None; if there is no such pattern, TimeoutError or
+    LimitReachedError is raised as expect() raises it.  The
+    PcapConnectors among connectors which have offload set filter with
+    BPF while this runs, as they do in expect()."""
+    poller = Poller()
+    ready = {}
+    for c in connectors:
+        fd = c.selectable_fd()
+        poller.register(fd)
+        ready[fd] = c
+        c.matches = None
+        c.match_index = None
+    if timeout is not None:
+        deadline = monotonic() + timeout
+    delta = timeout
+    remaining = limit
+    index = PatternIndex(patterns)
+    pcaps = [c for c in connectors if isinstance(c, PcapConnector)]
+    blocking = [c for c in pcaps if not c.is_nonblocking]
+    offloaded = [c for c in pcaps
+                 if c.offload and c._offload(patterns) is not None]
+    try:
+        while True:
+            fds = poller.wait(delta)
+
+            if timeout is not None:
+                delta = deadline - monotonic()
+            if timeout is not None and delta <= 0:
+                event = TIMEOUT
+                break
+
+            for fd in fds:
+                c = ready[fd]
+                chains = c._try_read_n_chains(remaining)
+                (match_index, remaining) = c._expect_chains(patterns, index,
+                                                            chains, remaining)
+                if match_index is not None:
+                    return (c, match_index)
+                if limit is not None and remaining == 0:
+                    break
+            if limit is not None and remaining == 0:
+                event = LIMIT
+                break
+    finally:
+        for c in offloaded:
+            c._restore()
+        for c in blocking:
+            if c.is_nonblocking:
+                c.file.setnonblock(False)
+                c.is_nonblocking = False
+
+    for i in xrange(len(patterns)):
+        if isinstance(patterns[i], event):
+            return (None, i)
+    if event is TIMEOUT:
+        raise TimeoutError
+    raise LimitReachedError
+
 class PcapConnector(Connector):
     """A connector for protocol capture and injection using the pcap library
 
@@ -1852,15 +3902,35 @@ class PcapConnector(Connector):
     """
 
     def __init__(self, name=None, snaplen=65535, promisc=True, \
-                 timeout_ms=500):
+                 timeout_ms=500, lazy=False, verify=False):
         """initialize a PcapConnector object
 
         name - the name of a file or network interface to open
         snaplen   - maximum number of bytes to capture for each packet
         promisc   - boolean to specify promiscuous mode sniffing
         timeout_ms - read timeout in milliseconds
+        lazy - decode the fields of each packet only when they are used
+        verify - check the checksums of every packet read, see
+                 pcs.checksum.verify()
+
+        When verify is set, bad holds the packets with bad checksums
+        among those read last, which is empty if they were all right,
+        and corrupt counts the packets read so far which had any.
+
+        expect() filters with BPF while it runs if offload is set,
+        see expect().
         """
         super(PcapConnector, self).__init__()
+        self.lazy = lazy
+        self.fields = None
+        self.verify = verify
+        self.bad = []
+        self.corrupt = 0
+        self.snaplen = snaplen
+        self.offload = False
+        # the BPF program last set with set_bpf_program(), if it is
+        # the filter, rather than an expression given to setfilter()
+        self.program = None
         try:
             self.file = pcap.pcap(name, snaplen, promisc, timeout_ms)
         except:
@@ -1868,7 +3938,6 @@ class PcapConnector(Connector):
 
         # Grab the underlying pcap objects members for convenience
         self.dloff = self.file.dloff
-        self.setfilter = self.file.setfilter
         self.dlink = self.file.datalink()
 
         # Default to blocking I/O.
@@ -1880,83 +3949,261 @@ class PcapConnector(Connector):
 
         returns the packet as a bytearray
         """
-        return self.file.next()[1]
+        return self.next()[1]
 
     def next(self):
-        """return a packet with its timestamp"""
-        return self.file.next()
+        """return a packet with its timestamp
+
+        pcap hands us a buffer onto memory which it reuses for the
+        next packet, so this is where the packet is copied, once,
+        into a string.  Everything after this works on the string."""
+        packet = self.file.next()
+        if packet is None:
+            return None
+        return (packet[0], str(packet[1]))
 
     def recv(self):
         """recv a packet from a pcap file or interface"""
-        return self.file.next()[1]
+        return self.next()[1]
     
     def recvfrom(self):
         """recvfrom a packet from a pcap file or interface"""
-        return self.file.next()[1]
+        return self.next()[1]
 
     def setdirection(self, inout):
         """Set the pcap direction."""
         return self.file.setdirection(inout)
 
+    def project(self, fields):
+        """Only materialize the given fields of the packets we read.
+
+        fields - a dict mapping Packet classes to lists of field names,
+                 or None to go back to decoding everything
+
+        Packets are decoded lazily while a projection is in place.  The
+        named fields are decoded up front and anything else is only
+        decoded if it is used, for example:
+
+            pcap.project({ipv4: ['src', 'dst'], tcp: ['sport', 'dport']})
+        """
+        if fields is not None:
+            for cls in fields.iterkeys():
+                if not issubclass(cls, Packet):
+                    raise TypeError, "%s is not a Packet class" % cls
+            fields = dict([(cls, list(names))
+                           for (cls, names) in fields.iteritems()])
+        self.fields = fields
+
     def poll_read(self, timeout=None):
         """Poll the underlying I/O layer for a read.
            Return TIMEOUT if the timeout was reached."""
-        from select import select
-        fd = self.file.fileno()
-        # Switch to non-blocking mode if entered without.
+        return self._poll_read(self.file.fileno(), timeout)
+
+    def read_packet(self, decode_depth=None, stop_at=None):
+        """read a packet from a pcap file or interface and decode it
+
+        decode_depth - the number of layers to decode, counting the
+                       link layer, or None to decode them all
+        stop_at - a Packet class, or tuple of classes, below which
+                  nothing is decoded
+
+        Layers are only decoded when they are first used, the limits
+        make sure that layers we do not want are never decoded at all.
+        Anything below the last layer decoded is left as a payload.
+        """
+        return self._read_packet(self.next(), decode_depth, stop_at)
+
+    def _read_packet(self, next, decode_depth=None, stop_at=None):
+        """Decode a packet as read_packet() does, from a (timestamp,
+        bytes) tuple given by next()."""
+        (timestamp, bytes) = next
+        packet = self.unpack(bytes, self.dlink, self.dloff, timestamp,
+                             decode_depth, stop_at)
+        if self.verify:
+            self.bad = []
+            self.check(packet.chain(), bytes)
+        return packet
+
+    def selectable_fd(self):
+        return self.file.fileno()
+
+    # The asynchronous calls of Connector put the pcap handle in
+    # non-blocking mode, and leave it there, so that they never block
+    # the event loop.
+
+    def _try_read_packet(self):
+        self._nonblock()
+        next = self.next()
+        if next is None:
+            return None
+        return self._read_packet(next)
+
+    def _try_read_n_chains(self, n):
+        self._nonblock()
+        return self.try_read_n_chains(n)
+
+    def _nonblock(self):
         if not self.is_nonblocking:
             self.file.setnonblock(True)
-        result = select([fd],[],[], timeout)
-        # Restore non-blocking mode if entered without.
-        if not self.is_nonblocking:
-            self.file.setnonblock(False)
-        if not fd in result[0]:
-            return TIMEOUT()
-        return None
-
-    def read_packet(self):
-        (timestamp, packet) = self.file.next()
-        return self.unpack(packet, self.dlink, self.dloff, timestamp)
+            self.is_nonblocking = True
 
-    def readpkt(self):
+    def readpkt(self, decode_depth=None, stop_at=None):
         # XXX legacy name.
-        return self.read_packet()
+        return self.read_packet(decode_depth, stop_at)
 
-    def try_read_n_chains(self, n):
+    def read_columns(self, count=-1):
+        """Read packets from a pcap file or interface and decode them,
+        layer by layer, into NumPy arrays, one per Packet class.
+
+        count - the number of packets to read, or -1 to read until
+                there are no more
+
+        This needs NumPy.  See pcs.columns."""
+        import packets.ethernet
+        import packets.localhost
+        from pcs.columns import decode
+
+        if self.dlink == pcap.DLT_EN10MB:
+            first = packets.ethernet.ethernet
+        elif self.dlink == pcap.DLT_NULL:
+            first = packets.localhost.localhost
+        elif self.dlink == pcap.DLT_RAW:
+            first = packets.ipv4.ipv4
+        else:
+            raise UnpackError, "Could not interpret packet"
+        result = []
+        while count != 0:
+            packet = self.next()
+            if packet is None:
+                break
+            result.append(packet)
+            count -= 1
+        return decode(result, first)
+
+    def try_read_n_chains(self, n, decode_depth=None, stop_at=None):
         """Try to read at most n packet chains from the pcap session.
            Used by Connector.expect() to do the right thing with
-           buffering live captures."""
+           buffering live captures.  The decode_depth and stop_at
+           arguments are as for read_packet()."""
         if n is None or n == 0:
             n = -1	# pcap: process all of the buffer in a live capture
         result = []	# list of chain
         ltp = []	# list of tuple (ts, packet)
         def handler(ts, p, *args):
             ltp = args[0]
-            ltp.append((ts, p))
+            ltp.append((ts, str(p)))
         self.file.dispatch(n, handler, ltp)
         #print "PcapConnector.try_read_n_chains() read ", len(ltp)
+        if self.verify:
+            self.bad = []
         for tp in ltp:
-            p = self.unpack(tp[1], self.dlink, self.dloff, tp[0])
+            p = self.unpack(tp[1], self.dlink, self.dloff, tp[0],
+                            decode_depth, stop_at)
             c = p.chain()
+            if self.verify:
+                self.check(c, tp[1])
             result.append(c)
         return result
 
+    def check(self, chain, bytes):
+        """Check the checksums of a chain which has been read from
+        bytes, adding any packets whose checksums are wrong to bad."""
+        bad = checksum.verify(chain, bytes)
+        if bad:
+            self.bad.extend(bad)
+            self.corrupt += 1
+
     def expect(self, patterns=[], timeout=None, limit=None):
         """PcapConnector needs to override expect to set it up for
            non-blocking I/O throughout. We do this to avoid losing
            packets between expect sessions.
-           Typically we would also set up pcap filter programs here
-           if performing potentially expensive matches."""
+
+           If offload is set, the Chains among the patterns are also
+           compiled into a BPF program, see pcs.bpfcompiler, which is
+           the capture filter until expect returns, so that packets
+           which cannot match any of them are dropped before they get
+           here.  A filter which was set beforehand still applies, as
+           well, and is put back afterwards.
+
+           Offload is off by default, as it changes what expect does.
+           Packets dropped by the program do not count towards limit.
+           Setting a filter on a live interface, which happens twice
+           on each call, throws away the packets the kernel has
+           buffered on BSD, and on Linux without a memory mapped ring,
+           so a reply which arrives before expect is called, or
+           anything which arrives between two calls, may be lost."""
         oldnblock = self.is_nonblocking
         if oldnblock is False:
             self.file.setnonblock(True)
             self.is_nonblocking = True
-        result = Connector.expect(self, patterns, timeout, limit)
-        if oldnblock is False:
-            self.file.setnonblock(False)
-            self.is_nonblocking = False
+        offloaded = self.offload and self._offload(patterns) is not None
+        try:
+            result = Connector.expect(self, patterns, timeout, limit)
+        finally:
+            if offloaded:
+                self._restore()
+            if oldnblock is False:
+                self.file.setnonblock(False)
+                self.is_nonblocking = False
         return result
 
+    def _offload(self, patterns):
+        """Set the capture filter to a BPF program for the Chains
+        among patterns, and for the filter set beforehand, if any.
+        Return the program, or None if it was not set."""
+        if not [p for p in patterns if isinstance(p, Chain)]:
+            return None
+        try:
+            from pcs.bpfcompiler import make_program, conjoin
+            prog = make_program(patterns, self.snaplen)
+            first = self.program
+            if first is None and self.file.filter:
+                first = self.file.compile(self.file.filter)
+            if first is not None:
+                prog = conjoin(first, prog)
+                if prog is None:
+                    return None
+            self.file.setbpfprogram(prog)
+        except (ImportError, OSError):
+            return None
+        return prog
+
+    def narrow(self, patterns):
+        """Only read packets which may match one of patterns, a Chain
+        or a list of Chains, as given to expect().
+
+        This is for scripts which look at a few of the packets in a
+        savefile.  They say which ones they want, for instance
+        ethernet(type=0x800) / ipv4(protocol=6, src=host), and the
+        others are dropped by a BPF program in libpcap rather than
+        read and decoded here.  A Chain for each direction of a
+        conversation asks for both of them.  The program may let
+        through more than the patterns match, so the packets still
+        have to be checked.  A filter which was set beforehand
+        still applies, as well.  Return True if the program was set,
+        or False if it could not be, in which case nothing more is
+        dropped."""
+        if isinstance(patterns, Chain):
+            patterns = [patterns]
+        prog = self._offload(patterns)
+        if prog is None:
+            return False
+        self.program = prog
+        return True
+
+    def _restore(self):
+        """Put back the capture filter set before expect()."""
+        if self.program is not None:
+            self.file.setbpfprogram(self.program)
+        else:
+            self.file.setfilter(self.file.filter)
+
+    def setfilter(self, value, optimize=1):
+        """Set the capture filter from a filter expression, see
+        pcap-filter(7)."""
+        self.file.setfilter(value, optimize)
+        self.program = None
+
     def write(self, packet, bytes):
         """Write a packet to a pcap file or network interface.
 
@@ -1976,24 +4223,35 @@ class PcapConnector(Connector):
         bytes - the bytes of the packet, and not the packet object"""
         return self.file.inject(packet, bytes)
 
-    def unpack(self, packet, dlink, dloff, timestamp):
+    def unpack(self, packet, dlink, dloff, timestamp, decode_depth=None,
+               stop_at=None):
         """Create a Packet from a string of bytes.
 
         packet - a Packet object
         dlink - a data link layer as defined in the pcap module
         dloff - a datalink offset as defined in the pcap module
+        decode_depth - the number of layers to decode
+        stop_at - a Packet class, or tuple of classes, below which
+                  nothing is decoded
         """
         import packets.ethernet
         import packets.localhost
 
-        if dlink == pcap.DLT_EN10MB:
-            return packets.ethernet.ethernet(packet, timestamp)
-        elif dlink == pcap.DLT_NULL:
-            return packets.localhost.localhost(packet, timestamp)
-        elif dlink == pcap.DLT_RAW:
-            return packets.ipv4.ipv4(packet, timestamp)
-        else:
-            raise UnpackError, "Could not interpret packet"
+        lazy = self.lazy or self.fields is not None
+        # Packets keep buffers onto the bytes they were decoded from
+        # until their next packets are decoded, and pcap reuses the
+        # buffer it hands us, so work from a copy.  A string is not
+        # copied again.
+        packet = str(packet)
+        with decoding(lazy, self.fields, decode_depth, stop_at):
+            if dlink == pcap.DLT_EN10MB:
+                return packets.ethernet.ethernet(packet, timestamp)
+            elif dlink == pcap.DLT_NULL:
+                return packets.localhost.localhost(packet, timestamp)
+            elif dlink == pcap.DLT_RAW:
+                return packets.ipv4.ipv4(packet, timestamp)
+            else:
+                raise UnpackError, "Could not interpret packet"
                 
     def close(self):
         """Close the pcap file or interface."""
@@ -2003,53 +4261,19 @@ class PcapConnector(Connector):
         from pcs.bpf import program
         if not isinstance(prog, program):
             raise ValueError, "not a BPF program"
-        return self.file.setbpfprogram(prog)
+        result = self.file.setbpfprogram(prog)
+        self.program = prog
+        return result
 
     # The intention is to offload some, but not all, of the filtering work
     # from PCS to PCAP using BPF as an intermediate representation.
-    # Only add BPF match opcodes for discriminator fields which satisfy
-    # certain criteria.
-    # Relative branches are forward only up to 256 instructions.
-    # The length of each packet header may not be constant if optional
-    # fields are present in filter chain, so calculate offset into
-    # chain using getbytes() not sizeof().
     # XXX We always assume a datalink header is present in the chain.
-    def make_bpf_program(c):
-        """Given a filter chain c, create a simple BPF filter program."""
-        from pcs.bpf import program, ldw, ldb, ldh, jeq, ret
-        assert isinstance(c, Chain)
-        # XXX It seems necessary to compute offsets in bits. At the
-        # moment this code does no special handling of bytes within
-        # BPF's 32-bit words.
-        foff = 0
-        prog = program()
-        for p in c.packets:
-            for fn in p._layout:
-                f = p._fieldnames[fn.name]
-                #print "foff: ", foff
-                if isinstance(f, Field) and \
-                 f.compare is f.default_compare and \
-                 f.discriminator is True and (f.width % 8) == 0:
-                    if f.width == 8:
-                         prog.instructions.append(ldb(foff>>3))
-                    elif f.width == 16:
-                         prog.instructions.append(ldh(foff>>3))
-                    elif f.width == 32:
-                         prog.instructions.append(ldw(foff>>3))
-                    prog.instructions.append(jeq(0, 0, f.value))
-                foff += f.width
-        prog.instructions.append(ret(96))
-        prog.instructions.append(ret(0))
-        jfabs = len(prog.instructions) - 1
-        ii = 0
-        # Relative branch displacements are measured from the address of
-        # the following opcode.
-        for i in prog.instructions:
-            ii += 1
-            if isinstance(i, jeq):
-                assert ((jfabs - ii) <= 255), "Relative branch overflow."
-                i.jf = jfabs - ii
-        return prog
+    def make_bpf_program(c, snaplen=65535):
+        """Given a filter chain c, or a list of them, create a BPF
+        filter program which accepts any packet they may match, see
+        pcs.bpfcompiler."""
+        from pcs.bpfcompiler import make_program
+        return make_program(c, snaplen)
 
     make_bpf_program = staticmethod(make_bpf_program)
 
@@ -2145,6 +4369,16 @@ class TapConnector(Connector):
         # XXX legacy name.
         return self.read_packet()
 
+    def selectable_fd(self):
+        return self.fileno
+
+    def _try_read_packet(self):
+        bytes = self.try_read_one()
+        if bytes is None:
+            return None
+        from pcs.packets.ethernet import ethernet
+        return ethernet(bytes)
+
     def write(self, packet, bytes):
         """Write a packet to a pcap file or network interface.
         bytes - the bytes of the packet, and not the packet object
@@ -2161,22 +4395,10 @@ class TapConnector(Connector):
         bytes - the bytes of the packet, and not the packet object"""
         return self.blocking_write(packet)
 
-    # XXX We could just call PcapConnector's method here.
     def poll_read(self, timeout=None):
         """Poll the underlying I/O layer for a read.
            Return TIMEOUT if the timeout was reached."""
-        from select import select
-        fd = self.file.fileno()
-        # Switch to non-blocking mode if entered without.
-        if not self.is_nonblocking:
-            self.file.setnonblock(True)
-        result = select([fd],[],[], timeout)
-        # Restore non-blocking mode if entered without.
-        if not self.is_nonblocking:
-            self.file.setnonblock(False)
-        if not fd in result[0]:
-            return TIMEOUT()
-        return None
+        return self._poll_read(self.fileno, timeout)
 
     def try_read_n_chains(self, n):
         """Try to read as many packet chains from the tap device as are
@@ -2311,8 +4533,28 @@ class IP4Connector(Connector):
         return self.file.recv(len)
 
     def read_packet(self):
-        bytes = self.file.read()
-        return packets.ipv4.ipv4(bytes)
+        bytes = self.file.recv(65535)
+        return self._unpack(bytes)
+
+    def _unpack(self, bytes):
+        """Return the packet read from the socket as bytes."""
+        from pcs.packets.ipv4 import ipv4
+        return ipv4(bytes)
+
+    def selectable_fd(self):
+        return self.file.fileno()
+
+    # The sockets are left blocking, the asynchronous calls of
+    # Connector ask for each call not to block instead.
+
+    def _try_read_packet(self):
+        bytes = _try(self.file.recv, 65535, MSG_DONTWAIT)
+        if bytes is None:
+            return None
+        return self._unpack(bytes)
+
+    def _try_write(self, packet, flags = 0):
+        return _try(self.file.send, packet, flags | MSG_DONTWAIT)
 
     def recv(self, len, flags = 0):
         """recv data from an IPv4 socket"""
@@ -2359,6 +4601,11 @@ class UDP4Connector(IP4Connector):
             except:
                 raise
 
+    def _unpack(self, bytes):
+        """Return the data read from the socket as a payload."""
+        from pcs.packets.payload import payload
+        return payload(bytes)
+
 class TCP4Connector(IP4Connector):
     """A connector for IPv4 TCP sockets
 
@@ -2378,6 +4625,11 @@ class TCP4Connector(IP4Connector):
             except:
                 raise
 
+    def _unpack(self, bytes):
+        """Return the data read from the socket as a payload."""
+        from pcs.packets.payload import payload
+        return payload(bytes)
+
 class UmlMcast4Connector(UDP4Connector):
     """A connector for hooking up to a User Mode Linux virtual LAN,
        implemented by Ethernet frames over UDP sockets in a multicast group.
@@ -2435,12 +4687,7 @@ class UmlMcast4Connector(UDP4Connector):
         return self.read_packet()
 
     def poll_read(self, timeout=None):
-        from select import select
-        fd = self.file.fileno()
-        result = select([fd],[],[], timeout)
-        if not fd in result[0]:
-            return TIMEOUT()
-        return None
+        return self._poll_read(self.file.fileno(), timeout)
 
     def blocking_read(self):
         # XXX Should use recvfrom.
@@ -2453,6 +4700,13 @@ class UmlMcast4Connector(UDP4Connector):
         """write data to an IPv4 socket"""
         return self.file.sendto(packet, flags, (self.group, self.port))
 
+    def _unpack(self, bytes):
+        from pcs.packets.ethernet import ethernet
+        return ethernet(bytes)
+
+    def _try_write(self, packet, flags = 0):
+        return _try(self.file.sendto, packet, flags, (self.group, self.port))
+
 
 class SCTP4Connector(IP4Connector):
     """A connector for IPv4 SCTP sockets
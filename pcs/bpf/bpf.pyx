@@ -21,7 +21,7 @@ import calendar
 import time
 
 cdef extern from "pcap.h":
-    int     bpf_filter(bpf_insn *insns, char *buf, int len, int caplen)
+    int     bpf_filter(bpf_insn *insns, char *buf, int len, int caplen) nogil
     int     bpf_validate(bpf_insn *insns, int len)
     char   *bpf_image(bpf_insn *insns, int n)
 
@@ -31,6 +31,10 @@ cdef extern from *:
     void *malloc(unsigned int len)
     int   printf(char *, ...)
 
+cdef extern from "Python.h":
+    int PyObject_AsReadBuffer(object obj, const void **buffer,
+                              Py_ssize_t *buffer_len) except -1
+
 BPF_LD = 0x00
 BPF_LDX = 0x01
 BPF_ST = 0x02
@@ -117,9 +121,6 @@ cdef class op:
         p = bpf_image(&self.insn, n)
         return p
 
-    def _copyout(self, ip):
-        (<bpf_insn *> ip)[0] = self.insn
-
 # The following class wrappers are purely for the user's convenience.
 
 cdef class ld(op):
@@ -362,13 +363,14 @@ cdef class progbuf:
         if bufp == NULL:
             raise MemoryError, 'malloc'
 
+        # Freed by __dealloc__ should li hold anything but ops.
+        self.bp.bf_insns = bufp
         ip = bufp
         for 0 <= i < ninsns:
-            li[i]._copyout(<object> ip)
+            ip[0] = (<op?> li[i]).insn
             ip = ip + 1
 
         self.bp.bf_len = ninsns
-        self.bp.bf_insns = bufp
         #printf("__init__(%p) returning\n", <void *>self)
 
     def __dealloc__(self):
@@ -404,6 +406,60 @@ cdef class progbuf:
         """Return boolean match for buf against our filter."""
         return bool(bpf_filter(self.bp.bf_insns, buf, buflen, buflen) != 0)
 
+    def filter_many(self, buffers, table=None):
+        """Return the indices of the buffers our filter matches,
+           see program.filter_many()."""
+        cdef const void *data
+        cdef Py_ssize_t size
+        cdef unsigned int i
+        cdef unsigned int n
+        cdef char **bufs
+        cdef unsigned int *lens
+        cdef char *hits
+        cdef bpf_insn *insns
+        cdef list result
+        # Hold on to every buffer while the GIL is let go.
+        if table is None:
+            buffers = tuple(buffers)
+            n = len(buffers)
+        else:
+            table = tuple(table)
+            n = len(table)
+            PyObject_AsReadBuffer(buffers, &data, &size)
+        result = []
+        if n == 0:
+            return result
+        bufs = <char **> malloc(n * sizeof(char *))
+        lens = <unsigned int *> malloc(n * sizeof(unsigned int))
+        hits = <char *> malloc(n)
+        try:
+            if bufs == NULL or lens == NULL or hits == NULL:
+                raise MemoryError, 'malloc'
+            for 0 <= i < n:
+                if table is None:
+                    PyObject_AsReadBuffer(buffers[i], &data, &size)
+                    bufs[i] = <char *> data
+                    lens[i] = size
+                else:
+                    offset, length = table[i]
+                    if offset < 0 or length < 0 or offset + length > size:
+                        raise ValueError, 'buffer %d is out of bounds' % i
+                    bufs[i] = (<char *> data) + <Py_ssize_t> offset
+                    lens[i] = length
+            insns = self.bp.bf_insns
+            with nogil:
+                for 0 <= i < n:
+                    hits[i] = bpf_filter(insns, bufs[i], lens[i],
+                                         lens[i]) != 0
+            for 0 <= i < n:
+                if hits[i]:
+                    result.append(i)
+        finally:
+            free(bufs)
+            free(lens)
+            free(hits)
+        return result
+
 # program acts as a proxy for progbuf.
 cdef class program:
     """program() -> BPF program object"""
@@ -447,12 +503,22 @@ cdef class program:
             i = i + 1
         return result
 
-    def filter(self, char *buf):
+    def filter(self, buf):
         """Return boolean match for buf against our filter."""
         cdef unsigned int buflen
         buflen = len(buf)
         return self.__progbuf__().filter(buf, buflen)
 
+    def filter_many(self, buffers, table=None):
+        """Return a list of the indices of the buffers our filter
+           matches, in order.  buffers is a list of strings, or of
+           anything else which holds bytes.  If table is given it is
+           a list of (offset, length) pairs instead, one for each
+           buffer, within buffers, which holds them all.
+           The buffers are run through the filter in C, without
+           holding the GIL, in one call."""
+        return self.__progbuf__().filter_many(buffers, table)
+
     def validate(self):
         """Return boolean True if BPF program is valid."""
         return self.__progbuf__().validate()
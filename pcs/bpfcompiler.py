@@ -0,0 +1,301 @@
+# Copyright (c) 2007-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id: $
+#
+# Author: George V. Neville-Neil
+# Description: Compile filter chains, as given to Connector.expect(),
+# into BPF programs, so that packets which cannot match them are
+# dropped before they are decoded.
+
+"""BPF compiler for filter chains
+
+make_program() turns one or more Chains, used as patterns as in
+Chain.matches(), into a pcs.bpf.program which accepts every packet
+any of them may match.  The program is a test of each chain in turn,
+and a packet is accepted by the first chain all of whose tests it
+passes, or rejected once they have all failed.
+
+Every plain field in the compiled prefix of each packet's layout, see
+pcs.Codec, which uses the default comparison is tested, by loading
+the bytes which hold it and comparing them with the value it should
+have.  Fields which share bytes are tested together and bits within
+a byte are picked out with and or, for single bits, jset.  Anything
+else a chain compares, such as option lists or fields with comparison
+functions of their own, is left for Chain.matches() to do, so the
+program may accept packets which do not match after all, but never
+drops one which does.
+
+The chain is assumed to start at the data link header.  Packets after
+one whose header may vary in length are found by indexed loads, from
+the sum of those lengths held in the X register, so a chain of
+ethernet, ipv4 and tcp finds the TCP ports wherever the IP options
+put them.  The classes whose headers may vary in length, and the
+field which gives it, are listed in header_length.  The chain is only
+compiled as far as the first packet whose length is neither fixed by
+its layout nor listed there.
+
+Conditional jumps in BPF reach at most 255 instructions ahead, so a
+jump which needs to go further is sent to an unconditional jump,
+which the code falling through steps over, placed where it reaches."""
+
+import pcs
+from pcs.packets.ipv4 import ipv4
+from pcs.packets.tcp import tcp
+
+## Packet class -> (field, scale), for classes whose header is the
+## value of the field times scale bytes long
+header_length = {ipv4: ("hlen", 4),
+                 tcp: ("offset", 4)}
+
+class _Label(object):
+    """A place in the code, which jumps are made to."""
+    pass
+
+def make_program(patterns, snaplen = 65535):
+    """Return a pcs.bpf.program which accepts, with up to snaplen
+    bytes, every packet which may match one of patterns, a Chain or a
+    list of them.  Anything in the list which is not a Chain, such as
+    TIMEOUT, is passed over."""
+    from pcs.bpf import program
+    if isinstance(patterns, pcs.Chain):
+        patterns = [patterns]
+    code = []
+    for chain in patterns:
+        if not isinstance(chain, pcs.Chain):
+            continue
+        fail = _Label()
+        _chain(code, chain, fail)
+        code.append(("ret", snaplen))
+        code.append(fail)
+    code.append(("ret", 0))
+    prog = program(_assemble(code))
+    assert prog.validate(), "Invalid BPF program."
+    return prog
+
+def conjoin(first, second):
+    """Return a program which accepts the packets both the programs
+    first and second accept, with as many bytes as second does, or
+    None if first returns what it has loaded, rather than a constant,
+    and so cannot be followed by another."""
+    from pcs.bpf import program, ja, BPF_RET, BPF_A
+    instructions = first.instructions
+    n = len(instructions)
+    result = []
+    for pc in xrange(n):
+        insn = instructions[pc]
+        if insn.code == BPF_RET | BPF_A:
+            return None
+        if insn.code & 0x07 == BPF_RET and insn.k != 0:
+            insn = ja(n - pc - 1)
+        result.append(insn)
+    return program(result + list(second.instructions))
+
+def _chain(code, chain, fail):
+    """Add to code the tests of a chain, which jump to fail if a
+    packet cannot match it."""
+    offset = 0		# from the start of the packet, or X
+    indexed = False	# whether X holds the length of earlier headers
+    for i in xrange(len(chain.packets)):
+        packet = chain.packets[i]
+        (mask, want) = packet._match_bytes()[:2]
+        _bytes(code, mask, want, offset, indexed, fail)
+        if i == len(chain.packets) - 1:
+            break
+
+        # Find where the next packet starts.
+        layout = packet._ilayout
+        codec = layout.codec
+        length = None
+        for cls in type(packet).__mro__:
+            if cls in header_length:
+                length = header_length[cls]
+                break
+        if length is not None:
+            (name, scale) = length
+            (start, size, fmask, bits) = \
+                    pcs._field_bits(codec, layout.index[name], 0)
+            if not indexed and size == 1 and fmask == 0x0f and scale == 4:
+                code.append(("ldxmsh", offset + start))
+            else:
+                code.append((_load(size), _where(offset + start, indexed)))
+                code.append(("and_", fmask))
+                # Shift the field down, and then up by the scale if it
+                # is a power of two, in one go.
+                shift = 0
+                while not (fmask >> shift) & 1:
+                    shift += 1
+                if scale & (scale - 1) == 0:
+                    while scale > 1:
+                        scale >>= 1
+                        shift -= 1
+                if shift > 0:
+                    code.append(("rsh", shift))
+                elif shift < 0:
+                    code.append(("lsh", -shift))
+                if scale != 1:
+                    code.append(("mul", scale))
+                if indexed:
+                    code.append(("add", None))
+                code.append(("tax",))
+            indexed = True
+        elif codec.count == len(layout) and \
+             0 not in [field.width for field in layout]:
+            offset += codec.size
+        else:
+            break
+
+def _bytes(code, mask, want, offset, indexed, fail):
+    """Add to code the tests of the bytes of a packet under mask, at
+    offset, against those in want."""
+    n = len(mask)
+    j = 0
+    while j < n:
+        if mask[j] == 0:
+            j += 1
+            continue
+        # Load as few bytes as cover the ones to test, of the next four.
+        need = 0
+        for t in xrange(j, min(j + 4, n)):
+            if mask[t]:
+                need = t - j + 1
+        if need == 1:
+            size = 1
+        elif need == 2 or j + 4 > n:
+            size = 2
+        else:
+            size = 4
+        m = 0
+        w = 0
+        for t in xrange(j, j + size):
+            m = (m << 8) | mask[t]
+            w = (w << 8) | want[t]
+        code.append((_load(size), _where(offset + j, indexed)))
+        if m == (1 << (8 * size)) - 1:
+            code.append(("jeq", w, None, fail))
+        elif m & (m - 1) == 0:
+            if w:
+                code.append(("jset", m, None, fail))
+            else:
+                code.append(("jset", m, fail, None))
+        else:
+            code.append(("and_", m))
+            code.append(("jeq", w, None, fail))
+        j += size
+
+def _load(size):
+    """Return the instruction which loads size bytes."""
+    return {1: "ldb", 2: "ldh", 4: "ldw"}[size]
+
+def _where(offset, indexed):
+    """Return the argument of a load from offset, or from offset past
+    X if indexed."""
+    if indexed:
+        return [offset]
+    return offset
+
+def _assemble(code):
+    """Return a list of pcs.bpf instructions for code, a list of
+    labels and of tuples of the name of an instruction and its
+    arguments.  The jumps of conditional instructions are labels, or
+    None for the next instruction, and unconditional jumps are to
+    labels or a count."""
+    import pcs.bpf as bpf
+    while True:
+        # Find the first jump which does not reach.
+        where = {}
+        pos = 0
+        for entry in code:
+            if isinstance(entry, _Label):
+                where[entry] = pos
+            else:
+                pos += 1
+        pos = 0
+        far = None
+        for n in xrange(len(code)):
+            entry = code[n]
+            if isinstance(entry, _Label):
+                continue
+            if entry[0] in ("jeq", "jset"):
+                for target in entry[2:4]:
+                    if target is not None and where[target] - pos - 1 > 255:
+                        far = (n, pos, target)
+                        break
+            if far is not None:
+                break
+            pos += 1
+        if far is None:
+            break
+
+        # Put a trampoline where the jump just reaches it, after an
+        # unconditional jump over it, and send every jump before it
+        # which goes to the same place there instead.
+        (n, pos, target) = far
+        k = n
+        count = pos
+        while count < pos + 255:
+            if not isinstance(code[k], _Label):
+                count += 1
+            k += 1
+        trampoline = _Label()
+        code[k:k] = [("ja", 1), trampoline, ("ja", target)]
+        for m in xrange(n, k):
+            entry = code[m]
+            if not isinstance(entry, _Label) and \
+               entry[0] in ("jeq", "jset"):
+                entry = list(entry)
+                for t in (2, 3):
+                    if entry[t] is target:
+                        entry[t] = trampoline
+                code[m] = tuple(entry)
+
+    result = []
+    pos = 0
+    for entry in code:
+        if isinstance(entry, _Label):
+            continue
+        name = entry[0]
+        pos += 1
+        if name in ("jeq", "jset"):
+            (k, jt, jf) = entry[1:]
+            jt = jt is not None and where[jt] - pos or 0
+            jf = jf is not None and where[jf] - pos or 0
+            insn = getattr(bpf, name)(jt, jf, int(k))
+        elif name == "ja":
+            k = entry[1]
+            if isinstance(k, _Label):
+                k = where[k] - pos
+            insn = bpf.ja(k)
+        elif len(entry) > 1 and isinstance(entry[1], (int, long)):
+            insn = getattr(bpf, name)(int(entry[1]))
+        else:
+            insn = getattr(bpf, name)(*entry[1:])
+        result.append(insn)
+    return result
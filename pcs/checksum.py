@@ -0,0 +1,357 @@
+# Copyright (c) 2007-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id: $
+#
+# Author: George V. Neville-Neil
+#
+# Description: The Internet checksum of RFC 1071, worked out over
+# whole buffers at a time, and the checking of the checksums of
+# captured packets.
+
+"""Internet checksums
+
+The Internet checksum is the one's complement of the one's complement
+sum of the 16 bit words of the data it covers.  The sums here are
+worked out over a whole buffer at once, with the array module, or
+with NumPy for large buffers when it is there, rather than word by
+word.  They may be strings, buffers or anything else which holds
+bytes.
+
+    wordsum(bytes) - the folded, uncomplemented, sum of some bytes
+    checksum(bytes, ...) - the checksum over several buffers, as if
+                           they were one
+    Checksum - the same, a buffer at a time, for data which does not
+               arrive all at once
+    pseudo4(), pseudo6() - the sum of the pseudo header of RFC 793
+                           and RFC 2460 which transport checksums
+                           cover, without making a packet for it
+
+Sums are kept, and may be added together, as plain integers, and are
+only folded into 16 bits and complemented at the end, by complement().
+A buffer which follows one of an odd length begins in the middle of a
+word, and its sum is swapped, see swap().
+
+verify() checks the checksums of a chain of packets, usually one which
+has been captured.  PcapConnector does this for every packet it reads
+when it is made with verify=True."""
+
+import array
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Below this many bytes an array is quicker than NumPy.
+NUMPY_MINIMUM = 1024
+
+_little = sys.byteorder == "little"
+
+def fold(total):
+    """Fold a sum of any size into 16 bits, adding the carries back
+    in, as the one's complement sum does."""
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return total
+
+def swap(total):
+    """Return the sum of some bytes as it would be if they began at an
+    odd offset, that is in the second byte of a word."""
+    total = fold(total)
+    return ((total << 8) | (total >> 8)) & 0xffff
+
+def complement(total):
+    """Return the checksum for a sum: its one's complement in 16 bits."""
+    return ~fold(total) & 0xffff
+
+def wordsum(bytes):
+    """Return the one's complement sum, folded into 16 bits but not
+    complemented, of the 16 bit words in network byte order which
+    bytes make up.  An odd last byte is padded with a zero."""
+    if not isinstance(bytes, (str, buffer)):
+        bytes = buffer(bytes)
+    length = len(bytes)
+    total = 0
+    if length & 1:
+        length -= 1
+        total = _byte(bytes, length)[0] << 8
+        bytes = buffer(bytes, 0, length)
+    if numpy is not None and length >= NUMPY_MINIMUM:
+        total += int(numpy.frombuffer(bytes, ">u2").sum(dtype=numpy.uint64))
+    else:
+        words = array.array("H")
+        words.fromstring(bytes)
+        if _little:
+            words.byteswap()
+        total += sum(words)
+    return fold(total)
+
+_byte = struct.Struct("B").unpack_from
+
+def checksum(*buffers):
+    """Return the Internet checksum over the bytes of all the buffers,
+    as if they had been put together, without putting them together."""
+    sum = Checksum()
+    for bytes in buffers:
+        sum.update(bytes)
+    return sum.digest()
+
+class Checksum(object):
+    """An Internet checksum worked out a buffer at a time.  For example:
+
+        sum = Checksum(pseudo4(ip.src, ip.dst, IPPROTO_UDP, length))
+        sum.update(header)
+        sum.update(payload)
+        udp.checksum = sum.digest()
+
+    Buffers may be of any length, odd or even."""
+
+    __slots__ = ('total', 'length')
+
+    def __init__(self, total = 0):
+        """initialize a Checksum
+
+        total - the sum of anything which comes before the buffers,
+                such as a pseudo header
+        """
+        self.total = total
+        self.length = 0
+
+    def update(self, bytes):
+        """Add the bytes of a buffer, which follow any given before."""
+        partial = wordsum(bytes)
+        if self.length & 1:
+            partial = swap(partial)
+        self.total += partial
+        self.length += len(bytes)
+
+    def add(self, partial, length):
+        """Add the sum of length bytes worked out elsewhere, such as by
+        Chain.sum_following(), as if they had been given to update()."""
+        if self.length & 1:
+            partial = swap(partial)
+        self.total += partial
+        self.length += length
+
+    def sum(self):
+        """Return the folded, uncomplemented, sum so far."""
+        return fold(self.total)
+
+    def digest(self):
+        """Return the checksum of everything so far."""
+        return complement(self.total)
+
+    def copy(self):
+        """Return a copy of the checksum so far."""
+        copy = Checksum(self.total)
+        copy.length = self.length
+        return copy
+
+def pseudo4(src, dst, protocol, length):
+    """Return the sum of the IPv4 pseudo header for a transport
+    checksum.
+
+    src, dst - the IPv4 addresses, as integers
+    protocol - the IP protocol number of the transport
+    length - the length of the transport header and its payload
+    """
+    return ((src >> 16) + (src & 0xffff) + (dst >> 16) + (dst & 0xffff) +
+            protocol + length)
+
+def pseudo6(src, dst, next_header, length):
+    """Return the sum of the IPv6 pseudo header for a transport
+    checksum.
+
+    src, dst - the IPv6 addresses, as 16 byte strings
+    next_header - the protocol number of the transport
+    length - the length of the transport header and its payload
+    """
+    return (wordsum(src) + wordsum(dst) + (length >> 16) +
+            (length & 0xffff) + next_header)
+
+#
+# Checking the checksums of captured packets.
+#
+
+def verify(packet, bytes = None):
+    """Check the checksums of all the packets in a chain, and return a
+    list of those whose checksums are wrong, which is empty if they
+    are all right.
+
+    packet - a Chain, or a Packet, whose chain is checked
+    bytes - the bytes the chain was decoded from, or None to use the
+            bytes of the chain itself
+
+    The checksums are worked out over the bytes as they were captured,
+    when they are given, as far as the network header says the packet
+    goes, which leaves out any padding of the link layer.  Pass the
+    captured bytes, as PcapConnector does, to check a packet as it was
+    read: the bytes of a chain which has been decoded lazily need not
+    be the same, so damage to them may go unnoticed.  Packets which
+    were cut short by the capture, and the layers above the network
+    header of a fragment, are taken to be right, as there is no
+    telling otherwise.  Only the classes in checkers are checked."""
+    import pcs
+    if isinstance(packet, pcs.Chain):
+        chain = packet
+    else:
+        chain = packet.chain()
+    if not _loaded:
+        _checkers()
+    if bytes is None:
+        bytes = chain.bytes
+    offset = 0
+    bad = []
+    for p in chain.packets:
+        for cls in type(p).__mro__:
+            check = checkers.get(cls)
+            if check is not None:
+                if check(p, chain, bytes, offset) is False:
+                    bad.append(p)
+                break
+        offset += len(p.getbytes())
+    return bad
+
+def _network(packet, chain, bytes, offset):
+    """Return the IPv4 or IPv6 header which carries packet, at offset,
+    and the offset just past the end of packet's payload, or None if
+    packet was cut short, is carried in a fragment, whose bytes are not
+    those of the whole datagram, or has no network header."""
+    from pcs.packets.ipv4 import ipv4, IP_MF
+    from pcs.packets.ipv6 import ipv6, IPV6_FRAG
+    # The nearest network header, past any IPv6 extension headers.
+    (ip, n) = chain.find_preceding(packet, (ipv4, ipv6), adjacent=False)
+    if ip is None:
+        return None
+    if isinstance(ip, ipv4):
+        if ip.flags & IP_MF or ip.offset != 0:
+            return None
+    else:
+        for p in chain.packets[n:chain.index_of(packet)]:
+            if getattr(p, "next_header", None) == IPV6_FRAG:
+                return None
+    start = offset
+    for p in chain.packets[n:chain.index_of(packet)]:
+        start -= len(p.getbytes())
+    if isinstance(ip, ipv4):
+        end = start + ip.length
+    else:
+        end = start + 40 + ip.length
+    if end > len(bytes) or offset > end:
+        return None
+    return (ip, end)
+
+def _transport(protocol, optional = False):
+    """Return a checker for a transport whose checksum covers a
+    pseudo header.  An optional checksum may be zero over IPv4."""
+    def check(packet, chain, bytes, offset):
+        found = _network(packet, chain, bytes, offset)
+        if found is None:
+            return None
+        (ip, end) = found
+        length = end - offset
+        from pcs.packets.ipv4 import ipv4
+        if isinstance(ip, ipv4):
+            if optional and packet.checksum == 0:
+                return True
+            total = pseudo4(ip.src, ip.dst, protocol, length)
+        else:
+            total = pseudo6(ip.src, ip.dst, protocol, length)
+        total += wordsum(buffer(bytes, offset, length))
+        return fold(total) == 0xffff
+    return check
+
+def _plain(packet, chain, bytes, offset):
+    """Check a checksum which covers a header and its payload only, as
+    those of ICMP and IGMP do."""
+    found = _network(packet, chain, bytes, offset)
+    if found is None:
+        return None
+    (ip, end) = found
+    return wordsum(buffer(bytes, offset, end - offset)) == 0xffff
+
+def _sctp(packet, chain, bytes, offset):
+    """Check the CRC-32c of an SCTP packet, or the Adler-32 which
+    RFC 2960 had before RFC 3309 replaced it, both worked out with the
+    checksum taken as zero."""
+    from zlib import adler32
+    from pcs.packets.crc32c import CRC32C
+    found = _network(packet, chain, bytes, offset)
+    if found is None or found[1] - offset < 12:
+        return None
+    (ip, end) = found
+    head = buffer(bytes, offset, 8)
+    rest = buffer(bytes, offset + 12, end - offset - 12)
+    crc = CRC32C(head)
+    crc.update("\0\0\0\0")
+    crc.update(rest)
+    if crc.digest() == packet.checksum:
+        return True
+    adler = adler32(rest, adler32("\0\0\0\0", adler32(head)))
+    return adler & 0xffffffff == packet.checksum
+
+def _ipv4(packet, chain, bytes, offset):
+    """Check the checksum of an IPv4 header."""
+    length = packet.hlen << 2
+    if offset + length > len(bytes):
+        return None
+    return wordsum(buffer(bytes, offset, length)) == 0xffff
+
+# The function which checks the checksum of each Packet class, given
+# the packet, its chain, the bytes of the chain and the offset of the
+# packet in them.  It returns True if the checksum is right, False if
+# it is wrong and None if there is no telling.  The checkers for the
+# packets PCS knows are added when it is first used, as the packet
+# modules need pcs, but not over any which are already here.
+checkers = {}
+_loaded = False
+
+def _checkers():
+    global _loaded
+    from socket import IPPROTO_TCP, IPPROTO_UDP, IPPROTO_ICMPV6
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+    from pcs.packets.udp import udp
+    from pcs.packets.icmpv4 import icmpv4
+    from pcs.packets.icmpv6 import icmpv6
+    from pcs.packets.igmp import igmp
+    from pcs.packets.sctp import common
+    for (cls, check) in [(ipv4, _ipv4),
+                         (tcp, _transport(IPPROTO_TCP)),
+                         (udp, _transport(IPPROTO_UDP, True)),
+                         (icmpv4, _plain),
+                         (igmp, _plain),
+                         (icmpv6, _transport(IPPROTO_ICMPV6)),
+                         (common, _sctp)]:
+        checkers.setdefault(cls, check)
+    _loaded = True
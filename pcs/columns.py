@@ -0,0 +1,198 @@
+# Copyright (c) 2007-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id: $
+#
+# Author: George V. Neville-Neil
+#
+# Description: Decode a whole capture, layer by layer, into NumPy
+# structured arrays, for analysing captures as arrays rather than
+# packet by packet.
+
+"""Columnar decoding of captures
+
+Each layer of the packets in a capture is decoded into a NumPy
+structured array, one per Packet class, whose dtype comes from the
+class's Layout.  Every field in the compiled prefix of the layout,
+see pcs.Codec, is a column, and two more columns, _frame and _offset,
+give the position of the packet in the capture and the offset of the
+layer in the packet.  Fields are pulled out of all of the packets at
+once, with shifts and masks over arrays, not packet by packet.
+
+The next layer is found from the discriminator field and map of a
+class, as Packet.next() does.  Decoding stops at classes which decide
+what comes next some other way, such as tcp and udp, and at classes
+with no compiled fields, such as payload.  Classes whose headers are
+not the size of their compiled fields, because they carry options,
+are listed in header_length.
+
+This module needs NumPy, which PCS does not otherwise need, and is
+used through PcapConnector.read_columns()."""
+
+import numpy
+
+import pcs
+from pcs.bpfcompiler import header_length
+
+class Columns(dict):
+    """The layers of a capture, as NumPy structured arrays, by Packet
+    class.  The rows of each array are sorted by packet, and by offset
+    within the packet."""
+
+    def __init__(self, timestamps, lengths):
+        dict.__init__(self)
+        ## the timestamp of each packet in the capture
+        self.timestamps = timestamps
+        ## the length of each packet in the capture
+        self.lengths = lengths
+
+def _dtype(width):
+    """Return the NumPy type of an integer field width bits wide."""
+    for (bits, type) in ((8, numpy.uint8), (16, numpy.uint16),
+                         (32, numpy.uint32)):
+        if width <= bits:
+            return type
+    return numpy.uint64
+
+def dtype(cls):
+    """Return the dtype of the array for a Packet class.
+
+    Integer fields are unsigned integers of the smallest size which
+    holds them, string fields and integers wider than 64 bits are raw
+    bytes, NumPy void rather than strings, which would lose any NULs
+    at the end.  Wide integers which share their bytes with other
+    fields are left out."""
+    layout = cls._layout
+    codec = layout.codec
+    fields = [("_frame", numpy.int64), ("_offset", numpy.int64)]
+    for (code, width, wide, members) in codec.items:
+        if members[0][2] is None or width > 64:
+            if len(members) == 1:
+                fields.append((layout[members[0][0]].name,
+                               "V%d" % (width / 8)))
+            continue
+        for (index, shift, mask) in members:
+            field = layout[index]
+            fields.append((field.name, _dtype(field.width)))
+    return numpy.dtype(fields)
+
+def _gather(buf, offsets, size):
+    """Return the size bytes at each of the offsets into buf as big
+    endian unsigned integers."""
+    value = numpy.zeros(len(offsets), numpy.uint64)
+    eight = numpy.uint64(8)
+    for i in xrange(size):
+        value = (value << eight) | buf[offsets + i]
+    return value
+
+def _decode(cls, buf, offsets, table):
+    """Fill in the columns of table for the layer of class cls found at
+    each of the offsets into buf."""
+    layout = cls._layout
+    codec = layout.codec
+    for (k, (code, width, wide, members)) in enumerate(codec.items):
+        (start, end) = codec.spans[k]
+        size = end - start
+        if size == 0:
+            continue
+        if members[0][2] is None or size > 8:
+            if len(members) == 1:
+                raw = buf[(offsets + start)[:, numpy.newaxis] +
+                          numpy.arange(size)]
+                table[layout[members[0][0]].name] = \
+                    numpy.ascontiguousarray(raw).view("V%d" % size).ravel()
+            continue
+        value = _gather(buf, offsets + start, size)
+        for (index, shift, mask) in members:
+            name = layout[index].name
+            table[name] = (value >> numpy.uint64(shift)) & \
+                          numpy.uint64(mask)
+
+def decode(packets, first):
+    """Decode packets into Columns.
+
+    packets - a list of (timestamp, bytes) tuples, as returned by
+              PcapConnector.next()
+    first - the Packet class of the outermost layer of the packets
+    """
+    lengths = numpy.array([len(bytes) for (timestamp, bytes) in packets],
+                          numpy.int64)
+    ends = numpy.cumsum(lengths)
+    starts = ends - lengths
+    buf = numpy.frombuffer("".join([bytes for (timestamp, bytes)
+                                    in packets]), numpy.uint8)
+    result = Columns(numpy.array([timestamp for (timestamp, bytes)
+                                  in packets], numpy.float64), lengths)
+    parts = {}
+    pending = [(first, numpy.arange(len(packets)), starts)]
+    while pending:
+        (cls, rows, offsets) = pending.pop()
+        codec = cls._layout.codec
+        if codec.count == 0:
+            continue
+        # A layer which is cut short is not decoded, nor is
+        # anything below it.
+        fit = offsets + codec.size <= ends[rows]
+        rows = rows[fit]
+        offsets = offsets[fit]
+        if len(rows) == 0:
+            continue
+        table = numpy.zeros(len(rows), dtype(cls))
+        table["_frame"] = rows
+        table["_offset"] = offsets - starts[rows]
+        _decode(cls, buf, offsets, table)
+        parts.setdefault(cls, []).append(table)
+
+        # Find the next layer.
+        discriminator = cls._layout.discriminator
+        map = getattr(cls, "_map", None)
+        if discriminator is None or map is None or \
+           discriminator.name not in table.dtype.names or \
+           cls.next.im_func is not pcs.Packet.next.im_func:
+            continue
+        if cls in header_length:
+            (name, scale) = header_length[cls]
+            following = offsets + table[name].astype(numpy.int64) * scale
+        else:
+            following = offsets + codec.size
+        values = table[discriminator.name]
+        for value in numpy.unique(values):
+            next = map.get(int(value))
+            if not isinstance(next, type) or \
+               not issubclass(next, pcs.Packet):
+                continue
+            chosen = (values == value) & (following < ends[rows])
+            pending.append((next, rows[chosen], following[chosen]))
+
+    for (cls, tables) in parts.iteritems():
+        table = numpy.concatenate(tables)
+        result[cls] = table[numpy.lexsort((table["_offset"],
+                                           table["_frame"]))]
+    return result
@@ -0,0 +1,240 @@
+# cython: language_level=2
+#
+# fast.pyx
+#
+# $Id$
+
+"""Fast bit field codec
+
+This module decodes and encodes the bits of a single Field in C.  It
+has the same contract as the pure Python code in Field.decode() and
+Field.encode(), which is used whenever this module has not been built,
+and gives the same results, bit for bit, including for short packets
+and for values which are too wide for their fields.
+
+Fields up to 64 bits wide are done with C integers.  Anything wider,
+or any argument outside the usual ranges, is done with Python integers
+instead, just as the pure Python code does it.
+
+It also carries the CRC-32c of pcs.packets.crc32c on over a buffer,
+eight bytes at a time, without holding the GIL.
+"""
+
+__author__ = 'George V. Neville-Neil <gnn@neville-neil.com>'
+__maintainer__ = 'George V. Neville-Neil <gnn@neville-neil.com>'
+__copyright__ = 'Copyright (c) 2005-2016, Neville-Neil Consulting'
+__license__ = 'BSD license'
+__url__ = 'http://pcs.sf.net'
+__version__ = '1.0'
+__revison__ = '0'
+
+import struct
+
+ctypedef unsigned long long u_int64_t
+
+cdef extern from "limits.h":
+    long LONG_MAX
+
+cdef extern from "Python.h":
+    int PyObject_AsReadBuffer(object obj, const void **buffer,
+                              Py_ssize_t *buffer_len) except -1
+
+# One character strings for every byte value, so that encoding does
+# not build a new string for each byte.
+_chars = [chr(i) for i in range(256)]
+
+def decode(width, length, bytes, curr, byteBR):
+    """Decode a field of width bits from bytes, starting at byte curr
+    with byteBR bits left in it.  Return [value, curr, byteBR].
+
+    width - the width, in bits, of the field
+    length - the number of bytes that may be read from bytes
+    bytes - a string, or buffer, to decode the field from
+    curr - the current byte position in bytes
+    byteBR - the number of bits remaining in the current byte
+    """
+    cdef const void *data
+    cdef Py_ssize_t size
+    cdef unsigned char *p
+    cdef u_int64_t real_value, value
+    cdef int fieldBR, bits
+    cdef Py_ssize_t c, n
+    try:
+        PyObject_AsReadBuffer(bytes, &data, &size)
+    except TypeError:
+        return _decode(width, length, bytes, curr, byteBR)
+    if not (0 <= width <= 64 and 1 <= byteBR <= 8 and
+            0 <= curr and length <= size):
+        return _decode(width, length, bytes, curr, byteBR)
+    p = <unsigned char *>data
+    fieldBR = width
+    bits = byteBR
+    c = curr
+    n = length
+    real_value = 0
+    while fieldBR > 0 and c < n:
+        if fieldBR < bits:
+            value = (p[c] >> (bits - fieldBR)) & ((1 << fieldBR) - 1)
+            bits -= fieldBR
+            fieldBR = 0
+        elif fieldBR > bits:
+            value = p[c] & ((1 << bits) - 1)
+            fieldBR -= bits
+            bits = 8
+            c += 1
+        else:
+            value = p[c] & ((1 << bits) - 1)
+            fieldBR = 0
+            bits = 8
+            c += 1
+        real_value += value << fieldBR
+    # Hand back an int, not a long, wherever the Python code would.
+    if real_value <= <u_int64_t>LONG_MAX:
+        return [<long>real_value, c, bits]
+    return [real_value, c, bits]
+
+def encode(width, bytearray, value, byte, byteBR):
+    """Encode value as a field of width bits, appending each byte that
+    is filled to bytearray, a list of strings.  byte holds the bits of
+    the current byte so far and byteBR the number of bits remaining
+    in it.  Return [byte, byteBR].
+    """
+    cdef u_int64_t v, b, mask
+    cdef int fieldBR, bits, shift
+    if not (0 <= width <= 64 and 1 <= byteBR <= 8 and
+            isinstance(byte, (int, long)) and 0 <= byte <= 255 and
+            isinstance(value, (int, long)) and
+            0 <= value < 18446744073709551616L):
+        return _encode(width, bytearray, value, byte, byteBR)
+    v = value
+    b = byte
+    fieldBR = width
+    bits = byteBR
+    while bits > 0:
+        if fieldBR < bits:
+            shift = bits - fieldBR
+            bits -= fieldBR
+            mask = ((1 << fieldBR) - 1) << shift
+            b = b | ((v << shift) & mask)
+            break
+        elif fieldBR > bits:
+            shift = fieldBR - bits
+            fieldBR -= bits
+            mask = (1 << bits) - 1
+            b = b | ((v >> shift) & mask)
+            bytearray.append(_chars[b])
+            bits = 8
+            b = 0
+        else:
+            mask = (1 << bits) - 1
+            b = b | (v & mask)
+            bytearray.append(_chars[b])
+            b = 0
+            bits = 8
+            break
+    return [<int>b, bits]
+
+# The tables for the CRC-32c, slicing-by-8.  Entry i of table k is the
+# CRC of byte i followed by k zero bytes.
+
+cdef unsigned int _crc32c[8][256]
+
+cdef void _crc32c_tables():
+    cdef unsigned int i, k, crc
+    for i in range(256):
+        crc = i
+        for k in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x82F63B78
+            else:
+                crc = crc >> 1
+        _crc32c[0][i] = crc
+    for i in range(256):
+        crc = _crc32c[0][i]
+        for k in range(1, 8):
+            crc = (crc >> 8) ^ _crc32c[0][crc & 0xff]
+            _crc32c[k][i] = crc
+
+_crc32c_tables()
+
+def crc32c_add(crc, bytes):
+    """Return the CRC-32c crc carried on over bytes, as
+    pcs.packets.crc32c.add() does."""
+    cdef const void *data
+    cdef Py_ssize_t size
+    cdef const unsigned char *p
+    cdef unsigned int c, one, two
+    PyObject_AsReadBuffer(bytes, &data, &size)
+    p = <const unsigned char *>data
+    c = crc & 0xffffffff
+    with nogil:
+        while size >= 8:
+            one = c ^ (p[0] | (p[1] << 8) | (p[2] << 16) |
+                       (<unsigned int>p[3] << 24))
+            two = p[4] | (p[5] << 8) | (p[6] << 16) | (<unsigned int>p[7] << 24)
+            c = (_crc32c[7][one & 0xff] ^ _crc32c[6][(one >> 8) & 0xff] ^
+                 _crc32c[5][(one >> 16) & 0xff] ^ _crc32c[4][one >> 24] ^
+                 _crc32c[3][two & 0xff] ^ _crc32c[2][(two >> 8) & 0xff] ^
+                 _crc32c[1][(two >> 16) & 0xff] ^ _crc32c[0][two >> 24])
+            p += 8
+            size -= 8
+        while size > 0:
+            c = (c >> 8) ^ _crc32c[0][(c ^ p[0]) & 0xff]
+            p += 1
+            size -= 1
+    return c
+
+# The same algorithms, on Python integers, for everything the C
+# versions above do not handle.
+
+cdef object _decode(width, length, bytes, curr, byteBR):
+    real_value = 0
+    fieldBR = width
+    while (fieldBR > 0 and curr < length):
+        if fieldBR < byteBR:
+            shift = byteBR - fieldBR
+            value = ord(bytes[curr]) >> shift
+            mask = 2 ** fieldBR -1
+            value = (value & mask)
+            byteBR -= fieldBR
+            fieldBR = 0
+        elif fieldBR > byteBR:
+            mask = 2 ** byteBR - 1
+            value = (ord(bytes[curr]) & mask)
+            fieldBR -= byteBR
+            byteBR = 8
+            curr += 1
+        elif fieldBR == byteBR:
+            mask = 2 ** byteBR - 1
+            value = ord(bytes[curr]) & mask
+            fieldBR -= byteBR
+            byteBR = 8
+            curr += 1
+        real_value += value << fieldBR
+    return [real_value, curr, byteBR]
+
+cdef object _encode(width, bytearray, value, byte, byteBR):
+    fieldBR = width
+    while byteBR > 0:
+        if fieldBR < byteBR:
+            shift = byteBR - fieldBR
+            byteBR -= fieldBR
+            mask = ((2 ** fieldBR) - 1) << shift
+            byte = (byte | ((value << shift) & mask))
+            break
+        elif fieldBR > byteBR:
+            shift = fieldBR - byteBR
+            fieldBR -= byteBR
+            mask = ((2 ** byteBR) - 1)
+            byte = (byte | ((value >> shift) & mask))
+            bytearray.append(struct.pack('B', byte))
+            byteBR = 8
+            byte = 0
+        elif fieldBR == byteBR:
+            mask = ((2 ** byteBR) - 1)
+            byte = (byte | (value & mask))
+            bytearray.append(struct.pack('B', byte))
+            byte = 0
+            byteBR = 8
+            break
+    return [byte, byteBR]
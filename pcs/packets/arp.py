@@ -54,22 +54,19 @@ ARPOP_INVREPLY = 9	# response identifying peer
 class arp(pcs.Packet):
     """ARP"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("hrd", 16, default = 1),
+                          pcs.Field("pro", 16, default = 0x800),
+                          pcs.Field("hln", 8, default = 6),
+                          pcs.Field("pln", 8, default = 4),
+                          pcs.Field("op", 16),
+                          pcs.StringField("sha", 48),
+                          pcs.Field("spa", 32),
+                          pcs.StringField("tha", 48),
+                          pcs.Field("tpa", 32)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an ARP packet"""
-        hrd = pcs.Field("hrd", 16, default = 1)
-        pro = pcs.Field("pro", 16, default = 0x800)
-        hln = pcs.Field("hln", 8, default = 6)
-        pln = pcs.Field("pln", 8, default = 4)
-        op = pcs.Field("op", 16)
-        sha = pcs.StringField("sha", 48)
-        spa = pcs.Field("spa", 32)
-        tha = pcs.StringField("tha", 48)
-        tpa = pcs.Field("tpa", 32)
-        
-        pcs.Packet.__init__(self, [hrd, pro, hln, pln, op,
-                                   sha, spa, tha, tpa], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "ARP"
         if timestamp is None:
             self.timestamp = time.time()
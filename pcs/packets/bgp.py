@@ -64,14 +64,12 @@ CEASE = 6
 class notification(pcs.Packet):
     """RFC 4271 BGP NOTIFICATION message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("code", 8),
+                          pcs.Field("subcode", 8),
+                          pcs.OptionListField("opt")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        code = pcs.Field("code", 8)
-        subcode = pcs.Field("subcode", 8)
-        opt = pcs.OptionListField("opt")
-
-        pcs.Packet.__init__(self, [ code, subcode, opt ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 4271 BGP NOTIFICATION message."
 
         if timestamp is None:
@@ -86,7 +84,7 @@ class notification(pcs.Packet):
             if remaining > 0:
                 value = pcs.StringField("data", remaining*8, \
                                         default=bytes[curr:remaining])
-                opt._options.append(value)
+                self.opt.append(value)
         else:
             self.data = None
 
@@ -94,17 +92,14 @@ class notification(pcs.Packet):
 class update(pcs.Packet):
     """RFC 4271 BGP UPDATE message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("nwithdrawn", 16),
+                          pcs.OptionListField("withdrawn"),
+                          pcs.Field("npathattrs", 16),
+                          pcs.OptionListField("pathattrs"),
+                          pcs.OptionListField("nlri")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        nwithdrawn = pcs.Field("nwithdrawn", 16)
-        withdrawn = pcs.OptionListField("withdrawn")
-        npathattrs = pcs.Field("npathattrs", 16)
-        pathattrs = pcs.OptionListField("pathattrs")
-        nlri = pcs.OptionListField("nlri")
-
-        pcs.Packet.__init__(self, [ nwithdrawn, withdrawn, npathattrs, \
-                                    pathattrs, nlri ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 4271 BGP UPDATE message."
 
         if timestamp is None:
@@ -113,7 +108,7 @@ class update(pcs.Packet):
             self.timestamp = timestamp
 
         if bytes is not None:
-            offset = nwithdrawn.width
+            offset = self._fieldnames["nwithdrawn"].width
             curr = offset
             remaining = len(bytes) - offset
             # TODO parse withdrawn
@@ -128,19 +123,15 @@ class update(pcs.Packet):
 class open(pcs.Packet):
     """RFC 4271 BGP OPEN message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 8, default=4),
+                          pcs.Field("asnum", 16),
+                          pcs.Field("holdtime", 16),
+                          pcs.Field("id", 32),
+                          pcs.Field("optlen", 8),
+                          pcs.OptionListField("opt")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        version = pcs.Field("version", 8, default=4)
-        asnum = pcs.Field("asnum", 16)
-        holdtime = pcs.Field("holdtime", 16)
-        id = pcs.Field("id", 32)
-        optlen = pcs.Field("optlen", 8)
-        opt = pcs.OptionField("opt")
-
-        pcs.Packet.__init__(self, \
-                            [ version, asnum, holdtime, id, optlen, opt], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 4271 BGP OPEN message."
 
         if timestamp is None:
@@ -153,8 +144,9 @@ class open(pcs.Packet):
             offset = self.sizeof()
             curr = offset
             remaining = len(bytes) - offset
+            optlen = self.optlen
             if optlen > 0 and remaining == optlen:
-                opt._options.append(pcs.StringField("opts", optlen*8, \
+                self.opt.append(pcs.StringField("opts", optlen*8, \
                                                     bytes[curr:curr+optlen]))
                 curr += optlen
                 remaining -= optlen
@@ -174,16 +166,14 @@ _map = {
 class header(pcs.Packet):
     """RFC 4271 BGP message header."""
 
-    _layout = pcs.Layout()
     _marker = "\xFF\xFF\xFF\xFF\xFF\xFF\xFF\xFF"\
               "\xFF\xFF\xFF\xFF\xFF\xFF\xFF\xFF"
+    _layout = pcs.Layout([pcs.StringField("marker", 16 * 8, default=_marker),
+                          pcs.Field("length", 16),
+                          pcs.Field("type", 8, discriminator=True)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        marker = pcs.StringField("marker", 16 * 8, default=_marker)
-        length = pcs.Field("length", 16)
-        type = pcs.Field("type", 8, discriminator=True)
-
-        pcs.Packet.__init__(self, [ marker, length, type ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 4271 BGP message header."
 
         if timestamp is None:
@@ -205,22 +205,19 @@ _iff_flagbits =\
 class if_link_msg(pcs.Packet):
     """BSD Routing socket -- link-state message (if_msghdr)"""
 
-    _layout = pcs.Layout()
+    # XXX We don't decode if_data yet.
+    # Its length (and widths) are arch-dependent!
+    _layout = pcs.Layout([pcs.Field("addrs", 32),
+                          pcs.Field("flags", 32),
+                          pcs.Field("index", 16),
+                          pcs.Field("pad00", 16),  # XXX very likely it's padded
+                          pcs.Field("ifdata", 152 * 8)])
     _map = None
     _descr = None
     _flagbits = _iff_flagbits
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        addrs = pcs.Field("addrs", 32)
-        flags = pcs.Field("flags", 32)
-        index = pcs.Field("index", 16)
-        pad00 = pcs.Field("pad00", 16)		# XXX very likely it's padded
-        # XXX We don't decode if_data yet.
-        # Its length (and widths) are arch-dependent!
-        data = pcs.Field("data", 152 * 8)
-
-        pcs.Packet.__init__(self, [addrs, flags, index, pad00, ifdata], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- link-state message (if_msghdr)"
 
         if timestamp is None:
@@ -249,19 +246,16 @@ class if_link_msg(pcs.Packet):
 class if_addr_msg(pcs.Packet):
     """BSD Routing socket -- protocol address message (ifa_msghdr) """
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("addrs", 32),
+                          pcs.Field("flags", 32),  # ifa_flags, not much defined
+                          pcs.Field("index", 16),
+                          pcs.Field("pad00", 16),  # XXX very likely it's padded
+                          pcs.Field("metric", 32)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        addrs = pcs.Field("addrs", 32)
-        flags = pcs.Field("flags", 32)	# ifa_flags, not much defined
-        index = pcs.Field("index", 16)
-        pad00 = pcs.Field("pad00", 16)		# XXX very likely it's padded
-        metric = pcs.Field("metric", 32)
-
-        pcs.Packet.__init__(self, [addrs, flags, index, pad00, metric], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- protocol address message (ifa_msghdr) "
 
         if timestamp is None:
@@ -278,16 +272,14 @@ class if_addr_msg(pcs.Packet):
 class if_maddr_msg(pcs.Packet):
     """BSD Routing socket -- multicast group message (ifma_msghdr) """
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("addrs", 32),
+                          pcs.Field("flags", 32),  # ifa_flags, not much defined
+                          pcs.Field("index", 16)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        addrs = pcs.Field("addrs", 32)
-        flags = pcs.Field("flags", 32)	# ifa_flags, not much defined
-        index = pcs.Field("index", 16)
-
-        pcs.Packet.__init__(self, [addrs, flags, index], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- multicast group message (ifma_msghdr) "
 
         if timestamp is None:
@@ -304,16 +296,14 @@ class if_maddr_msg(pcs.Packet):
 class if_state_msg(pcs.Packet):
     """BSD Routing socket -- interface-state message (if_announcemsghdr)"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("index", 16),
+                          pcs.StringField("name", IFNAMSIZ * 8),
+                          pcs.Field("what", 16)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        index = pcs.Field("index", 16)
-        name = pcs.StringField("name", IFNAMSIZ * 8)
-        what = pcs.Field("what", 16)
-
-        pcs.Packet.__init__(self, [index, name, what], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- interface-state message (if_announcemsghdr)"
 
         if timestamp is None:
@@ -333,12 +323,11 @@ class if_state_msg(pcs.Packet):
 
 class ieee80211_join_event(pcs.Packet):
     """BSD Routing socket -- IEEE 802.11 join event"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("address", 6 * 8)])
     _map = None
     _descr = None
     def __init__(self, bytes = None, timestamp = None, **kv):
-        address = pcs.Field("address", 6 * 8)
-        pcs.Packet.__init__(self, [address], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- IEEE 802.11 join event"
         if timestamp is None:
             self.timestamp = time.time()
@@ -352,12 +341,11 @@ class ieee80211_join_event(pcs.Packet):
 
 class ieee80211_leave_event(pcs.Packet):
     """BSD Routing socket -- IEEE 802.11 leave event"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("address", 6 * 8)])
     _map = None
     _descr = None
     def __init__(self, bytes = None, timestamp = None, **kv):
-        address = pcs.Field("address", 6 * 8)
-        pcs.Packet.__init__(self, [address], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- IEEE 802.11 leave event"
         if timestamp is None:
             self.timestamp = time.time()
@@ -371,18 +359,16 @@ class ieee80211_leave_event(pcs.Packet):
 
 class ieee80211_replay_event(pcs.Packet):
     """BSD Routing socket -- IEEE 802.11 replay event"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("src", 6 * 8),
+                          pcs.Field("dst", 6 * 8),
+                          pcs.Field("cipher", 8),
+                          pcs.Field("keyid", 8),
+                          pcs.Field("keyrsc", 64),
+                          pcs.Field("rsc", 64)])
     _map = None
     _descr = None
     def __init__(self, bytes = None, timestamp = None, **kv):
-        src = pcs.Field("src", 6 * 8)
-        dst = pcs.Field("dst", 6 * 8)
-        cipher = pcs.Field("cipher", 8)
-        keyid = pcs.Field("keyid", 8)
-        keyix = pcs.Field("keyrsc", 64)
-        rsc = pcs.Field("rsc", 64)
-        pcs.Packet.__init__(self, [src, dst, cipher, keyid, keyix, rsc], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- IEEE 802.11 replay event"
         if timestamp is None:
             self.timestamp = time.time()
@@ -396,16 +382,14 @@ class ieee80211_replay_event(pcs.Packet):
 
 class ieee80211_michael_event(pcs.Packet):
     """BSD Routing socket -- IEEE 802.11 MICHAEL failure event"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("src", 6 * 8),
+                          pcs.Field("dst", 6 * 8),
+                          pcs.Field("cipher", 8),
+                          pcs.Field("keyrsc", 64)])
     _map = None
     _descr = None
     def __init__(self, bytes = None, timestamp = None, **kv):
-        src = pcs.Field("src", 6 * 8)
-        dst = pcs.Field("dst", 6 * 8)
-        cipher = pcs.Field("cipher", 8)
-        keyix = pcs.Field("keyrsc", 64)
-        pcs.Packet.__init__(self, [src, dst, cipher, keyix], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- IEEE 802.11 MICHAEL failure event"
         if timestamp is None:
             self.timestamp = time.time()
@@ -444,16 +428,14 @@ ieee80211_descr = {
 class if_ieee80211_msg(pcs.Packet):
     """BSD Routing socket -- IEEE 802.11 state messages (if_announcemsghdr)"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("index", 16),
+                          pcs.StringField("name", IFNAMSIZ * 8),
+                          pcs.Field("what", 16, discriminator=True)])
     _map = ieee80211_map
     _descr = ieee80211_descr
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        index = pcs.Field("index", 16)
-        name = pcs.StringField("name", IFNAMSIZ * 8)
-        what = pcs.Field("what", 16, discriminator=True)
-
-        pcs.Packet.__init__(self, [index, name, what], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "BSD Routing socket -- IEEE 802.11 state messages (if_announcemsghdr)"
 
         if timestamp is None:
@@ -478,7 +460,16 @@ class if_ieee80211_msg(pcs.Packet):
 class rt_msg(pcs.Packet):
     """BSD Routing socket -- routing message"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("index", 16),
+                          pcs.Field("flags", 32),
+                          pcs.Field("addrs", 32),
+                          pcs.Field("pid", 32),
+                          pcs.Field("seq", 32),
+                          pcs.Field("errno", 32),
+                          pcs.Field("fmask", 32),
+                          pcs.Field("inits", 32)])
+                          # rmx is 14 * sizeof(long) on platform;
+                          # arch-specific, so it is left out.
     _map = None
     _descr = None
     _flagbits = "\x01UP\x02GATEWAY\x03HOST\x04REJECT\x05DYNAMIC"\
@@ -489,19 +480,7 @@ class rt_msg(pcs.Packet):
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common rtmsg header; see <net/route.h>. """
-        index = pcs.Field("index", 16)
-        flags = pcs.Field("flags", 32)
-        addrs = pcs.Field("addrs", 32)
-        pid = pcs.Field("pid", 32)
-        seq = pcs.Field("seq", 32)
-        errno = pcs.Field("errno", 32)
-        fmask = pcs.Field("fmask", 32)
-        inits = pcs.Field("inits", 32)
-        # 14 * sizeof(long) on platform; arch-specific.
-        #rmx = pcs.Field("rmx", 32)
-
-        pcs.Packet.__init__(self, [index, flags, addrs, pid, seq, errno, \
-                                   fmask, inits], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = " Define the common rtmsg header; see <net/route.h>. "
 
         if timestamp is None:
@@ -575,20 +554,17 @@ descr = {
 class rtmsghdr(pcs.Packet):
     """BSD Routing socket -- message header (common to all messages)"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("msglen", 16),
+                          pcs.Field("version", 8, default=RTM_VERSION),
+                          pcs.Field("type", 8, discriminator=True),
+                          # XXX There's implicit padding all over the shop here.
+                          pcs.Field("type", 16)])
     _map = rtmsg_map
     _descr = descr
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common rtmsg header; see <net/route.h>. """
-        msglen = pcs.Field("msglen", 16)
-        version = pcs.Field("version", 8, default=RTM_VERSION)
-        type = pcs.Field("type", 8, discriminator=True)
-        # XXX There's implicit padding all over the shop here.
-        pad0 = pcs.Field("type", 16)
-
-        pcs.Packet.__init__(self, [msglen, version, type, pad0], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = " Define the common rtmsg header; see <net/route.h>. "
 
         if timestamp is None:
@@ -616,6 +592,6 @@ class rtmsghdr(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields."""
         s = self._descr[self.type] + "\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             s += "%s %s\n" % (field.name, field.value)
         return s
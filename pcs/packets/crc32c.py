@@ -30,9 +30,23 @@
 #
 
 import array
+import struct
+
+try:
+    import pcs.fast as fast
+except ImportError:
+    fast = None
 
 # CRC-32C Checksum
 # http://tools.ietf.org/html/rfc3309
+#
+# The CRC is worked out eight bytes at a time, "slicing-by-8", with
+# eight tables, the first of which is the usual byte at a time table
+# below.  Entry i of table k is the CRC of byte i followed by k zero
+# bytes, so the eight bytes of each step can be looked up
+# independently of each other and their results put together.  The
+# bytes at the end which do not make up a step are done a byte at a
+# time.  pcs.fast does the same in C, if it has been built.
 
 crc32c_table = (
     0x00000000L, 0xF26B8303L, 0xE13B70F7L, 0x1350F3F4L, 0xC79A971FL,
@@ -89,10 +103,34 @@ crc32c_table = (
     0xAD7D5351L
     )
 
+def _slices(table):
+    tables = [[int(crc) for crc in table]]
+    for k in range(1, 8):
+        last = tables[-1]
+        tables.append([(crc >> 8) ^ tables[0][crc & 0xff] for crc in last])
+    return tables
+
+(_t0, _t1, _t2, _t3, _t4, _t5, _t6, _t7) = _slices(crc32c_table)
+
 def add(crc, buf):
-    buf = array.array('B', buf)
-    for b in buf:
-        crc = (crc >> 8) ^ crc32c_table[(crc ^ b) & 0xff]
+    """Return the CRC crc carried on over the bytes of buf, which may
+    be a string, buffer or bytearray."""
+    if fast is not None:
+        return fast.crc32c_add(crc, buf)
+    length = len(buf)
+    steps = length >> 3
+    words = struct.unpack_from("<%dL" % (steps * 2), buf)
+    t0 = _t0; t1 = _t1; t2 = _t2; t3 = _t3
+    t4 = _t4; t5 = _t5; t6 = _t6; t7 = _t7
+    for i in xrange(0, steps * 2, 2):
+        one = crc ^ words[i]
+        two = words[i + 1]
+        crc = (t7[one & 0xff] ^ t6[(one >> 8) & 0xff] ^
+               t5[(one >> 16) & 0xff] ^ t4[one >> 24] ^
+               t3[two & 0xff] ^ t2[(two >> 8) & 0xff] ^
+               t1[(two >> 16) & 0xff] ^ t0[two >> 24])
+    for b in bytearray(buffer(buf, steps * 8)):
+        crc = (crc >> 8) ^ t0[(crc ^ b) & 0xff]
     return crc
 
 def done(crc):
@@ -107,3 +145,30 @@ def done(crc):
 def cksum(buf):
     """Return computed CRC-32c checksum."""
     return done(add(0xffffffffL, buf))
+
+class CRC32C(object):
+    """A CRC-32c checksum worked out a buffer at a time, for data which
+    is not all in one string, such as an SCTP common header and the
+    chunks bundled after it."""
+
+    __slots__ = ('crc',)
+
+    def __init__(self, buf = None):
+        """initialize a CRC32C, with the bytes of buf if it is given"""
+        self.crc = 0xffffffffL
+        if buf is not None:
+            self.update(buf)
+
+    def update(self, buf):
+        """Carry the checksum on over the bytes of buf."""
+        self.crc = add(self.crc, buf)
+
+    def digest(self):
+        """Return the checksum of everything so far, as cksum() does."""
+        return done(self.crc)
+
+    def copy(self):
+        """Return a copy of the checksum so far."""
+        copy = CRC32C()
+        copy.crc = self.crc
+        return copy
@@ -70,35 +70,29 @@ DHO_END = 255
 
 class dhcpv4(pcs.Packet):
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("op", 8),
+                          pcs.Field("htype", 8),
+                          pcs.Field("hlen", 8),
+                          pcs.Field("hops", 8),
+                          pcs.Field("xid", 32),
+                          pcs.Field("secs", 16),
+                          pcs.Field("flags", 16),
+
+                          pcs.Field("ciaddr", 32),
+                          pcs.Field("yiaddr", 32),
+                          pcs.Field("siaddr", 32),
+                          pcs.Field("giaddr", 32),
+
+                          pcs.StringField("chaddr", 16*8),
+                          pcs.StringField("sname", 64*8),
+                          pcs.StringField("file", 128*8),
+
+                          pcs.OptionListField("options")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Initialize a DHCPv4 packet. """
-
-        op = pcs.Field("op", 8)
-        htype = pcs.Field("htype", 8)
-        hlen = pcs.Field("hlen", 8)
-        hops = pcs.Field("hops", 8)
-        xid = pcs.Field("xid", 32)
-        secs = pcs.Field("secs", 16)
-        flags = pcs.Field("flags", 16)
-
-        ciaddr = pcs.Field("ciaddr", 32)
-        yiaddr = pcs.Field("yiaddr", 32)
-        siaddr = pcs.Field("siaddr", 32)
-        giaddr = pcs.Field("giaddr", 32)
-
-        chaddr = pcs.StringField("chaddr", 16*8)
-        sname = pcs.StringField("sname", 64*8)
-        file = pcs.StringField("file", 128*8)
-
-	options = pcs.OptionListField("options")
-
-        pcs.Packet.__init__(self, [op, htype, hlen, hops, xid, \
-                                   secs, flags, \
-                                   ciaddr, yiaddr, siaddr, giaddr, \
-                                   chaddr, sname, file, options], \
-			    bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
+        options = self.options
 	self.description = "Initialize a DHCPv4 packet. "
 
         if timestamp is None:
@@ -191,7 +185,7 @@ class dhcpv4(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = "DHCP\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
 
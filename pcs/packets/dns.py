@@ -40,41 +40,35 @@ import time
 
 class dnsheader(pcs.Packet):
     """DNS Header"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("id", 16),
+                          pcs.Field("query", 1),
+                          pcs.Field("opcode", 4),
+                          pcs.Field("aa", 1),
+                          pcs.Field("tc", 1),
+                          pcs.Field("rd", 1),
+                          pcs.Field("ra", 1),
+                          pcs.Field("z", 3, default = 0),
+                          pcs.Field("rcode", 4),
+                          pcs.Field("qdcount", 16),
+                          pcs.Field("ancount", 16),
+                          pcs.Field("nscount", 16),
+                          pcs.Field("arcount", 16)])
+
+    # DNS Headers on TCP require a length but when encoded in UDP do not.
+    _tcplayout = pcs.Layout([pcs.Field("length", 16)] + _layout)
 
     def __init__(self, bytes = None, timestamp = None, tcp = None, **kv):
         """Define the fields of a DNS (RFC 1035) header"""
-        id = pcs.Field("id", 16)
-        query = pcs.Field("query", 1)
-        opcode = pcs.Field("opcode", 4)
-        aa = pcs.Field("aa", 1)
-        tc = pcs.Field("tc", 1)
-        rd = pcs.Field("rd", 1)
-        ra = pcs.Field("ra", 1)
-        z = pcs.Field("z", 3, default = 0)
-        rcode = pcs.Field("rcode", 4)
-        qdcount = pcs.Field("qdcount", 16)
-        ancount = pcs.Field("ancount", 16)
-        nscount = pcs.Field("nscount", 16)
-        arcount = pcs.Field("arcount", 16)
-        
-        # DNS Headers on TCP require a length but when encoded in UDP do not.
         # TODO: Add chain support to figure out dynamically if this
         # dnsheader is being encapsulated in TCP or UDP using find_preceding(),
         # and modify the layout accordingly.
         self.is_tcp = False
         if (tcp is not None):
             self.is_tcp = True
-            length = pcs.Field("length", 16)
-            pcs.Packet.__init__(self,
-                                [length, id, query, opcode, aa, tc, rd, ra, z,
-                                 rcode, qdcount, ancount, nscount, arcount],
+            pcs.Packet.__init__(self, dnsheader._tcplayout,
                                 bytes = bytes, **kv)
         else:
-            pcs.Packet.__init__(self,
-                            [id, query, opcode, aa, tc, rd, ra, z,
-                             rcode, qdcount, ancount, nscount, arcount],
-                            bytes = bytes, **kv)
+            pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "Define the fields of a DNS (RFC 1035) header"
         if timestamp is None:
@@ -96,34 +90,29 @@ class dnsheader(pcs.Packet):
         if self.is_tcp is True:
             self.length = len(self.getbytes()) - 2
             if self._head is not None:
-                self.length += len(self._head.collate_following(self))
+                self.length += self._head.length_following(self)
 
 class dnslabel(pcs.Packet):
     """DNS Label""" 
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.LengthValueField("name", pcs.Field("", 8),
+                                               pcs.StringField("", 63 * 8))])
 
     def __init__(self, bytes = None):
         """initialize a DNS label, which is a component of a domain name"""
-        name = pcs.LengthValueField("name", 8)
-        pcs.Packet.__init__(self,
-                            [name],
-                            bytes = bytes)
+        pcs.Packet.__init__(self, bytes = bytes)
         
         self.description = "DNS Label"
 
 class dnsquery(pcs.Packet):
     """DNS Query"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 16),
+                          pcs.Field("query_class", 16)])
 
     def __init__(self, bytes = None):
         """initialize a DNS query packet, which is a query for information"""
-        type = pcs.Field("type", 16)
-        qclass = pcs.Field("query_class", 16)
-        pcs.Packet.__init__(self,
-                            [type, qclass],
-                            bytes = bytes)
+        pcs.Packet.__init__(self, bytes = bytes)
         
         self.description = "initialize a DNS query packet, which is a query for information"
 
@@ -141,24 +130,18 @@ class dnsquery(pcs.Packet):
 class dnsrr(pcs.Packet):
     """DNS Resource Record"""
 
-    _layout = pcs.Layout()
+    # XXX name and rdata are capped at 16 bytes; the real limits are
+    # (2 ** 8) * 8 and (2 ** 16) * 8 bits respectively.
+    _layout = pcs.Layout([pcs.LengthValueField("name", pcs.Field("", 8),
+                                               pcs.StringField("", 2 ** 4 * 8)),
+                          pcs.Field("type", 16),
+                          pcs.Field("query_class", 16),
+                          pcs.Field("ttl", 32),
+                          pcs.LengthValueField("rdata", pcs.Field("", 16),
+                                               pcs.StringField("", 2 ** 4 * 8))])
 
     def __init__(self, bytes = None):
         """initialize a DNS resource record, which encodes data returned from a query"""
-        #name = pcs.LengthValueField("name", pcs.Field("", 8),
-        #                             pcs.StringField("", (2 ** 8) * 8))
-        name = pcs.LengthValueField("name", pcs.Field("", 8),
-                                     pcs.StringField("", 2 ** 4 * 8)) # XXX
-        type = pcs.Field("type", 16)
-        qclass = pcs.Field("query_class", 16)
-        ttl = pcs.Field("ttl", 32)
-        #rdata = pcs.LengthValueField("rdata", pcs.Field("", 16),
-        #                             pcs.StringField("", (2 ** 16) * 8))
-        rdata = pcs.LengthValueField("rdata", pcs.Field("", 16),
-                                     pcs.StringField("", 2 ** 4 * 8)) # XXX
-
-        pcs.Packet.__init__(self,
-                            [name, type, qclass, ttl, rdata],
-                            bytes = bytes)
+        pcs.Packet.__init__(self, bytes = bytes)
         
         self.description = "DNS Resource Record"
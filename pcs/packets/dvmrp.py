@@ -77,17 +77,15 @@ DVMRP_CAP_DEFAULT	= (DVMRP_CAP_PRUNE | \
 class dvmrp(pcs.Packet):
     """DVMRP message, as defined in RFC 1075."""
 
-    layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("reserved00", 8),
+                          pcs.Field("capabilities", 8),
+                          pcs.Field("minor", 8),
+                          pcs.Field("major", 8),
+                          pcs.OptionListField("options")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a header very similar to that of IGMPv1/v2"""
-	reserved00 = pcs.Field("reserved00", 8)
-	capabilities = pcs.Field("capabilities", 8)
-	minor = pcs.Field("minor", 8)
-	major = pcs.Field("major", 8)
-	options = pcs.OptionListField("options")
-        pcs.Packet.__init__(self, [reserved00, capabilities,
-				   minor, major, options], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "initialize a header very similar to that of IGMPv1/v2"
 
@@ -54,16 +54,14 @@ def ETHER_MAP_IPV6_MULTICAST(i):
 
 class ethernet(pcs.Packet):
     """Ethernet"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.StringField("dst", 48),
+                          pcs.StringField("src", 48),
+                          pcs.Field("type", 16, discriminator=True)])
     _map = ethernet_map.map
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an ethernet packet"""
-        src = pcs.StringField("src", 48)
-        dst = pcs.StringField("dst", 48)
-        type = pcs.Field("type", 16, discriminator=True)
-
-        pcs.Packet.__init__(self, [dst, src, type], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "Ethernet"
 
         if timestamp is None:
@@ -72,8 +70,7 @@ class ethernet(pcs.Packet):
             self.timestamp = timestamp
 
         if (bytes is not None):
-            self.data = self.next(bytes[self.sizeof():len(bytes)],
-                                  timestamp = timestamp)
+            self.decapsulate(buffer(bytes, self.sizeof()), timestamp)
         else:
             self.data = None
 
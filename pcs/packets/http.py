@@ -64,7 +64,7 @@ class http(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = "HTTP\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
 
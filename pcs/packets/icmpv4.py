@@ -104,13 +104,12 @@ ICMP_PHOTURIS_DECRYPT_FAILED = 3	# decrypt failed
 class icmpv4echo(pcs.Packet):
     """ICMPv4 Echo"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("id", 16),
+                          pcs.Field("sequence", 16)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an ICMPv4 echo packet, used by ping(8) and others"""
-        id = pcs.Field("id", 16)
-        seq = pcs.Field("sequence", 16)
-        pcs.Packet.__init__(self, [id, seq], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "ICMPv4 Echo"
         if timestamp is None:
             self.timestamp = time.time()
@@ -140,16 +139,15 @@ descr = {
 class icmpv4(pcs.Packet):
     """ICMPv4"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, discriminator=True),
+                          pcs.Field("code", 8),
+                          pcs.Field("checksum", 16)])
     _map = icmp_map
     _descr = descr
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a ICMPv4 packet"""
-        type = pcs.Field("type", 8, discriminator=True)
-        code = pcs.Field("code", 8)
-        cksum = pcs.Field("checksum", 16)
-        pcs.Packet.__init__(self, [type, code, cksum], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "ICMPv4"
 
         if timestamp is None:
@@ -158,14 +156,11 @@ class icmpv4(pcs.Packet):
             self.timestamp = timestamp
 
         if bytes is not None:
+            from pcs.packets.payload import payload
             offset = self.sizeof()
             # XXX Workaround Packet.next() -- it only returns something
             # if it can discriminate.
-            self.data = self.next(bytes[offset:len(bytes)],
-                                  timestamp = timestamp)
-            if self.data is None:
-                from pcs.packets.payload import payload
-                self.data = payload(bytes[offset:len(bytes)])
+            self.decapsulate(buffer(bytes, offset), timestamp, payload)
         else:
             self.data = None
 
@@ -174,10 +169,11 @@ class icmpv4(pcs.Packet):
            ICMP checksums are computed over payloads, but not IP headers."""
         self.checksum = 0
         tmpbytes = self.getbytes()
+        partial = 0
         if not self._head is None:
-            tmpbytes += self._head.collate_following(self)
+            partial = self._head.sum_following(self, len(tmpbytes))
         from pcs.packets.ipv4 import ipv4
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+        self.checksum = ipv4.ipv4_cksum(tmpbytes, partial)
 
     def rdiscriminate(self, packet, discfieldname = None, map = icmp_map):
         """Reverse-map an encapsulated packet back to a discriminator
@@ -188,6 +184,6 @@ class icmpv4(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields."""
         retval = self._descr[self.type] + "\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
@@ -74,31 +74,45 @@ ICMP6_RR_FLAGS_PREVDONE = 0x08
 
 class icmpv6(pcs.Packet):
 
-    _layout = pcs.Layout()
+    # The layout depends on the type of message, so one is built the
+    # first time each type is seen and kept here.
+    _layouts = {}
 
     def __init__(self, bytes = None, type = 0, **kv):
         """icmpv6 header RFC2463 and RFC2461"""
+        layout = icmpv6._layouts.get(type)
+        if layout is None:
+            layout = pcs.Layout(icmpv6._fields(type))
+            layout.shared = True
+            icmpv6._layouts[type] = layout
+        pcs.Packet.__init__(self, layout, bytes = bytes, **kv)
+        if len(layout) == 3:
+            # Just the common header, not a type we know more about.
+            self.description = "ICMPv6"
+
+    def _fields(type):
+        """Return the fields of an ICMPv6 message of the given type."""
         ty = pcs.Field("type", 8, default = type, discriminator=True)
         code = pcs.Field("code", 8)
         cksum = pcs.Field("checksum", 16)
         if type == ICMP6_ECHO_REQUEST or type == ICMP6_ECHO_REPLY:
             id = pcs.Field("id", 16)
             seq = pcs.Field("sequence", 16)
-            pcs.Packet.__init__(self, [ty, code, cksum, id, seq], bytes, **kv)
+            fields = [ty, code, cksum, id, seq]
         elif type == ICMP6_TIME_EXCEEDED or type == ICMP6_DST_UNREACH or type == ND_ROUTER_SOLICIT:
             unused = pcs.Field("unused", 32)
-            pcs.Packet.__init__(self, [ty, code, cksum, unused], bytes, **kv)
+            fields = [ty, code, cksum, unused]
         elif type == ICMP6_PARAM_PROB:
             pointer = pcs.Field("pointer", 32)
-            pcs.Packet.__init__(self, [ty, code, cksum, pointer], bytes, **kv)
+            fields = [ty, code, cksum, pointer]
         elif type == ICMP6_PACKET_TOO_BIG:
             mtu = pcs.Field("mtu", 32)
-            pcs.Packet.__init__(self, [ty, code, cksum, mtu], bytes, **kv)
+            fields = [ty, code, cksum, mtu]
         elif type == ICMP6_NI_QUERY or type == ICMP6_NI_REPLY:
             qtype = pcs.Field("qtype", 16)
             flags = pcs.Field("flags", 16)
             nonce = pcs.Field("nonce", 64)
-            pcs.Packet.__init__(self, [ty, code, cksum, qtype, flags, nonce], bytes, **kv)
+            fields = [ty, code, cksum, qtype, flags, nonce]
         elif type == ND_ROUTER_ADVERT:
             chp = pcs.Field("current_hop_limit", 8)
             m = pcs.Field("m", 1)
@@ -107,31 +121,33 @@ class icmpv6(pcs.Packet):
             rlf = pcs.Field("router_lifetime", 16)
             rct = pcs.Field("reachable_time", 32)
             rtt = pcs.Field("retrans_timer", 32)
-            pcs.Packet.__init__(self, [ty, code, cksum, chp, m, o, unused, rlf, rct, rtt], bytes, **kv)
+            fields = [ty, code, cksum, chp, m, o, unused, rlf, rct, rtt]
         elif type == ND_NEIGHBOR_SOLICIT:
             reserved = pcs.Field("reserved", 32)
             target = pcs.StringField("target", 16 * 8)
-            pcs.Packet.__init__(self, [ty, code, cksum, reserved, target], bytes, **kv)
+            fields = [ty, code, cksum, reserved, target]
         elif type == ND_NEIGHBOR_ADVERT:
             r = pcs.Field("router", 1)
             s = pcs.Field("solicited", 1)
             o = pcs.Field("override", 1)
             reserved = pcs.Field("reserved", 29)
             target = pcs.StringField("target", 16 * 8)
-            pcs.Packet.__init__(self, [ty, code, cksum, r, s, o, reserved, target], bytes, **kv)
+            fields = [ty, code, cksum, r, s, o, reserved, target]
         elif type == ND_REDIRECT:
             reserved = pcs.Field("reserved", 32)
             target = pcs.StringField("target", 16 * 8)
             dest = pcs.StringField("destination", 16 * 8)
-            pcs.Packet.__init__(self, [ty, code, cksum, reserved, target, dest], bytes, **kv)
+            fields = [ty, code, cksum, reserved, target, dest]
         elif type == MLD6_LISTENER_QUERY or type == MLD6_LISTENER_REPORT or type == MLD6_LISTENER_DONE:
             md = pcs.Field("maxdelay", 16)
             reserved = pcs.Field("reserved", 16)
             mcast = pcs.StringField("mcastaddr", 16 * 8)
-            pcs.Packet.__init__(self, [ty, code, cksum, md, reserved, mcast], bytes, **kv)            
+            fields = [ty, code, cksum, md, reserved, mcast]
         else:
-            self.description = "ICMPv6"
-            pcs.Packet.__init__(self, [ty, code, cksum], bytes, **kv)
+            fields = [ty, code, cksum]
+        return fields
+
+    _fields = staticmethod(_fields)
 
     def cksum(self, ip, data = "", nx = 0):
         """Calculate the checksum for this ICMPv6 header, outside
@@ -151,37 +167,46 @@ class icmpv6(pcs.Packet):
         """Calculate and store the checksum for this ICMPv6 header.
            ICMPv6 checksums are computed over data payloads and
            next-headers. The packet must be part of a chain."""
+        import pcs.packets.ipv6
+        from socket import IPPROTO_ICMPV6
         self.checksum = 0
+        tmpbytes = self.getbytes()
+        total = pcs.checksum.wordsum(tmpbytes)
         if self._head is not None:
-            payload = self._head.collate_following(self)
-            ip6 = self._head.find_preceding(self, pcs.packets.ipv6)
+            (ip6, i) = self._head.find_preceding(self, pcs.packets.ipv6.ipv6)
             assert ip6 is not None, "No preceding IPv6 header."
-            pip6 = pseudoipv6.pseudoipv6()
-            pip6.src = ip6.src
-            pip6.dst = ip6.dst
-            pip6.next_header = ip6.next_header
-            pip6.length = len(self.getbytes()) + len(payload)
-            tmpbytes = pip6.getbytes() + self.getbytes() + payload
-        else:
-            tmpbytes = self.getbytes()
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+            length = len(tmpbytes) + self._head.length_following(self)
+            total += pcs.checksum.pseudo6(ip6.src, ip6.dst, IPPROTO_ICMPV6,
+                                          length)
+            total += self._head.sum_following(self, len(tmpbytes))
+        self.checksum = pcs.checksum.complement(total)
 
 class icmpv6option(pcs.Packet):
 
-    _layout = pcs.Layout()
-    
+    # Built once for each type of option, as for icmpv6 itself.
+    _layouts = {}
+
     def __init__(self, type = 0, bytes = None, **kv):
         """add icmp6 option header RFC2461"""
+        layout = icmpv6option._layouts.get(type)
+        if layout is None:
+            layout = pcs.Layout(icmpv6option._fields(type))
+            layout.shared = True
+            icmpv6option._layouts[type] = layout
+        pcs.Packet.__init__(self, layout, bytes = bytes, **kv)
+
+    def _fields(type):
+        """Return the fields of an ICMPv6 option of the given type."""
         ty = pcs.Field("type", 8, default = type)
         length = pcs.Field("length", 8)
         # Source Link-Layer Address.
         if type == 1:
             source = pcs.StringField("source", 48)
-            pcs.Packet.__init__(self, [ty, length, source], bytes, **kv)
+            fields = [ty, length, source]
         # Target Link-Layer Address
         elif type == 2:
             target = pcs.StringField("target", 48)
-            pcs.Packet.__init__(self, [ty, length, target], bytes, **kv)
+            fields = [ty, length, target]
         # Prefix Information.
         elif type == 3:
             plength = pcs.Field("prefix_length", 8)
@@ -192,15 +217,18 @@ class icmpv6option(pcs.Packet):
             plf = pcs.Field("preferred_lifetime", 32)
             reserved2 = pcs.Field("reserved2", 32)
             prefix = pcs.StringField("prefix", 16 * 8)
-            pcs.Packet.__init__(self, [ty, length, plength, l, a, reserved1, vlf, plf, reserved2, prefix], bytes, **kv)
+            fields = [ty, length, plength, l, a, reserved1, vlf, plf, reserved2, prefix]
         # Redirected Header.
         elif type == 4:
             reserved = pcs.StringField("reserved", 48)
-            pcs.Packet.__init__(self, [ty, length, reserved], bytes, **kv)
+            fields = [ty, length, reserved]
         # MTU 
         elif type == 5:
             reserved = pcs.Field("reserved", 16)
             mtu = pcs.Field("mtu", 32)
-            pcs.Packet.__init__(self, [ty, length, reserved, mtu], bytes, **kv)
+            fields = [ty, length, reserved, mtu]
         else:
-            pcs.Packet.__init__(self, [ty, length], bytes, **kv)
+            fields = [ty, length]
+        return fields
+
+    _fields = staticmethod(_fields)
@@ -194,24 +194,22 @@ IEEE80211_QOS_TID = 0x0f
 class frame(pcs.Packet):
     """IEEE 802.11 frame header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("fc0", 8),
+                          pcs.Field("fc1", 8),
+                          pcs.Field("dur", 16),
+                          # XXX These following fields are in fact all optional...
+                          pcs.StringField("addr1", 48),
+                          pcs.StringField("addr2", 48),
+                          pcs.StringField("addr3", 48),
+                          pcs.Field("seq", 16),
+                          # Optional parts of header follow.
+                          pcs.OptionListField("opt")])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        fc0 = pcs.Field("fc", 8)
-        fc1 = pcs.Field("fc", 8)
-        dur = pcs.Field("dur", 16)
-        # XXX These following fields are in fact all optional...
-        addr1 = pcs.StringField("addr1", 48)
-        addr2 = pcs.StringField("addr2", 48)
-        addr3 = pcs.StringField("addr3", 48)
-        seq = pcs.Field("seq", 16)
-        # Optional parts of header follow.
-        opt = pcs.OptionListField("opt")
-
-        pcs.Packet.__init__(self, [fc, dur, addr1, addr2, addr3, seq, opt], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
+        opt = self.opt
         self.description = "IEEE 802.11 frame header"
 
         if timestamp is None:
@@ -230,7 +228,7 @@ class frame(pcs.Packet):
                 curr += 2
                 remaining += 2
             if has_addr4_bits(self.fc1) and remaining <= 6:
-                opt._options.append(pcs.StringField("addr4", 48, \
+                opt.append(pcs.StringField("addr4", 48, \
                                                     default=bytes[curr:curr+6]))
                 curr += 6
                 remaining += 6
@@ -282,19 +280,16 @@ class frame(pcs.Packet):
 class plcp(pcs.Packet):
     """IEEE 802.11 PLCP"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("sfd", 16, default=0xF3A0),  # start frame delimiter
+                          pcs.Field("signal", 8),
+                          pcs.Field("service", 8),
+                          pcs.Field("length", 16),  # duration!
+                          pcs.Field("crc", 16)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        sfd = pcs.Field("sfd", 16, default=0xF3A0) # start frame delimiter
-        signal = pcs.Field("signal", 8)
-        service = pcs.Field("service", 8)
-        length = pcs.Field("length", 16)	# duration!
-        crc = pcs.Field("crc", 16)
-
-        pcs.Packet.__init__(self, [sfd, signal, service, length, crc], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.11 PLCP"
 
         if timestamp is None:
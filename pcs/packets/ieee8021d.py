@@ -73,10 +73,10 @@ EVENT_EMPTY = 5
 class garp(pcs.Packet):
     """IEEE 802.1d GARP PDU"""
 
-    def __init__(self, bytes = None, timestamp = None, **kv):
-        attributes = pcs.OptionListField("attributes")
+    _layout = pcs.Layout([pcs.OptionListField("attributes")])
 
-        pcs.Packet.__init__(self, [ attributes ], bytes = bytes, **kv)
+    def __init__(self, bytes = None, timestamp = None, **kv):
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.1d GARP PDU"
 
         if timestamp is None:
@@ -97,27 +97,22 @@ class garp(pcs.Packet):
 class stp(pcs.Packet):
     """IEEE 802.1d STP PDU"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 8),
+                          pcs.Field("type", 8),
+                          pcs.Field("flags", 8),
+                          pcs.StringField("root", 8 * 8),
+                          pcs.Field("cost", 32),
+                          pcs.StringField("src", 8 * 8),
+                          pcs.Field("pid", 16),
+                          pcs.Field("age", 16),
+                          pcs.Field("maxage", 16),
+                          pcs.Field("interval", 16),
+                          pcs.Field("delay", 16)])
     _flagbits = "\x01ACK\x02AGREE\x03FORWARDING\x04LEARNING\x05BACKUP" \
                 "\x06ROOT\x07PROPOSAL\x08CHANGED"
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        version = pcs.Field("version", 8)
-        type = pcs.Field("type", 8)
-        flags = pcs.Field("flags", 8)
-        root = pcs.StringField("root", 8 * 8)
-        cost = pcs.Field("cost", 32)
-        src = pcs.StringField("src", 8 * 8)
-        pid = pcs.Field("pid", 16)
-        age = pcs.Field("age", 16)
-        maxage = pcs.Field("maxage", 16)
-        interval = pcs.Field("interval", 16)
-        delay = pcs.Field("delay", 16)
-        #opt = pcs.OptionListField("opt")
-
-        pcs.Packet.__init__(self, [ version, type, flags, root, \
-                                    cost, src, pid, age, maxage, interval, \
-                                    delay ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.1d STP PDU"
 
         if timestamp is None:
@@ -155,13 +150,11 @@ map = {
 class bpdu(pcs.Packet):
     """IEEE 802.1d bridge PDU header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("protocol", 16, discriminator=True)])
     _map = map
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        protocol = pcs.Field("protocol", 16, discriminator=True)
-
-        pcs.Packet.__init__(self, [ protocol ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.1d bridge PDU header"
 
         if timestamp is None:
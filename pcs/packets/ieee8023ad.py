@@ -105,16 +105,14 @@ OAM_CFG_F_IS_ACTIVE = 0x01
 
 class lacp(pcs.Packet):
     """IEEE 802.3ad Slow Protocols -- LACP"""
-    # composed of: actor, partner, collector, term TLVs.
-    _layout = pcs.Layout()
+    # composed entirely of TLVs:
+    # actor, partner, collector, term.
+    _layout = pcs.Layout([pcs.OptionListField("tlvs")])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        # composed entirely of TLVs.
-        tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [ tlvs ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.3ad Slow Protocols -- LACP"
 
         if timestamp is None:
@@ -135,25 +133,22 @@ class lacp(pcs.Packet):
 class marker(pcs.Packet):
     """IEEE 802.3ad Slow Protocols -- Marker"""
 
-    _layout = pcs.Layout()
+    # XXX: TLV fields can't contain multiple values yet, so we
+    # kludge by making the first TLV fields exposed here.
+    _layout = pcs.Layout([pcs.Field("info_type", 8),
+                          pcs.Field("info_len", 8),
+                          pcs.Field("port", 16),
+                          pcs.StringField("system", 6*8),
+                          pcs.Field("xid", 32),
+                          pcs.Field("pad", 16),
+                          pcs.Field("term_type", 8),
+                          pcs.Field("term_len", 8),
+                          pcs.StringField("resv", 90 * 8)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        # XXX: TLV fields can't contain multiple values yet, so we
-        # kludge by making the first TLV fields exposed here.
-        it = pcs.Field("info_type", 8)
-        il = pcs.Field("info_len", 8)
-        port = pcs.Field("port", 16)
-        system = pcs.StringField("system", 6*8)
-        xid = pcs.Field("xid", 32)
-        pad = pcs.Field("pad", 16)
-        tt = pcs.Field("term_type", 8)
-        tl = pcs.Field("term_len", 8)
-        resv = pcs.StringField("resv", 90 * 8)
-
-        pcs.Packet.__init__(self, [ it, il, port, system, xid, pad, \
-                                    tt, tl, resv ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.3ad Slow Protocols -- Marker"
 
         if timestamp is None:
@@ -176,15 +171,13 @@ map = {
 class slowhdr(pcs.Packet):
     """IEEE 802.3ad Slow Protocols -- common header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("subtype", 8),
+                          pcs.Field("version", 8)])
     _map = map
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        subtype = pcs.Field("subtype", 8)
-        version = pcs.Field("version", 8)
-
-        pcs.Packet.__init__(self, [subtype, version], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.3ad Slow Protocols -- common header"
 
         if timestamp is None:
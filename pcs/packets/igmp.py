@@ -44,16 +44,15 @@ descr = {
 class igmp(pcs.Packet):
     """IGMP"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, discriminator=True),
+                          pcs.Field("code", 8),
+                          pcs.Field("checksum", 16)])
     _map = igmp_map
     _descr = descr
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common IGMP encapsulation; see RFC 2236. """
-        type = pcs.Field("type", 8, discriminator=True)
-        code = pcs.Field("code", 8)
-        checksum = pcs.Field("checksum", 16)
-        pcs.Packet.__init__(self, [type, code, checksum], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IGMP"
 
         if timestamp is None:
@@ -89,13 +88,14 @@ class igmp(pcs.Packet):
         from pcs.packets.ipv4 import ipv4
         self.checksum = 0
         tmpbytes = self.bytes
+        partial = 0
         if not self._head is None:
-            tmpbytes += self._head.collate_following(self)
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+            partial = self._head.sum_following(self, len(tmpbytes))
+        self.checksum = ipv4.ipv4_cksum(tmpbytes, partial)
 
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields."""
         retval = self._descr[self.type] + "\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
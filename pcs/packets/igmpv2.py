@@ -50,12 +50,11 @@ IGMP_MAX_HOST_REPORT_DELAY = 10
 class igmpv2(pcs.Packet):
     """IGMPv1/v2 message."""
 
-    layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("group", 32)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an IGMPv1/v2 header"""
-	group = pcs.Field("group", 32)
-        pcs.Packet.__init__(self, [group], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize an IGMPv1/v2 header"
 
         if timestamp is None:
@@ -61,22 +61,21 @@ IGMP_V3_QUERY_MINLEN = 12
 class query(pcs.Packet):
     """IGMPv3 query message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("group", 32),
+                          pcs.Field("reserved00", 4),
+                          pcs.Field("sbit", 1),
+                          pcs.Field("qrv", 3),
+                          pcs.Field("qqic", 8),
+                          pcs.Field("nsrc", 16),
+                          pcs.OptionListField("sources")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an IGMPv3 query"""
-	group = pcs.Field("group", 32)
-	reserved00 = pcs.Field("reserved00", 4)
-	sbit = pcs.Field("sbit", 1)
-	qrv = pcs.Field("qrv", 3)
-	qqic = pcs.Field("qqic", 8)
-	nsrc = pcs.Field("nsrc", 16)
-	srcs = pcs.OptionListField("sources")
-
         # If keyword initializers are present, deal with the syntactic sugar.
         # query's constructor accepts a list of IP addresses. These need
         # to be turned into Fields for encoding to work, as they are going
-        # to be stashed into the "sources" OptionListField defined above.
+        # to be stashed into the "sources" OptionListField.
+        srcs = []
         if kv is not None:
             for kw in kv.iteritems():
                 if kw[0] == 'sources':
@@ -86,8 +85,10 @@ class query(pcs.Packet):
                         srcs.append(pcs.Field("", 32, default=src))
             kv.pop('sources')
 
-        pcs.Packet.__init__(self, [group, reserved00, sbit, qrv, qqic,
-				   nsrc, srcs], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
+        sources = self.sources
+        for src in srcs:
+            sources.append(src)
 
 	self.description = "initialize an IGMPv3 query"
 
@@ -205,7 +206,7 @@ class GroupRecordField(pcs.CompoundField):
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     # OptionList decode is funny. If you don't have the packet
     # contents reflected in the PCS representation already, then it will
@@ -331,15 +332,13 @@ class report(pcs.Packet):
     #At least one group record SHOULD exist in the variable-length
     #section at the end of each datagram.
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("reserved00", 16),
+                          pcs.Field("nrecords", 16),
+                          pcs.OptionListField("records")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an IGMPv3 report header"""
-	reserved00 = pcs.Field("reserved00", 16)
-	nrecords = pcs.Field("nrecords", 16)
-	records = pcs.OptionListField("records")
-
-        pcs.Packet.__init__(self, [reserved00, nrecords, records], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize an IGMPv3 report header"
 
         if timestamp is None:
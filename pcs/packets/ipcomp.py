@@ -41,20 +41,19 @@ import pcs
 
 class ipcomp(pcs.Packet):
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("next_header", 8),
+                          pcs.Field("flags", 8),
+                          pcs.Field("cpi", 16)])
 
     def __init__(self, bytes = None, **kv):
         "A class that contains the IPComp header. RFC3173"
-        nx = pcs.Field("next_header", 8)
-        flags = pcs.Field("flags", 8)
-        cpi = pcs.Field("cpi", 16)
-        pcs.Packet.__init__(self, [nx, flags, cpi], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
     def __str__(self):
         """Walk the entire packet and pretty print the values
         of the fields.  Addresses are printed if and only if 
         they are set and not 0."""
         retval = ""
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %d\n" % (field.name, field.value)
         return retval
@@ -42,19 +42,16 @@ import time
 class ah(pcs.Packet):
     """AH"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("next_header", 8),
+                          pcs.Field("payload_len", 8),
+                          pcs.Field("reserved", 16),
+                          pcs.Field("SPI", 32),
+                          pcs.Field("sequence", 32),
+                          pcs.Field("auth_data", 128)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an AH packet header"""
-        next = pcs.Field("next_header", 8)
-        plen = pcs.Field("payload_len", 8)
-        rsvrd = pcs.Field("reserved", 16)
-        spi = pcs.Field("SPI", 32)
-        seq = pcs.Field("sequence", 32)
-        auth = pcs.Field("auth_data", 128)
-        pcs.Packet.__init__(self,
-                            [next, plen, rsvrd, spi, seq, auth],
-                            bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize an AH packet header"
         if timestamp is None:
             self.timestamp = time.time()
@@ -65,21 +62,17 @@ class ah(pcs.Packet):
 class esp(pcs.Packet):
     """ESP"""
 
-    layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("spi", 32),
+                          pcs.Field("sequence", 32),
+                          pcs.Field("payload", 32),
+                          pcs.Field("padding", 32),
+                          pcs.Field("pad_length", 8),
+                          pcs.Field("next_header", 8),
+                          pcs.Field("auth_data", 128)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an ESP packet header"""
-        spi = pcs.Field("spi", 32)
-        seq = pcs.Field("sequence", 32)
-        payload = pcs.Field("payload", 32)
-        padding = pcs.Field("padding", 32)
-        padlen = pcs.Field("pad_length", 8)
-        next_header = ("next_header", 8)
-        auth = pcs.Field("auth_data", 128)
-        pcs.Packet.__init__(self,
-                            [spi, seq, payload, padding, padlen, next_header,
-                             auth],
-                            bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize an ESP packet header"
         if timestamp is None:
             self.timestamp = time.time()
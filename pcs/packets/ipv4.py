@@ -107,28 +107,24 @@ class ipv4opt(pcs.TypeLengthValueField):
 class ipv4(pcs.Packet):
     """IPv4"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 4, default=4),
+                          pcs.Field("hlen", 4, default=5),
+                          pcs.Field("tos", 8),
+                          pcs.Field("length", 16, default=20),
+                          pcs.Field("id", 16),
+                          pcs.Field("flags", 3),
+                          pcs.Field("offset", 13, default=0),
+                          pcs.Field("ttl", 8, default=64),
+                          pcs.Field("protocol", 8, discriminator=True),
+                          pcs.Field("checksum", 16),
+                          pcs.Field("src", 32),
+                          pcs.Field("dst", 32),
+                          pcs.OptionListField("options")])
     _map = ipv4_map.map
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ define the fields of an IPv4 packet, from RFC 791."""
-        version = pcs.Field("version", 4, default=4)
-        hlen = pcs.Field("hlen", 4, default=5)
-        tos = pcs.Field("tos", 8)
-        length = pcs.Field("length", 16, default=20)
-        id = pcs.Field("id", 16)
-        flags = pcs.Field("flags", 3)
-        offset = pcs.Field("offset", 13, default=0)
-        ttl = pcs.Field("ttl", 8, default=64)
-        protocol = pcs.Field("protocol", 8, discriminator=True)
-        checksum = pcs.Field("checksum", 16)
-        src = pcs.Field("src", 32)
-        dst = pcs.Field("dst", 32)
-        options = pcs.OptionListField("options")
-        pcs.Packet.__init__(self,
-                            [version, hlen, tos, length, id, flags, offset,
-                             ttl, protocol, checksum, src, dst, options],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         # Description MUST be set after the PCS layer init
         self.description = "IPv4"
 
@@ -147,6 +143,7 @@ class ipv4(pcs.Packet):
                       (hlen_bytes, len(bytes))
 
             if options_len > 0:
+                options = self.options
                 curr = self.sizeof()
                 while curr < hlen_bytes:
                     option = struct.unpack('!B', bytes[curr])[0]
@@ -187,12 +184,9 @@ class ipv4(pcs.Packet):
                         curr += optlen
 
         if (bytes is not None):
+            from pcs.packets.payload import payload
             offset = self.hlen << 2
-            self.data = self.next(bytes[offset:len(bytes)],
-                                  timestamp = timestamp)
-            if self.data is None:
-                from pcs.packets.payload import payload
-                self.data = payload(bytes[offset:len(bytes)])
+            self.decapsulate(buffer(bytes, offset), timestamp, payload)
             #if __debug__:
             #    print "decoded IPv4 payload proto", self.protocol, "as", type(self.data)
         else:
@@ -228,21 +222,16 @@ class ipv4(pcs.Packet):
         self.hlen = (len(tmpbytes) >> 2)
         self.length = len(tmpbytes)
         if self._head is not None:
-            self.length += len(self._head.collate_following(self))
+            self.length += self._head.length_following(self)
 
-    def ipv4_cksum(bytes):
+    def ipv4_cksum(bytes, partial = 0):
         """Static method to: Calculate and return the IPv4 header checksum
-           over the string of bytes provided."""
-
-        tmpbytes = bytes
-        total = 0
-        if len(tmpbytes) % 2 == 1:
-            tmpbytes += "\0"
-        for i in range(len(tmpbytes)/2):
-            total += (struct.unpack("!H", tmpbytes[2*i:2*i+2])[0])
-        total = (total >> 16) + (total & 0xffff)
-        total += total >> 16
-        return ~total & 0xffff
+           over the string of bytes provided.
+
+           partial - the one's complement sum of any bytes which follow
+                     them, as Chain.sum_following() returns it"""
+
+        return pcs.checksum.complement(partial + pcs.checksum.wordsum(bytes))
 
     ipv4_cksum = staticmethod(ipv4_cksum)
 
@@ -253,20 +242,20 @@ class ipv4(pcs.Packet):
 class pseudoipv4(pcs.Packet):
     """IPv4 Pseudo Header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("src", 32),
+                          pcs.Field("dst", 32),
+                          pcs.Field("reserved", 8, default = 0),
+                          pcs.Field("protocol", 8),
+                          pcs.Field("length", 16)])
     _map = None
 
     from socket import IPPROTO_TCP
 
     def __init__(self, bytes = None, timestamp = None, proto = IPPROTO_TCP):
         """For a pseudo header we only need the source and destination ddresses."""
-        src = pcs.Field("src", 32)
-        dst = pcs.Field("dst", 32)
-        reserved = pcs.Field("reserved", 8, default = 0)
-        protocol = pcs.Field("protocol", 8, default = proto)
-        length = pcs.Field("length", 16)
-        pcs.Packet.__init__(self, [src, dst, reserved, protocol, length],
-                            bytes = bytes)
+        pcs.Packet.__init__(self, bytes = bytes)
+        if bytes is None:
+            self.protocol = proto
         # Description MUST be set after the PCS layer init"For a pseudo header we only need the source and destination ddresses."
         self.description = "IPv4 Pseudo Header"
         if timestamp is None:
@@ -112,7 +112,6 @@ class ipv4sar(object):
     def make_fragment_header(ip):
         """Given an IPv4 header possibly with options, return a copy of the
            header which should be used for subsequent fragments."""
-        from copy import deepcopy
         # We work on the object representation, NOT the bytes themselves here.
         oldopts = ip.options._options
         newopts = []
@@ -131,7 +130,7 @@ class ipv4sar(object):
         remaining = optlen % 32
         while remaining > 0:
             newopts.append(pcs.Field("eol", 8, default=IPOPT_EOL))
-        nip = deepcopy(ip)
+        nip = ip.clone()
         nip.options._options = newopts
         nip.encode()
         assert len(nip.getbytes()) <= 64, "IPv4 header cannot exceed 64 bytes."
@@ -173,10 +172,9 @@ class ipv4sar(object):
         if mtu >= len(ip.getbytes()) + remaining:
             return [chain]
 
-        # Take a deep copy of the IP header, and construct the
+        # Clone the IP header, and construct the
         # fragmentation headers.
-        from copy import deepcopy
-        fip = deepcopy(ip)		# first IP fragment header
+        fip = ip.clone()		# first IP fragment header
         fip.ip_flags = IP_MF
         assert (len(fip.getbytes()) % 4) == 0, \
                "First IPv4 fragment header not on 4-byte boundary."
@@ -208,7 +206,7 @@ class ipv4sar(object):
         rmtu -= rmtu % 8
         while remaining >= rmtu:
             sip.ip_off = off >> 3
-            result.append(Chain([deepcopy(sip), \
+            result.append(Chain([sip.clone(), \
                                  ipv4frag(bytes=tmpbytes[off:rmtu])]))
             off += rmtu
             remaining -= rmtu
@@ -221,7 +219,7 @@ class ipv4sar(object):
             sip.ip_off = off >> 3
             if not (ip.ip_flags & IP_MF):
                 sip.ip_flags = 0
-            result.append(Chain([deepcopy(sip), \
+            result.append(Chain([sip.clone(), \
                                  ipv4frag(bytes=tmpbytes[off:remaining])]))
             off += remaining
             remaining -= remaining
@@ -56,22 +56,19 @@ IPV6_DSTOPTS = 60
 class ipv6(pcs.Packet):
     """IPv6"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 4, default = 6),
+                          pcs.Field("traffic_class", 8),
+                          pcs.Field("flow", 20),
+                          pcs.Field("length", 16),
+                          pcs.Field("next_header", 8, discriminator=True),
+                          pcs.Field("hop", 8),
+                          pcs.StringField("src", 16 * 8),
+                          pcs.StringField("dst", 16 * 8)])
     _map = ipv6_map.map
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """IPv6 Packet from RFC 2460"""
-        version = pcs.Field("version", 4, default = 6)
-        traffic = pcs.Field("traffic_class", 8)
-        flow = pcs.Field("flow", 20)
-        length = pcs.Field("length", 16)
-        next_header = pcs.Field("next_header", 8, discriminator=True)
-        hop = pcs.Field("hop", 8)
-        src = pcs.StringField("src", 16 * 8)
-        dst = pcs.StringField("dst", 16 * 8)
-        pcs.Packet.__init__(self,
-                            [version, traffic, flow, length, next_header, hop,
-                             src, dst], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IPv6"
         if timestamp is None:
             self.timestamp = time.time()
@@ -82,15 +79,14 @@ class ipv6(pcs.Packet):
         if (bytes is not None):
             ## 40 bytes is the standard size of an IPv6 header
             offset = 40
-            self.data = self.next(bytes[offset:len(bytes)],
-                                  timestamp = timestamp)
+            self.decapsulate(buffer(bytes, offset), timestamp)
         else:
             self.data = None
         
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = ""
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             if (field.name == "src" or field.name == "dst"):
                 value = inet_ntop(AF_INET6, field.value)
                 retval += "%s %s\n" % (field.name, value)
@@ -38,17 +38,17 @@
 class rt_ext(pcs.Packet):
     """ Routing extension header, type 0 """
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("next_header", 8),
+                          pcs.Field("length", 8, default = 2),
+                          pcs.Field("type", 8, default = 0),
+                          pcs.Field("segments_left", 8, default = 1),
+                          pcs.Field("reserved", 4 * 8, default = 0),
+                          # XXX just define one address for convenience
+                          pcs.StringField("addr1", 16 * 8)])
 
     def __init__(self, bytes = None, count = 1, **kv):
-        next_header = pcs.Field("next_header", 8)
-        length = pcs.Field("length", 8, default = 2 * count)
-        type = pcs.Field("type", 8, default = 0)
-        segments_left = pcs.Field("segments_left", 8, default = count)
-        reserved = pcs.Field("reserved", 4 * 8, default = 0)
-        # XXX just define one address for convenience
-        addr1 = pcs.StringField("addr1", 16 * 8)
-        pcs.Packet.__init__(self,
-                            [next_header, length, type, segments_left,
-                             reserved, addr1], bytes, **kv)
+        if bytes is None:
+            kv.setdefault("length", 2 * count)
+            kv.setdefault("segments_left", count)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "Type 0 Routing header"
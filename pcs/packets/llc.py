@@ -82,15 +82,14 @@ LLC_ISO_LSAP = 0xfe
 class llc(pcs.Packet):
     """IEEE 802.2 LLC"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("dsap", 8),
+                          pcs.Field("ssap", 8),
+                          pcs.OptionListField("opt")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        dsap = pcs.Field("dsap", 8)
-        ssap = pcs.Field("ssap", 8)
         control = pcs.Field("control", 8)	# snd_x2 in an I-frame.
-        opt = pcs.OptionListField("opt")
 
-        pcs.Packet.__init__(self, [dsap, ssap, opt], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.2 LLC"
 
         if timestamp is None:
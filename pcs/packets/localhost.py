@@ -45,15 +45,14 @@ import time
 
 class localhost(pcs.Packet):
     """Localhost"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 32, discriminator=True)])
     _map = localhost_map.map
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a localhost header, needed to read or write to lo0"""
-        type = pcs.Field("type", 32, discriminator=True)
         lolen = 4
 
-        pcs.Packet.__init__(self, [type], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "Localhost"
         if timestamp is None:
             self.timestamp = time.time()
@@ -61,8 +60,7 @@ class localhost(pcs.Packet):
             self.timestamp = timestamp
 
         if (bytes is not None):
-            self.data = self.next(bytes[lolen:len(bytes)],
-                                  timestamp = timestamp)
+            self.decapsulate(buffer(bytes, lolen), timestamp)
         else:
             self.data = None
 
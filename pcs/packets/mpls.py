@@ -86,18 +86,15 @@ LDP_MSG_ABORT		= 0x0404
 class ldpmsg(pcs.Packet):
     """RFC 3036 LDP message header """
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("u", 1),
+                          pcs.Field("exp", 15),
+                          pcs.Field("length", 16),
+                          pcs.Field("id", 32),
+                          pcs.OptionListField(""),
+                          pcs.OptionListField("")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        u = pcs.Field("u", 1)
-        type = pcs.Field("exp", 15)
-        length = pcs.Field("length", 16)
-        id = pcs.Field("id", 32)
-        mparams = pcs.OptionListField("")
-        oparams = pcs.OptionListField("")
-
-        pcs.Packet.__init__(self, [ u, type, length, id, mparams, oparams ], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3036 LDP message header "
 
         if timestamp is None:
@@ -117,15 +114,12 @@ class ldpmsg(pcs.Packet):
 class ldphdr(pcs.Packet):
     """RFC 3036 LDP packet header """
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("label", 16),
+                          pcs.Field("exp", 16),
+                          pcs.StringField("id", 48)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        version = pcs.Field("label", 16)
-        length = pcs.Field("exp", 16)
-        id = pcs.StringField("id", 48)
-
-        pcs.Packet.__init__(self, [ version, length, id ], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3036 LDP packet header "
 
         if timestamp is None:
@@ -145,15 +139,13 @@ class ldphdr(pcs.Packet):
 class lse(pcs.Packet):
     """RFC 3032 MPLS label stack entry"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("label", 20),
+                          pcs.Field("exp", 3),
+                          pcs.Field("s", 1),
+                          pcs.Field("ttl", 8)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        label = pcs.Field("label", 20)
-        exp = pcs.Field("exp", 3)
-        s = pcs.Field("s", 1)
-        ttl = pcs.Field("ttl", 8)
-
-        pcs.Packet.__init__(self, [ label, exp, s, ttl ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3032 MPLS label stack entry"
 
         if timestamp is None:
@@ -54,24 +54,20 @@ from pcs.packets import payload
 from socket import AF_INET, inet_ntop, inet_ntoa
 
 class query(pcs.Packet):
-    layout = pcs.Layout()
+    # (G,S) tuple to query.
+    _layout = pcs.Layout([pcs.Field("group", 32),
+                          pcs.Field("source", 32),
+                          # Who's asking.
+                          pcs.Field("receiver", 32),
+                          # Where to send the answer.
+                          pcs.Field("response_addr", 32),
+                          pcs.Field("response_hoplimit", 8),
+                          # The ID of this query.
+                          pcs.Field("query_id", 24)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize the MTRACE query header."""
-	# (G,S) tuple to query.
-	group = pcs.Field("group", 32)
-	source = pcs.Field("source", 32)
-	# Who's asking.
-	receiver = pcs.Field("receiver", 32)
-	# Where to send the answer.
-	response_addr = pcs.Field("response_addr", 32)
-	response_hoplimit = pcs.Field("response_hoplimit", 8)
-	# The ID of this query.
-	query_id = pcs.Field("query_id", 24)
-
-        pcs.Packet.__init__(self, [group, source, \
-				   receiver, response_addr, \
-				   response_hoplimit, query_id], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "initialize the MTRACE query header."
 
@@ -87,26 +83,20 @@ class query(pcs.Packet):
             self.data = None
 
 class reply(pcs.Packet):
-    layout = pcs.Layout()
+    # (G,S) tuple to query.
+    _layout = pcs.Layout([pcs.Field("group", 32),
+                          pcs.Field("source", 32),
+                          # Who's asking.
+                          pcs.Field("receiver", 32),
+                          # Where to send the answer.
+                          pcs.Field("response_addr", 32),
+                          pcs.Field("response_hoplimit", 8),
+                          # The ID of this query.
+                          pcs.Field("query_id", 24)])  #...hops?
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize the MTRACE response header."""
-	# (G,S) tuple to query.
-	group = pcs.Field("group", 32)
-	source = pcs.Field("source", 32)
-	# Who's asking.
-	receiver = pcs.Field("receiver", 32)
-	# Where to send the answer.
-	response_addr = pcs.Field("response_addr", 32)
-	response_hoplimit = pcs.Field("response_hoplimit", 8)
-	# The ID of this query.
-	query_id = pcs.Field("query_id", 24)
-
-	#...hops?
-
-        pcs.Packet.__init__(self, [group, source, \
-				   receiver, response_addr, \
-				   response_hoplimit, query_id], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "initialize the MTRACE response header."
 
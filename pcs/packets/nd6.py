@@ -43,13 +43,12 @@ import time
 class nd6_solicit(pcs.Packet):
     """Neighbor Discovery"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("reserved", 32),
+                          pcs.Field("target", 128)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a Neighbor Solicitaion header"""
-        reserved = pcs.Field("reserved", 32)
-        target = pcs.Field("target", 128)
-        pcs.Packet.__init__(self, [reserved, target], bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize a Neighbor Solicitaion header"
         if timestamp is None:
             self.timestamp = time.time()
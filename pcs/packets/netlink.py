@@ -86,14 +86,12 @@ class nlmsg_error(pcs.Packet):
     """If type is NLMSG_ERROR, original message generating error
        is returned as payload with error code prepended, just like ICMP."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("error", 32)])
     _map = None
     _descr = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        error = pcs.Field("error", 32)
-
-        pcs.Packet.__init__(self, [error], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "If type is NLMSG_ERROR, original message generating error is returned as payload with error code prepended, just like ICMP."
 
         if timestamp is None:
@@ -127,7 +125,11 @@ descr = {
 class nlmsghdr(pcs.Packet):
     """RFC 3549 Netlink socket message header."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("len", 32),
+                          pcs.Field("type", 16, discriminator=True),
+                          pcs.Field("flags", 16),
+                          pcs.Field("seq", 32),
+                          pcs.Field("pid", 32)])  # Port ID
     #_map = nlmsg_map
     #_descr = descr
     _map = nlmsg_map
@@ -142,14 +144,7 @@ class nlmsghdr(pcs.Packet):
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common Netlink message header."""
-        len = pcs.Field("len", 32)
-        type = pcs.Field("type", 16, discriminator=True)
-        flags = pcs.Field("flags", 16)
-        seq = pcs.Field("seq", 32)
-        pid = pcs.Field("pid", 32)	# Port ID
-
-        pcs.Packet.__init__(self, [len, type, flags, seq, pid], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = " Define the common Netlink message header."
 
         if timestamp is None:
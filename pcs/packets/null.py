@@ -40,13 +40,11 @@ import time
 
 class null(pcs.Packet):
     """NULL."""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.StringField("null", 80*8)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a TCP packet"""
-        null = pcs.StringField("null", 80*8)
-        pcs.Packet.__init__(self, [null],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "NULL"
         if timestamp is None:
             self.timestamp = time.time()
@@ -55,14 +53,14 @@ class null(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes, timestamp = timestamp)
+            self.decapsulate(bytes, timestamp)
         else:
             self.data = None
 
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = "NULL\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
 
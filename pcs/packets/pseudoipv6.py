@@ -41,14 +41,12 @@ class pseudoipv6(pcs.Packet):
     """A class that create an IPv6 pseudo header used
     for upper-layer checksums."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.StringField("src", 16 * 8),
+                          pcs.StringField("dst", 16 * 8),
+                          pcs.Field("length", 32),
+                          pcs.Field("zero", 24),
+                          pcs.Field("next_header", 8)])
 
     def __init__(self, bytes = None, timestamp = None):
         """IPv6 pseudo header from RFC 2460"""
-        src = pcs.StringField("src", 16 * 8)
-        dst = pcs.StringField("dst", 16 * 8)
-        length = pcs.Field("length", 32)
-        zero = pcs.Field("zero", 24)
-        nh = pcs.Field("next_header", 8)
-        pcs.Packet.__init__(self,
-                            [src, dst, length, zero, nh], bytes);
+        pcs.Packet.__init__(self, bytes = bytes);
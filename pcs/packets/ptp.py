@@ -42,30 +42,19 @@ PTP_UUID_LENGTH = 6
 
 class Announce(pcs.Packet):
     """PTP Announce"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("originTimestampSeconds", 48),
+                          pcs.Field("originTimestampNanoSeconds", 32),
+                          pcs.Field("currentUTCOffset", 16),
+                          pcs.Field("reserved0", 8, default = 0),
+                          pcs.Field("grandmasterPriority1", 8),
+                          pcs.Field("grandmasterClockQuality", 32),
+                          pcs.Field("grandmasterPriority2", 8),
+                          pcs.StringField("grandmasterClockIdentity", 8),
+                          pcs.Field("stepsRemoved", 16),
+                          pcs.Field("timeSource", 8)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
-        originTimestampSeconds = pcs.Field("originTimestampSeconds", 48)
-        originTimestampNanoSeconds = pcs.Field("originTimestampNanoSeconds", 32)
-        currentUTCOffset = pcs.Field("currentUTCOffset", 16)
-        reserved0 = pcs.Field("reserved0", 8, default = 0)
-        grandmasterPriority1 = pcs.Field("grandmasterPriority1", 8)
-        grandmasterClockQuality = pcs.Field("grandmasterClockQuality", 32)
-        grandmasterPriority2 = pcs.Field("grandmasterPriority2", 8)
-        grandmasterClockIdentity = pcs.StringField("grandmasterClockIdentity", 8)
-        stepsRemoved = pcs.Field("stepsRemoved", 16)
-        timeSource = pcs.Field("timeSource", 8)
-        
-        pcs.Packet.__init__(self, [originTimestampSeconds,
-                                   originTimestampNanoSeconds,
-                                   currentUTCOffset,
-                                   reserved0,
-                                   grandmasterPriority1,
-                                   grandmasterClockQuality,
-                                   grandmasterPriority2,
-                                   grandmasterClockIdentity,
-                                   stepsRemoved,
-                                   timeSource], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP Announce"
 
@@ -83,14 +72,11 @@ class Announce(pcs.Packet):
 
 class Sync(pcs.Packet):
     """PTP Sync"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("originTimestampSeconds", 48),
+                          pcs.Field("originTimestampNanoSeconds", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
-        originTimestampSeconds = pcs.Field("originTimestampSeconds", 48)
-        originTimestampNanoSeconds = pcs.Field("originTimestampNanoSeconds", 32)
-        pcs.Packet.__init__(self, [originTimestampSeconds,
-                                   originTimestampNanoSeconds],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP Sync"
 
@@ -113,14 +99,11 @@ class Sync(pcs.Packet):
 
 class DelayRequest(pcs.Packet):
     """PTP DelayRequest"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("originTimestampSeconds", 48),
+                          pcs.Field("originTimestampNanoSeconds", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
-        originTimestampSeconds = pcs.Field("originTimestampSeconds", 48)
-        originTimestampNanoSeconds = pcs.Field("originTimestampNanoSeconds", 32)
-        pcs.Packet.__init__(self, [originTimestampSeconds,
-                                   originTimestampNanoSeconds],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP DelayRequest"
 
@@ -141,18 +124,12 @@ class DelayRequest(pcs.Packet):
 
 class Followup(pcs.Packet):
     """PTP Followup"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("preciseOriginTimestampSeconds", 48),
+                          pcs.Field("preciseOriginTimestampNanoSeconds", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Followup Header """
-        preciseOriginTimestampSeconds = pcs.Field("preciseOriginTimestampSeconds",
-                                                  48)
-        preciseOriginTimestampNanoSeconds = pcs.Field(
-            "preciseOriginTimestampNanoSeconds", 32)
-
-        pcs.Packet.__init__(self, [preciseOriginTimestampSeconds,
-                                   preciseOriginTimestampNanoSeconds],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "Followup"
 
@@ -174,17 +151,13 @@ class Followup(pcs.Packet):
 
 class DelayResponse(pcs.Packet):
     """PTP Delay Response"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("receiveTimestampSeconds", 48),
+                          pcs.Field("receiveTimestampNanoSeconds", 32),
+                          pcs.Field("requestingPortIdentity", 80)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Delay Response"""
-        receiveTimestampSeconds = pcs.Field("receiveTimestampSeconds", 48)
-        receiveTimestampNanoSeconds = pcs.Field("receiveTimestampNanoSeconds", 32)
-        requestingPortIdentity = pcs.Field("requestingPortIdentity", 80)
-        pcs.Packet.__init__(self, [receiveTimestampSeconds,
-                                   receiveTimestampNanoSeconds,
-                                   requestingPortIdentity],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "Delay Response "
 
@@ -42,34 +42,25 @@ PTP_UUID_LENGTH = 6
 
 class Common(pcs.Packet):
     """PTP Common Header"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("transportSpecific", 4),
+                          pcs.Field("versionNetwork", 4, discriminator = True),
+                          pcs.Field("reserved0", 4),
+                          pcs.Field("versionPTP", 4),
+                          pcs.Field("messageLength", 16),
+                          pcs.Field("domainNumber", 8),
+                          pcs.Field("reserved1", 8),
+                          pcs.Field("flagField", 16),
+                          pcs.Field("correctionField", 64),
+                          pcs.Field("reserved2", 32),
+                          pcs.Field("sourcePortIdentity", 80),
+                          pcs.Field("sequenceId", 16),
+                          pcs.Field("controlField", 8),
+                          pcs.Field("logMessageInterval", 8)])
     _map = ptp_map.map
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize the common header """
-        transportSpecific = pcs.Field("transportSpecific", 4)
-        messageType = pcs.Field("versionNetwork", 4, discriminator = True)
-        reserved0 = pcs.Field("reserved0", 4)
-        versionPTP = pcs.Field("versionPTP", 4)
-        messageLength = pcs.Field("messageLength", 16)
-        domainNumber = pcs.Field("domainNumber", 8)
-        reserved1 = pcs.Field("reserved1", 8)
-        flagField = pcs.Field("flagField", 16)
-        correctionField = pcs.Field("correctionField", 64)
-        reserved2 = pcs.Field("reserved2", 32)
-        sourcePortIdentity = pcs.Field("sourcePortIdentity", 80)
-        sequenceId = pcs.Field("sequenceId", 16)
-        controlField = pcs.Field("controlField", 8)
-        logMessageInterval = pcs.Field("logMessageInterval", 8)
-        pcs.Packet.__init__(self, [transportSpecific, messageType,
-                                   reserved0,
-                                   versionPTP, messageLength, domainNumber,
-                                   reserved1,
-                                   flagField, correctionField,
-                                   reserved2,
-                                   sourcePortIdentity, sequenceId, controlField,
-                                   logMessageInterval],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP Common Header"
 
@@ -42,89 +42,49 @@ PTP_UUID_LENGTH = 6
 
 class SyncV1(pcs.Packet):
     """PTPv1 Sync"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("originTimestampSeconds", 32),
+                          pcs.Field("originTimestampNanoseconds", 32),
+                          pcs.Field("epochNumber", 16),
+                          pcs.Field("currentUTCOffset", 16),
+                          pcs.Field("zero1", 8, default = 0),
+                          pcs.Field("grandmasterCommunicationTechnology", 8),
+                          pcs.StringField("grandmasterClockUuid",
+                                          PTP_UUID_LENGTH * 8),
+                          pcs.Field("grandmasterPortId", 16),
+                          pcs.Field("grandmasterSequenceId", 16),
+                          pcs.Field("zero2", 24, default = 0),
+                          pcs.Field("grandmasterClockStratum", 8),
+                          pcs.StringField("grandmasterClockIdentifier",
+                                          PTP_CODE_STRING_LENGTH * 8),
+                          pcs.Field("zero3", 16, default = 0),
+                          pcs.Field("grandmasterClockVariance", 16),
+                          pcs.Field("zero4", 8, default = 0),
+                          pcs.Field("grandmasterPreferred", 8),
+                          pcs.Field("zero5", 8, default = 0),
+                          pcs.Field("grandmasterIsBoundaryClock", 8),
+                          pcs.Field("zero6", 24, default = 0),
+                          pcs.Field("syncInterval", 8),
+                          pcs.Field("zero7", 16, default = 0),
+                          pcs.Field("localClockVariance", 16),
+                          pcs.Field("zero8", 16, default = 0),
+                          pcs.Field("localStepsRemoved", 16),
+                          pcs.Field("zero9", 24, default = 0),
+                          pcs.Field("localClockStratum", 8),
+                          pcs.StringField("localClockIdentifer",
+                                          PTP_CODE_STRING_LENGTH * 8),
+                          pcs.Field("zero10", 8, default = 0),
+                          pcs.Field("parentCommunicationTechnology", 8),
+                          pcs.StringField("parentUuid", PTP_UUID_LENGTH * 8),
+                          pcs.Field("zero11", 16, default = 0),
+                          pcs.Field("parentPortField", 16),
+                          pcs.Field("zero12", 16, default = 0),
+                          pcs.Field("estimatedMasterVariance", 16),
+                          pcs.Field("estimatedMasterDrift", 32),
+                          pcs.Field("zero13", 24, default = 0),
+                          pcs.Field("utcReasonable", 8)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
-        originTimestampSeconds = pcs.Field("originTimestampSeconds", 32)
-        originTimestampNanoseconds = pcs.Field("originTimestampNanoseconds", 32)
-        epochNumber = pcs.Field("epochNumber", 16)
-        currentUTCOffset = pcs.Field("currentUTCOffset", 16)
-        zero1 = pcs.Field("zero1", 8, default = 0)
-        grandmasterCommunicationTechnology = pcs.Field(
-            "grandmasterCommunicationTechnology", 8)
-        grandmasterClockUuid = pcs.StringField("grandmasterClockUuid",
-                                         PTP_UUID_LENGTH * 8)
-        grandmasterPortId = pcs.Field("grandmasterPortId", 16)
-        grandmasterSequenceId = pcs.Field("grandmasterSequenceId", 16)
-        zero2 = pcs.Field("zero2", 24, default = 0)
-        grandmasterClockStratum = pcs.Field("grandmasterClockStratum", 8)
-        grandmasterClockIdentifier = pcs.StringField(
-            "grandmasterClockIdentifier", PTP_CODE_STRING_LENGTH * 8 )
-        zero3 = pcs.Field("zero3", 16, default = 0)
-        grandmasterClockVariance = pcs.Field("grandmasterClockVariance", 16)
-        zero4 = pcs.Field("zero4", 8, default = 0)
-        grandmasterPreferred = pcs.Field("grandmasterPreferred", 8)
-        zero5 = pcs.Field("zero5", 8, default = 0)
-        grandmasterIsBoundaryClock = pcs.Field("grandmasterIsBoundaryClock", 8)
-        zero6 = pcs.Field("zero6", 24, default = 0)
-        syncInterval = pcs.Field("syncInterval", 8)
-        zero7 = pcs.Field("zero7", 16, default = 0)
-        localClockVariance = pcs.Field("localClockVariance", 16)
-        zero8 = pcs.Field("zero8", 16, default = 0)
-        localStepsRemoved = pcs.Field("localStepsRemoved", 16)
-        zero9 = pcs.Field("zero9", 24, default = 0)
-        localClockStratum = pcs.Field("localClockStratum", 8)
-        localClockIdentifer = pcs.StringField("localClockIdentifer",
-                                        PTP_CODE_STRING_LENGTH * 8)
-        zero10 = pcs.Field("zero10", 8, default = 0)
-        parentCommunicationTechnology = pcs.Field(
-            "parentCommunicationTechnology", 8)
-        parentUuid = pcs.StringField("parentUuid", PTP_UUID_LENGTH * 8)
-        zero11 = pcs.Field("zero11", 16, default = 0)
-        parentPortField = pcs.Field("parentPortField", 16)
-        zero12 = pcs.Field("zero12", 16, default = 0)
-        estimatedMasterVariance = pcs.Field("estimatedMasterVariance", 16)
-        estimatedMasterDrift = pcs.Field("estimatedMasterDrift", 32)
-        zero13 = pcs.Field("zero13", 24, default = 0)
-        utcReasonable = pcs.Field("utcReasonable", 8)
-
-                                
-        pcs.Packet.__init__(self, [originTimestampSeconds,
-                                   originTimestampNanoseconds,
-                                   epochNumber,
-                                   currentUTCOffset,
-                                   zero1,
-                                   grandmasterCommunicationTechnology,
-                                   grandmasterClockUuid,
-                                   grandmasterPortId, grandmasterSequenceId,
-                                   zero2,
-                                   grandmasterClockStratum,
-                                   grandmasterClockIdentifier,
-                                   zero3,
-                                   grandmasterClockVariance,
-                                   zero4,
-                                   grandmasterPreferred,
-                                   zero5,
-                                   grandmasterIsBoundaryClock,
-                                   zero6,
-                                   syncInterval,
-                                   zero7,
-                                   localClockVariance,
-                                   zero8,
-                                   localStepsRemoved,
-                                   zero9,
-                                   localClockStratum,
-                                   localClockIdentifer,
-                                   zero10,
-                                   parentCommunicationTechnology,
-                                   parentUuid,
-                                   zero11,
-                                   parentPortField,
-                                   zero12,
-                                   estimatedMasterVariance,
-                                   estimatedMasterDrift,
-                                   zero13,
-                                   utcReasonable], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP Sync"
 
@@ -147,89 +107,49 @@ class SyncV1(pcs.Packet):
 
 class DelayRequestV1(pcs.Packet):
     """PTPv1 DelayRequest"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("originTimestampSeconds", 32),
+                          pcs.Field("originTimestampNanoseconds", 32),
+                          pcs.Field("epochNumber", 16),
+                          pcs.Field("currentUTCOffset", 16),
+                          pcs.Field("zero1", 8, default = 0),
+                          pcs.Field("grandmasterCommunicationTechnology", 8),
+                          pcs.StringField("grandmasterClockUuid",
+                                          PTP_UUID_LENGTH * 8),
+                          pcs.Field("grandmasterPortId", 16),
+                          pcs.Field("grandmasterSequenceId", 16),
+                          pcs.Field("zero2", 24, default = 0),
+                          pcs.Field("grandmasterClockStratum", 8),
+                          pcs.StringField("grandmasterClockIdentifier",
+                                          PTP_CODE_STRING_LENGTH * 8),
+                          pcs.Field("zero3", 16, default = 0),
+                          pcs.Field("grandmasterClockVariance", 16),
+                          pcs.Field("zero4", 8, default = 0),
+                          pcs.Field("grandmasterPreferred", 8),
+                          pcs.Field("zero5", 8, default = 0),
+                          pcs.Field("grandmasterIsBoundaryClock", 8),
+                          pcs.Field("zero6", 24, default = 0),
+                          pcs.Field("syncInterval", 8),
+                          pcs.Field("zero7", 16, default = 0),
+                          pcs.Field("localClockVariance", 16),
+                          pcs.Field("zero8", 16, default = 0),
+                          pcs.Field("localStepsRemoved", 16),
+                          pcs.Field("zero9", 24, default = 0),
+                          pcs.Field("localClockStratum", 8),
+                          pcs.StringField("localClockIdentifer",
+                                          PTP_CODE_STRING_LENGTH * 8),
+                          pcs.Field("zero10", 8, default = 0),
+                          pcs.Field("parentCommunicationTechnology", 8),
+                          pcs.StringField("parentUuid", PTP_UUID_LENGTH * 8),
+                          pcs.Field("zero11", 16, default = 0),
+                          pcs.Field("parentPortField", 16),
+                          pcs.Field("zero12", 16, default = 0),
+                          pcs.Field("estimatedMasterVariance", 16),
+                          pcs.Field("estimatedMasterDrift", 32),
+                          pcs.Field("zero13", 24, default = 0),
+                          pcs.Field("utcReasonable", 8)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
-        originTimestampSeconds = pcs.Field("originTimestampSeconds", 32)
-        originTimestampNanoseconds = pcs.Field("originTimestampNanoseconds", 32)
-        epochNumber = pcs.Field("epochNumber", 16)
-        currentUTCOffset = pcs.Field("currentUTCOffset", 16)
-        zero1 = pcs.Field("zero1", 8, default = 0)
-        grandmasterCommunicationTechnology = pcs.Field(
-            "grandmasterCommunicationTechnology", 8)
-        grandmasterClockUuid = pcs.StringField("grandmasterClockUuid",
-                                         PTP_UUID_LENGTH * 8)
-        grandmasterPortId = pcs.Field("grandmasterPortId", 16)
-        grandmasterSequenceId = pcs.Field("grandmasterSequenceId", 16)
-        zero2 = pcs.Field("zero2", 24, default = 0)
-        grandmasterClockStratum = pcs.Field("grandmasterClockStratum", 8)
-        grandmasterClockIdentifier = pcs.StringField(
-            "grandmasterClockIdentifier", PTP_CODE_STRING_LENGTH * 8 )
-        zero3 = pcs.Field("zero3", 16, default = 0)
-        grandmasterClockVariance = pcs.Field("grandmasterClockVariance", 16)
-        zero4 = pcs.Field("zero4", 8, default = 0)
-        grandmasterPreferred = pcs.Field("grandmasterPreferred", 8)
-        zero5 = pcs.Field("zero5", 8, default = 0)
-        grandmasterIsBoundaryClock = pcs.Field("grandmasterIsBoundaryClock", 8)
-        zero6 = pcs.Field("zero6", 24, default = 0)
-        syncInterval = pcs.Field("syncInterval", 8)
-        zero7 = pcs.Field("zero7", 16, default = 0)
-        localClockVariance = pcs.Field("localClockVariance", 16)
-        zero8 = pcs.Field("zero8", 16, default = 0)
-        localStepsRemoved = pcs.Field("localStepsRemoved", 16)
-        zero9 = pcs.Field("zero9", 24, default = 0)
-        localClockStratum = pcs.Field("localClockStratum", 8)
-        localClockIdentifer = pcs.StringField("localClockIdentifer",
-                                        PTP_CODE_STRING_LENGTH * 8)
-        zero10 = pcs.Field("zero10", 8, default = 0)
-        parentCommunicationTechnology = pcs.Field(
-            "parentCommunicationTechnology", 8)
-        parentUuid = pcs.StringField("parentUuid", PTP_UUID_LENGTH * 8)
-        zero11 = pcs.Field("zero11", 16, default = 0)
-        parentPortField = pcs.Field("parentPortField", 16)
-        zero12 = pcs.Field("zero12", 16, default = 0)
-        estimatedMasterVariance = pcs.Field("estimatedMasterVariance", 16)
-        estimatedMasterDrift = pcs.Field("estimatedMasterDrift", 32)
-        zero13 = pcs.Field("zero13", 24, default = 0)
-        utcReasonable = pcs.Field("utcReasonable", 8)
-
-                                
-        pcs.Packet.__init__(self, [originTimestampSeconds,
-                                   originTimestampNanoseconds,
-                                   epochNumber,
-                                   currentUTCOffset,
-                                   zero1,
-                                   grandmasterCommunicationTechnology,
-                                   grandmasterClockUuid,
-                                   grandmasterPortId, grandmasterSequenceId,
-                                   zero2,
-                                   grandmasterClockStratum,
-                                   grandmasterClockIdentifier,
-                                   zero3,
-                                   grandmasterClockVariance,
-                                   zero4,
-                                   grandmasterPreferred,
-                                   zero5,
-                                   grandmasterIsBoundaryClock,
-                                   zero6,
-                                   syncInterval,
-                                   zero7,
-                                   localClockVariance,
-                                   zero8,
-                                   localStepsRemoved,
-                                   zero9,
-                                   localClockStratum,
-                                   localClockIdentifer,
-                                   zero10,
-                                   parentCommunicationTechnology,
-                                   parentUuid,
-                                   zero11,
-                                   parentPortField,
-                                   zero12,
-                                   estimatedMasterVariance,
-                                   estimatedMasterDrift,
-                                   zero13,
-                                   utcReasonable], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "PTP DelayRequest"
 
@@ -252,21 +172,14 @@ class DelayRequestV1(pcs.Packet):
 
 class FollowupV1(pcs.Packet):
     """PTPv1 Followup"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("zero1", 16, default = 0),
+                          pcs.Field("associatedSequenceId", 16),
+                          pcs.Field("preciseTimestampSeconds", 32),
+                          pcs.Field("preciseTimestampNanoseconds", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Followup Header """
-        zero1 = pcs.Field("zero1", 16, default = 0)
-        associatedSequenceId = pcs.Field("associatedSequenceId", 16)
-        preciseTimestampSeconds = pcs.Field("preciseTimestampSeconds", 32)
-        preciseTimestampNanoseconds = pcs.Field("preciseTimestampNanoseconds",
-                                                32)
-
-        pcs.Packet.__init__(self, [zero1,
-                                   associatedSequenceId,
-                                   preciseTimestampSeconds,
-                                   preciseTimestampNanoseconds],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "Followup Header "
 
@@ -288,30 +201,19 @@ class FollowupV1(pcs.Packet):
 
 class DelayResponseV1(pcs.Packet):
     """PTPv1 Delay Response"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("delayReceiptTimestampSeconds", 32),
+                          pcs.Field("delayReceiptTimestampNanoseconds", 32),
+                          pcs.Field("zero1", 8, default = 0),
+                          pcs.Field("requestingSourceCommunicationTechnology",
+                                    8),
+                          pcs.StringField("requestingSourceUuid",
+                                          PTP_UUID_LENGTH * 8),
+                          pcs.Field("requestingSourcePortId", 16),
+                          pcs.Field("requestingSourceSequenceId", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Followup Header """
-        delayReceiptTimestampSeconds = pcs.Field(
-            "delayReceiptTimestampSeconds", 32)
-        delayReceiptTimestampNanoseconds = pcs.Field(
-            "delayReceiptTimestampNanoseconds", 32)
-        zero1 = pcs.Field("zero1", 8, default = 0)
-        requestingSourceCommunicationTechnology = pcs.Field(
-            "requestingSourceCommunicationTechnology", 8)
-        requestingSourceUuid = pcs.StringField("requestingSourceUuid",
-                                               PTP_UUID_LENGTH * 8)
-        requestingSourcePortId = pcs.Field("requestingSourcePortId", 16)
-        requestingSourceSequenceId = pcs.Field("requestingSourceSequenceId", 16)
-
-        pcs.Packet.__init__(self, [delayReceiptTimestampSeconds,
-                                   delayReceiptTimestampNanoseconds,
-                                   zero1,
-                                   requestingSourceCommunicationTechnology,
-                                   requestingSourceUuid,
-                                   requestingSourcePortId,
-                                   requestingSourceSequenceId],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "Followup Header "
 
@@ -43,30 +43,24 @@ PTP_UUID_LENGTH = 6
 
 class CommonV1(pcs.Packet):
     """PTPv1 Common Header"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("versionPTP", 16),
+                          pcs.Field("versionNetwork", 16),
+                          pcs.StringField("subdomain",
+                                          PTP_SUBDOMAIN_NAME_LENGTH * 8),
+                          pcs.Field("messageType", 8),
+                          pcs.Field("sourceCommunicationTechnology", 8),
+                          pcs.StringField("sourceUuid", PTP_UUID_LENGTH * 8),
+                          pcs.Field("sourcePortId", 16),
+                          pcs.Field("sequenceId", 16),
+                          pcs.Field("control", 8, discriminator = True),
+                          pcs.Field("zero1", 8, default = 0),
+                          pcs.Field("flags", 16),
+                          pcs.Field("zero2", 32, default = 0)])
     _map = ptp_map.map
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize the common header """
-        versionPTP = pcs.Field("versionPTP", 16)
-        versionNetwork = pcs.Field("versionNetwork", 16)
-        subdomain = pcs.StringField("subdomain", PTP_SUBDOMAIN_NAME_LENGTH * 8)
-        messageType = pcs.Field("messageType", 8)
-        sourceCommunicationTechnology = pcs.Field("sourceCommunicationTechnology", 8)
-        sourceUuid = pcs.StringField("sourceUuid", PTP_UUID_LENGTH * 8)
-        sourcePortId = pcs.Field("sourcePortId", 16)
-        sequenceId = pcs.Field("sequenceId", 16)
-        control = pcs.Field("control", 8, discriminator = True)
-        zero1 = pcs.Field("zero1", 8, default = 0)
-        flags = pcs.Field("flags", 16)
-        zero2 = pcs.Field("zero2", 32, default = 0)
-                                
-        pcs.Packet.__init__(self, [versionPTP, versionNetwork,
-                                   subdomain, messageType,
-                                   sourceCommunicationTechnology,
-                                   sourceUuid, sourcePortId, sequenceId,
-                                   control, zero1, flags, zero2],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
 
         self.description = "initialize the common header "
 
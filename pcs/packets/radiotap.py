@@ -186,7 +186,11 @@ _vmap = {
 class radiotap(pcs.Packet):
     """Radiotap"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 8),  # currently 0.
+                          pcs.Field("pad", 8),
+                          pcs.Field("len", 16),  # inclusive.
+                          pcs.Field("present", 32),  # Bit mask.
+                          pcs.OptionListField("tlvs")])
     _bits = "\x01TSFT\x02FLAGS\x03RATE\x04CHANNEL"\
             "\x05FHSS\x06DBM_ANTSIGNAL\x07DBM_ANTNOISE"\
             "\x08LOCK_QUALITY\x09TX_ATTENUATION\x0aDB_TX_ATTENUATION"\
@@ -195,14 +199,7 @@ class radiotap(pcs.Packet):
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize an ethernet packet"""
-        version = pcs.Field("version", 8)		# currently 0.
-        pad = pcs.Field("pad", 8)
-        len = pcs.Field("len", 16)			# inclusive.
-        present = pcs.Field("present", 32)		# Bit mask.
-        tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [version, pad, len, present, tlvs], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize an ethernet packet"
 
         if timestamp is None:
@@ -214,6 +211,7 @@ class radiotap(pcs.Packet):
             offset = self.sizeof()
             curr = offset
             remaining = min(len(bytes), self.len) - offset
+            tlvs = self.tlvs
             # Force little-endian conversion.
             # TODO: Process the EXT bit.
             he_prez = struct.unpack('<i', bytes[4:4])
@@ -230,7 +228,7 @@ class radiotap(pcs.Packet):
                             value = struct.unpack(vfmt, bytes[curr:vlen])
                             fields = vfunc(vname, value)
                             for f in fields:
-                                tlvs._options.append(f)
+                                tlvs.append(f)
                             curr += vlen
                             remaining -= vlen
                         else:
@@ -379,7 +379,7 @@ class NexthopField(pcs.CompoundField):
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if self.packet is not None:
-            self.packet.__needencode = True
+            self.packet._needencode = True
 
     def decode(self, bytes, curr, byteBR):
         start = curr
@@ -456,7 +456,11 @@ class NexthopField(pcs.CompoundField):
 class ifaddrmsg(pcs.Packet):
     """RFC 3549 interface address message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("family", 8),
+                          pcs.Field("pad00", 8),
+                          pcs.Field("flags", 8),
+                          pcs.Field("scope", 8),
+                          pcs.Field("index", 32)])
     _map = None
     _descr = None
     _flag_bits = "\x01SECONDARY\x02NODAD\x03OPTIMISTIC"\
@@ -464,15 +468,7 @@ class ifaddrmsg(pcs.Packet):
                  "\x07TENTATIVE\x08PERMANENT"
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        family = pcs.Field("family", 8)
-        prefixlen = pcs.Field("pad00", 8)
-        flags = pcs.Field("flags", 8)
-        scope = pcs.Field("scope", 8)
-        index = pcs.Field("index", 32)
-        #tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [family, prefixlen, flags, scope, index],\
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3549 interface address message."
 
         if timestamp is None:
@@ -495,7 +491,12 @@ class ifaddrmsg(pcs.Packet):
 class ifinfomsg(pcs.Packet):
     """RFC 3549 interface information message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("family", 8),
+                          pcs.Field("pad00", 8),
+                          pcs.Field("type", 16),
+                          pcs.Field("index", 32),
+                          pcs.Field("flags", 32),
+                          pcs.Field("change", 32)])
     _map = None
     _descr = None
     _flag_bits = \
@@ -507,16 +508,7 @@ class ifinfomsg(pcs.Packet):
     "\x11LOWER_UP\x12DORMANT\x13ECHO"
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        family = pcs.Field("family", 8)
-        pad00 = pcs.Field("pad00", 8)
-        type = pcs.Field("type", 16)
-        index = pcs.Field("index", 32)
-        flags = pcs.Field("flags", 32)
-        change = pcs.Field("change", 32)
-        #tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [family, pad00, type, index, flags, change],\
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3549 interface information message."
 
         if timestamp is None:
@@ -538,26 +530,21 @@ class ifinfomsg(pcs.Packet):
 class prefixmsg(pcs.Packet):
     """RTnetlink prefix information message. Not in RFC."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("family", 8),
+                          pcs.Field("pad1", 8),
+                          pcs.Field("pad2", 16),
+                          pcs.Field("ifindex", 32),
+                          pcs.Field("type", 8),
+                          pcs.Field("len", 8),
+                          pcs.Field("flags", 8),
+                          pcs.Field("pad3", 8)])
     _map = None
     _descr = None
     _flagbits = "\x01ONLINK\x02AUTOCONF"
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common RTNetlink message header."""
-        family = pcs.Field("family", 8)
-        pad1 = pcs.Field("pad1", 8)
-        pad2 = pcs.Field("pad2", 16)
-        ifindex = pcs.Field("ifindex", 32)
-        type = pcs.Field("type", 8)
-        len = pcs.Field("len", 8)
-        flags = pcs.Field("flags", 8)
-        pad3 = pcs.Field("pad3", 8)
-        #tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [family, pad1, pad2, ifindex, type, \
-                                   len, flags, pad3], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = " Define the common RTNetlink message header."
 
         if timestamp is None:
@@ -580,27 +567,22 @@ class prefixmsg(pcs.Packet):
 class rtmsg(pcs.Packet):
     """RFC 3549 routing message."""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("family", 8),
+                          pcs.Field("dst_len", 8),
+                          pcs.Field("src_len", 8),
+                          pcs.Field("tos", 8),
+                          pcs.Field("table", 8),
+                          pcs.Field("protocol", 8),
+                          pcs.Field("scope", 8),
+                          pcs.Field("type", 8),
+                          pcs.Field("flags", 32)])
     _map = None
     _descr = None
     _flag_bits = "\x09NOTIFY\x0aCLONED\x0bEQUALIZE\x0cPREFIX"
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """ Define the common RTNetlink message header."""
-        family = pcs.Field("family", 8)
-        dst_len = pcs.Field("dst_len", 8)
-        src_len = pcs.Field("src_len", 8)
-        tos = pcs.Field("tos", 8)
-        table = pcs.Field("table", 8)
-        protocol = pcs.Field("protocol", 8)
-        scope = pcs.Field("scope", 8)
-        type = pcs.Field("type", 8)
-        flags = pcs.Field("flags", 32)
-        #tlvs = pcs.OptionListField("tlvs")
-
-        pcs.Packet.__init__(self, [family, dst_len, src_len, tos, table, \
-                                   protocol, scope, type, flags], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = " Define the common RTNetlink message header."
 
         if timestamp is None:
@@ -52,22 +52,19 @@ from pcs.packets import payload
 class rtp(pcs.Packet):
     """RFC 3550 Real Time Protocol"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("v", 2),  # version
+                          pcs.Field("p", 1),  # padded
+                          pcs.Field("x", 1),  # extended
+                          pcs.Field("cc", 4),  # csrc count
+                          pcs.Field("m", 1),  # m-bit
+                          pcs.Field("pt", 7, discriminator=True),  # payload type
+                          pcs.Field("seq", 16),  # sequence
+                          pcs.Field("ts", 32),  # timestamp
+                          pcs.Field("ssrc", 32),  # source
+                          pcs.OptionListField("opt")])  # optional fields
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        v = pcs.Field("v", 2)		# version
-        p = pcs.Field("p", 1)		# padded
-        x = pcs.Field("x", 1)		# extended
-        cc = pcs.Field("cc", 4)		# csrc count
-        m = pcs.Field("m", 1)		# m-bit
-        pt = pcs.Field("pt", 7, discriminator=True)	# payload type
-        seq = pcs.Field("seq", 16)	# sequence
-        ts = pcs.Field("ts", 32)        # timestamp
-        ssrc = pcs.Field("ssrc", 32)	# source
-        opt = pcs.OptionListField("opt")	# optional fields
-
-        pcs.Packet.__init__(self, [v, p, x, cc, m, pt, seq, ts, ssrc, opt], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3550 Real Time Protocol"
 
         if timestamp is None:
@@ -84,7 +81,7 @@ class rtp(pcs.Packet):
             while nc > 0 and remaining >= 4:
                 value = struct.unpack("!I", bytes[curr:curr+4])
                 csrc = pcs.Field("csrc", 32, default=value)
-                self.opt._options.append(csrc)
+                self.opt.append(csrc)
                 curr += 4
                 remaining -= 4
             # Parse Header Extension.
@@ -95,7 +92,7 @@ class rtp(pcs.Packet):
                 # Copy the entire chunk so we keep the type field.
                 ext = pcs.StringField("ext", extlen * 8, \
                                       default=bytes[curr:extlen+4])
-                self.opt._options.append(ext)
+                self.opt.append(ext)
                 curr += extlen
                 remaining -= extlen
             # Heed padding byte.
@@ -113,18 +110,15 @@ class rtp(pcs.Packet):
 class rtcp(pcs.Packet):
     """RFC 3550 Real Time Control Protocol header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("v", 2),
+                          pcs.Field("p", 1),
+                          pcs.Field("rc", 5),
+                          pcs.Field("pt", 8),
+                          pcs.Field("length", 16),
+                          pcs.Field("ssrc", 32)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        v = pcs.Field("v", 2)
-        p = pcs.Field("p", 1)
-        rc = pcs.Field("rc", 5)
-        pt = pcs.Field("pt", 8)
-        length = pcs.Field("length", 16)
-        ssrc = pcs.Field("ssrc", 32)
-
-        pcs.Packet.__init__(self, [v, p, rc, pt, length, ssrc], \
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3550 Real Time Control Protocol header"
 
         if timestamp is None:
@@ -145,17 +139,14 @@ class rtcp(pcs.Packet):
 class sender(pcs.Packet):
     """RFC 3550 Real Time Control Protocol sender message portion"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("ntpts", 64),
+                          pcs.Field("rtpts", 32),
+                          pcs.Field("spkts", 32),
+                          pcs.Field("sbytes", 32),
+                          pcs.OptionListField("opt")])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        ntpts = pcs.Field("ntpts", 64)
-        rtpts = pcs.Field("rtpts", 32)
-        spkts = pcs.Field("spkts", 32)
-        sbytes = pcs.Field("sbytes", 32)
-        opt = pcs.OptionListField("opt")
-
-        pcs.Packet.__init__(self, [ntpts, rtpts, spkts, sbytes, opt],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "RFC 3550 Real Time Control Protocol sender message portion"
 
         if timestamp is None:
@@ -48,17 +48,16 @@ import time
 class common(pcs.Packet):
     """SCTP common header class"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("sport", 16),
+                          pcs.Field("dport", 16),
+                          pcs.Field("tag", 32),
+                          pcs.Field("checksum", 32)])
+    _keys = ["dport", "sport"]
     _map = None
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        sport = pcs.Field("sport", 16)
-        dport = pcs.Field("dport", 16)
-        tag = pcs.Field("tag", 32)
-        checksum = pcs.Field("checksum", 32)
-        pcs.Packet.__init__(self, [sport, dport, tag, checksum],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP common header class"
         if timestamp is None:
             self.timestamp = time.time()
@@ -66,44 +65,44 @@ class common(pcs.Packet):
             self.timestamp = timestamp
 
         if (bytes is not None and len(bytes) > self.sizeof() ):
-            self.data = self.next(bytes[self.sizeof():len(bytes)],
+            self.data = self.next(buffer(bytes, self.sizeof()),
                                   discriminator = bytes[self.sizeof() + 1],
                                   timestamp = timestamp)
         else:
             self.data = None
 
-    def calc_checksum():
+    def calc_checksum(self):
         """Calculate and store the checksum for this SCTP message.
            Unlike other IP transports, SCTP does *not* need to see
-           preceding header fields when calculating the CRC32C."""
-        self.checksum = 0xffffffff
-        tmpbytes = self.bytes
+           preceding header fields when calculating the CRC32C.
+           The CRC covers the common header, with the checksum set to
+           zero, and every chunk after it, a packet at a time."""
+        self.checksum = 0
+        crc = pcs.packets.crc32c.CRC32C(self.getbytes())
         if self._head is not None:
-            tmpbytes += self._head.collate_following(self)
-        self.checksum = crc32c.cksum(tmpbytes)
+            n = self._head.index_of(self)
+            for p in self._head.packets[n+1:]:
+                crc.update(p.getbytes())
+        self.checksum = crc.digest()
 
 class payload(pcs.Packet):
     """SCTP payload chunk class"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 0),
+                          pcs.Field("reserved", 5),
+                          pcs.Field("unordered", 1),
+                          pcs.Field("beginning", 1),
+                          pcs.Field("ending", 1),
+                          pcs.Field("length", 16),
+                          pcs.Field("tsn", 32),
+                          pcs.Field("stream_id", 16),
+                          pcs.Field("stream_seq", 16),
+                          pcs.Field("ppi", 32)])
     _map = None
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 0)
-        reserved = pcs.Field("reserved", 5)
-        unordered = pcs.Field("unordered", 1)
-        beginning = pcs.Field("beginning", 1)
-        ending = pcs.Field("ending", 1)
-        length = pcs.Field("length", 16)
-        tsn = pcs.Field("tsn", 32)
-        stream_id = pcs.Field("stream_id", 16)
-        stream_seq = pcs.Field("stream_seq", 16)
-        ppi = pcs.Field("ppi", 32)
-        pcs.Packet.__init__(self,
-                            [type, reserved, unordered, beginning, ending, 
-                             length, tsn, stream_im, stream_seq, ppi],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP payload chunk class"
         if timestamp is None:
             self.timestamp = time.time()
@@ -112,7 +111,7 @@ class payload(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -123,22 +122,18 @@ class payload(pcs.Packet):
 class init(pcs.Packet):
     """SCTP init or init ack chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16),
+                          pcs.Field("tag", 32),
+                          pcs.Field("adv_recv_win_cred", 32),
+                          pcs.Field("outbound_streams", 16),
+                          pcs.Field("inbound_streams", 16),
+                          pcs.Field("initial_tsn", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """init or init ack chunk"""
-        type = pcs.Field("type", 8)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16)
-        tag = pcs.Field("tag", 32)
-        adv_recv_win_cred = pcs.Field("adv_recv_win_cred", 32)
-        outbound_streams = pcs.Field("outbound_streams", 16)
-        inbound_streams = pcs.Field("inbound_streams", 16)
-        initial_tsn = pcs.Field("initial_tsn", 32)
-        pcs.Packet.__init__(self, [type, flags, length, tag, 
-                                   adv_recv_win_cred, outbound_streams,
-                                   inbound_streams, initial_tsn],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP init or init ack chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -147,7 +142,7 @@ class init(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -155,23 +150,17 @@ class init(pcs.Packet):
 class sack(pcs.Packet):
     """SCTP ACK chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 3),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16),
+                          pcs.Field("cumulative_tsn_ack", 32),
+                          pcs.Field("adv_recv_win_cred", 32),
+                          pcs.Field("gap_ack_blocks", 16),
+                          pcs.Field("duplicate_tsns", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 3)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16)
-        cumulative_tsn_ack = pcs.Field("cumulative_tsn_ack", 32)
-        adv_recv_win_cred = pcs.Field("adv_recv_win_cred", 32)
-        gap_ack_blocks = pcs.Field("gap_ack_blocks", 16)
-        duplicate_tsns = pcs.Field("duplicate_tsns", 16)
-        pcs.Packet.__init__(self, [type, flag, length,
-                                   cumulative_tsn_ack,
-                                   adv_recv_win_cred,
-                                   gap_ack_blocks,
-                                   duplicate_tsns],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "common header initialization"
         if timestamp is None:
             self.timestamp = time.time()
@@ -180,7 +169,7 @@ class sack(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -188,15 +177,13 @@ class sack(pcs.Packet):
 class heartbeat(pcs.Packet):
     """SCTP heartbeat chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 4),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 4)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16)
-        pcs.Packet.__init__(self, [type, flags, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP heartbeat chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -205,7 +192,7 @@ class heartbeat(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -213,16 +200,14 @@ class heartbeat(pcs.Packet):
 class abort(pcs.Packet):
     """SCTP abort chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 6),
+                          pcs.Field("reserved", 7),
+                          pcs.Field("tag", 1),
+                          pcs.Field("length", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 6)
-        reserved = pcs.Field("reserved", 7)
-        tag = pcs.Field("tag", 1)
-        length = pcs.Field("length", 16)
-        pcs.Packet.__init__(self, [type, reserved, tag, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP abort chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -231,7 +216,7 @@ class abort(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -239,16 +224,14 @@ class abort(pcs.Packet):
 class shutdown(pcs.Packet):
     """SCTP shutdown chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 7),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16, default = 8),
+                          pcs.Field("cumulative_tsn", 32)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 7)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16, default = 8)
-        cumulative_tsn = pcs.Field("cumulative_tsn", 32)
-        pcs.Packet.__init__(self, [type, flags, length, cumulative_tsn],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP shutdown chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -257,7 +240,7 @@ class shutdown(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -265,15 +248,13 @@ class shutdown(pcs.Packet):
 class shutdown_ack(pcs.Packet):
     """SCTP Shutdown ACK Chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 1),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16, default = 4)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 1)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16, default = 4)
-        pcs.Packet.__init__(self, [type, flags, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP Shutdown ACK Chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -282,7 +263,7 @@ class shutdown_ack(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -290,15 +271,13 @@ class shutdown_ack(pcs.Packet):
 class operation_error(pcs.Packet):
     """SCTP operation error chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 9),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 9)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16)
-        pcs.Packet.__init__(self, [type, flags, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP operation error chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -307,7 +286,7 @@ class operation_error(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -315,15 +294,13 @@ class operation_error(pcs.Packet):
 class cookie_echo(pcs.Packet):
     """SCTP Cookie Echo Chunk"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 10),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 10)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16)
-        pcs.Packet.__init__(self, [type, flags, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP Cookie Echo Chunk"
         if timestamp is None:
             self.timestamp = time.time()
@@ -332,7 +309,7 @@ class cookie_echo(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -340,15 +317,13 @@ class cookie_echo(pcs.Packet):
 class cookie_ack(pcs.Packet):
     """SCTP Cookie ACK"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 11),
+                          pcs.Field("flags", 8),
+                          pcs.Field("length", 16, default = 4)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 11)
-        flags = pcs.Field("flags", 8)
-        length = pcs.Field("length", 16, default = 4)
-        pcs.Packet.__init__(self, [type, flags, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCP Cookie ACK"
         if timestamp is None:
             self.timestamp = time.time()
@@ -356,7 +331,7 @@ class cookie_ack(pcs.Packet):
             self.timestamp = timestamp
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -364,16 +339,14 @@ class cookie_ack(pcs.Packet):
 class shutdown_complete(pcs.Packet):
     """SCTP Shutdown Complete"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("type", 8, default = 14),
+                          pcs.Field("reserved", 7),
+                          pcs.Field("tag", 1),
+                          pcs.Field("length", 16, default = 4)])
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """common header initialization"""
-        type = pcs.Field("type", 8, default = 14)
-        reserved = pcs.Field("reserved", 7)
-        tag = pcs.Field("tag", 1)
-        length = pcs.Field("length", 16, default = 4)
-        pcs.Packet.__init__(self, [type, reserved, tag, length],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "SCTP Shutdown Complete"
         if timestamp is None:
             self.timestamp = time.time()
@@ -382,7 +355,7 @@ class shutdown_complete(pcs.Packet):
 
 
         if (bytes is not None):
-            self.data = self.next(bytes[0:len(bytes)],
+            self.data = self.next(bytes,
                                   timestamp = timestamp)
         else:
             self.data = None
@@ -46,35 +46,31 @@ import struct
 
 class tcp(pcs.Packet):
     """TCP"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("sport", 16),
+                          pcs.Field("dport", 16),
+                          pcs.Field("sequence", 32),
+                          pcs.Field("ack_number", 32),
+                          pcs.Field("offset", 4, default=5),
+                          pcs.Field("reserved", 3),
+                          pcs.Field("ns", 1),
+                          pcs.Field("cwr", 1),
+                          pcs.Field("ece", 1),
+                          pcs.Field("urg", 1),
+                          pcs.Field("ack", 1),
+                          pcs.Field("psh", 1),
+                          pcs.Field("rst", 1),
+                          pcs.Field("syn", 1),
+                          pcs.Field("fin", 1),
+                          pcs.Field("window", 16),
+                          pcs.Field("checksum", 16),
+                          pcs.Field("urg_pointer",16),
+                          pcs.OptionListField("options")])
+    _keys = ["dport", "sport"]
     _map = None
     
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a TCP packet"""
-        sport = pcs.Field("sport", 16)
-        dport = pcs.Field("dport", 16)
-        sequence = pcs.Field("sequence", 32)
-        ack_number = pcs.Field("ack_number", 32)
-        offset = pcs.Field("offset", 4, default=5)
-        reserved = pcs.Field("reserved", 3)
-        ns = pcs.Field("ns", 1)
-        cwr = pcs.Field("cwr", 1)
-        ece = pcs.Field("ece", 1)
-        urg = pcs.Field("urg", 1)
-        ack = pcs.Field("ack", 1)
-        psh = pcs.Field("psh", 1)
-        rst = pcs.Field("rst", 1)
-        syn = pcs.Field("syn", 1)
-        fin = pcs.Field("fin", 1)
-        window = pcs.Field("window", 16)
-        checksum = pcs.Field("checksum", 16)
-        urg_pointer = pcs.Field("urg_pointer",16)
-        options = pcs.OptionListField("options")
-        pcs.Packet.__init__(self, [sport, dport, sequence, ack_number, offset,
-                                   reserved, ns, cwr, ece, urg, ack, psh, rst,
-                                   syn, fin, window, checksum, urg_pointer,
-                                   options],
-                            bytes = bytes,  **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "TCP"
         if timestamp is None:
             self.timestamp = time.time()
@@ -100,6 +96,7 @@ class tcp(pcs.Packet):
                       (data_offset, len(bytes))
 
             if (options_len > 0):
+                options = self.options
                 curr = self.sizeof()
                 while (curr < data_offset):
                     option = struct.unpack('!B', bytes[curr])[0]
@@ -226,11 +223,8 @@ class tcp(pcs.Packet):
                         curr += optlen
 
         if (bytes is not None and (self.offset * 4 < len(bytes))):
-            self.data = self.next(bytes[(self.offset * 4):len(bytes)],
-                                  timestamp = timestamp)
-	    if self.data is None:
-                from pcs.packets.payload import payload
-                self.data = payload(bytes[(self.offset * 4):len(bytes)])
+            self.decapsulate(buffer(bytes, self.offset * 4), timestamp,
+                             payload.payload)
         else:
             self.data = None
 
@@ -248,7 +242,7 @@ class tcp(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = "TCP\n"
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             retval += "%s %s\n" % (field.name, field.value)
         return retval
 
@@ -307,33 +301,25 @@ class tcp(pcs.Packet):
     def calc_checksum_v4(self, ip):
         """Calculate and store the checksum for the TCP segment
            when encapsulated as an IPv4 payload with the given header."""
-        from pcs.packets.ipv4 import ipv4
-        from pcs.packets.ipv4 import pseudoipv4
         from socket import IPPROTO_TCP
         self.checksum = 0
-        payload = self._head.collate_following(self)
-        pip = pseudoipv4()
-        pip.src = ip.src
-        pip.dst = ip.dst
-        pip.protocol = IPPROTO_TCP
-        pip.length = len(self.getbytes()) + len(payload)
-        tmpbytes = pip.getbytes() + self.getbytes() + payload
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+        tmpbytes = self.getbytes()
+        length = len(tmpbytes) + self._head.length_following(self)
+        self.checksum = pcs.checksum.complement(
+            pcs.checksum.pseudo4(ip.src, ip.dst, IPPROTO_TCP, length) +
+            pcs.checksum.wordsum(tmpbytes) +
+            self._head.sum_following(self, len(tmpbytes)))
 
     def calc_checksum_v6(self, ip6):
         """Calculate and store the checksum for the TCP segment
            when encapsulated as an IPv6 payload with the given header."""
-        from pcs.packets.ipv4 import ipv4
-        from pcs.packets.pseudoipv6 import pseudoipv6
         self.checksum = 0
-        payload = self._head.collate_following(self)
-        pip6 = pseudoipv6()
-        pip6.src = ip6.src
-        pip6.dst = ip6.dst
-        pip6.next_header = ip6.next_header
-        pip6.length = len(self.getbytes()) + len(payload)
-        tmpbytes = pip6.getbytes() + self.getbytes() + payload
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+        tmpbytes = self.getbytes()
+        length = len(tmpbytes) + self._head.length_following(self)
+        self.checksum = pcs.checksum.complement(
+            pcs.checksum.pseudo6(ip6.src, ip6.dst, ip6.next_header, length) +
+            pcs.checksum.wordsum(tmpbytes) +
+            self._head.sum_following(self, len(tmpbytes)))
 
     def calc_length(self):
         """Calculate and store the length field(s) for this packet.
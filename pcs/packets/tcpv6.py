@@ -43,28 +43,26 @@ import time
 
 class tcpv6(pcs.Packet):
     """TCPv6"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("sport", 16),
+                          pcs.Field("dport", 16),
+                          pcs.Field("sequence", 32),
+                          pcs.Field("ack_number", 32),
+                          pcs.Field("offset", 4),
+                          pcs.Field("reserved", 6),
+                          pcs.Field("urgent", 1),
+                          pcs.Field("ack", 1),
+                          pcs.Field("push", 1),
+                          pcs.Field("reset", 1),
+                          pcs.Field("syn", 1),
+                          pcs.Field("fin", 1),
+                          pcs.Field("window", 16),
+                          pcs.Field("checksum", 16),
+                          pcs.Field("urg_pointer", 16)])
+    _keys = ["dport", "sport"]
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """initialize a TCP packet for IPv6"""
-        sport = pcs.Field("sport", 16)
-        dport = pcs.Field("dport", 16)
-        seq = pcs.Field("sequence", 32)
-        acknum = pcs.Field("ack_number", 32)
-        off = pcs.Field("offset", 4)
-        reserved = pcs.Field("reserved", 6)
-        urg = pcs.Field("urgent", 1)
-        ack = pcs.Field("ack", 1)
-        psh = pcs.Field("push", 1)
-        rst = pcs.Field("reset", 1)
-        syn = pcs.Field("syn", 1)
-        fin = pcs.Field("fin", 1)
-        window = pcs.Field("window", 16)
-        cksum = pcs.Field("checksum", 16)
-        urgptr = pcs.Field("urg_pointer", 16)
-        pcs.Packet.__init__(self, [sport, dport, seq, acknum, off, reserved,
-                                   urg, ack, psh, rst, syn, fin, window, cksum, urgptr],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "initialize a TCP packet for IPv6"
         if timestamp is None:
             self.timestamp = time.time()
@@ -74,7 +72,7 @@ class tcpv6(pcs.Packet):
     def __str__(self):
         """Walk the entire packet and pretty print the values of the fields.  Addresses are printed if and only if they are set and not 0."""
         retval = ""
-        for field in self._layout:
+        for field in self._fieldnames.itervalues():
             if (field.type == str):
                 retval += "%s %s\n" % (field.name, field.value)
             else:
@@ -100,18 +98,17 @@ class tcpv6(pcs.Packet):
            The packet must be part of a chain.
            To do this we need to use an overlay, and copy some
            header fields from the encapsulating IPv6 header."""
+        import pcs.packets.ipv6
+        from socket import IPPROTO_TCP
         self.checksum = 0
+        tmpbytes = self.getbytes()
+        total = pcs.checksum.wordsum(tmpbytes)
         if self._head is not None:
-            payload = self._head.collate_following(self)
-            ip6 = self._head.find_preceding(self, pcs.packets.ipv6)
+            (ip6, i) = self._head.find_preceding(self, pcs.packets.ipv6.ipv6)
             assert ip6 is not None, "No preceding IPv6 header."
-            pip6 = pseudoipv6()
-            pip6.src = ip.src
-            pip6.dst = ip.dst
-            pip6.next_header = ip6.next_header
-            pip6.length = len(self.getbytes()) + len(payload)
-            tmpbytes = pip6.getbytes() + self.getbytes() + payload
-        else:
-            tmpbytes = self.bytes
-        self.checksum = ipv4.ipv4_cksum(tmpbytes)
+            length = len(tmpbytes) + self._head.length_following(self)
+            total += pcs.checksum.pseudo6(ip6.src, ip6.dst, IPPROTO_TCP,
+                                          length)
+            total += self._head.sum_following(self, len(tmpbytes))
+        self.checksum = pcs.checksum.complement(total)
             
@@ -46,16 +46,14 @@ import ethernet_map
 class vlan(pcs.Packet):
     """IEEE 802.1q VLAN header"""
 
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("p", 3),
+                          pcs.Field("cfi", 1),  # Canonical MAC
+                          pcs.Field("vlan", 12),
+                          pcs.Field("type", 16, discriminator=True)])
     _map = ethernet_map.map
 
     def __init__(self, bytes = None, timestamp = None, **kv):
-        type = pcs.Field("type", 16, discriminator=True)
-        p = pcs.Field("p", 3)
-        cfi = pcs.Field("cfi", 1)		# Canonical MAC
-        vlan = pcs.Field("vlan", 12)
-
-        pcs.Packet.__init__(self, [ p, cfi, vlan, type ], bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "IEEE 802.1q VLAN header"
 
         if timestamp is None:
@@ -48,7 +48,12 @@ import time
 
 class ymsg_hdr(pcs.Packet):
     """YMSG"""
-    _layout = pcs.Layout()
+    _layout = pcs.Layout([pcs.Field("version", 16),
+                          pcs.Field("id", 16),
+                          pcs.Field("length", 16),
+                          pcs.Field("command", 16),
+                          pcs.Field("status", 32),
+                          pcs.Field("session", 32)])
 
     def __init__(self, bytes = None, timestamp = None, **kv):
         """Define the fields for a Yahoo Messenger header.
@@ -56,16 +61,7 @@ class ymsg_hdr(pcs.Packet):
         The header is followed by a set of key value pairs, defined in
         the ymsgkv class.
         """
-
-        version = pcs.Field("version", 16)
-        id = pcs.Field("id", 16)
-        length = pcs.Field("length", 16)
-        command = pcs.Field("command", 16)
-        status = pcs.Field("status", 32)
-        session = pcs.Field("session", 32)
-        pcs.Packet.__init__(self,
-                            [version, id, length, command, status, session],
-                            bytes = bytes, **kv)
+        pcs.Packet.__init__(self, bytes = bytes, **kv)
         self.description = "Define the fields for a Yahoo Messenger header"
         if timestamp is None:
             self.timestamp = time.time()
@@ -61,6 +61,10 @@ def main():
                       dest="network", default=None,
                       help="network we're looking at")
 
+    parser.add_option("-a", "--arrays",
+                      dest="arrays", default=False, action="store_true",
+                      help="decode the file into NumPy arrays, which is faster")
+
 
     (options, args) = parser.parse_args()
 
@@ -77,9 +81,26 @@ def main():
     packets = 0
     in_network = 0
 
+    if options.arrays:
+        # Work on the source addresses of all the IP packets at once.
+        import numpy
+        columns = file.read_columns()
+        packets = len(columns.lengths)
+        if ipv4 in columns:
+            src = columns[ipv4]["src"]
+        else:
+            src = numpy.zeros(0, numpy.uint32)
+        outside = (src & mask) != network
+        in_network = len(src) - int(outside.sum())
+        (addresses, counts) = numpy.unique(src[outside], return_counts=True)
+        srcmap = dict(zip(addresses.tolist(), counts.tolist()))
+        done = True
+
     while not done:
         try:
-            packet = file.readpkt()
+            # We only look at the IP header, don't decode anything
+            # beneath it.
+            packet = file.readpkt(decode_depth=2)
         except:
             done = True
         packets += 1
@@ -85,24 +85,26 @@ def main():
                      dst=inet_atol(options.ip_dest)) / \
         icmpv4(type=8) / icmpv4echo(id=12345) / payload(payload="foobar")
 
-    c.calc_lengths()
-
     #
     # Increment ICMP echo sequence number with each iteration.
+    # The chain is only built once, the template patches the IP id
+    # and the sequence number, and the checksums, for each packet.
     #
+    template = c.template(["ipv4.id", "icmpv4echo.sequence"])
     output = PcapConnector(options.ether_iface)
     ip = c.packets[1]
     echo = c.packets[3]
     count = int(options.count)
+    id = ip.id
+    sequence = echo.sequence
     while (count > 0):
-        c.calc_checksums()
-        c.encode()
+        bytes = template.stamp(id, sequence)
 
-        out = output.write(c.bytes, len(c.bytes))
+        out = output.write(bytes, len(bytes))
 #        packet = input.read()
 #        print packet
         sleep(1)
         count -= 1
-        ip.id += 1
-        echo.sequence += 1
+        id += 1
+        sequence += 1
 main()
@@ -71,6 +71,7 @@ PCS, tcp_streams.py
 
 """
 import pcs
+from pcs.packets.ethernet import ethernet
 from pcs.packets.ipv4 import *
 from socket import inet_ntoa, inet_aton, ntohl,  IPPROTO_TCP
 import signal
@@ -93,6 +94,8 @@ def main():
     (options, args) = parser.parse_args()
 
     file = pcs.PcapConnector(options.file)
+    # Only TCP over IPv4 is sieved, leave everything else in the file.
+    file.narrow(ethernet(type=0x800) / ipv4(protocol=IPPROTO_TCP))
 
     done = False
     data = None
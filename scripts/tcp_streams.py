@@ -83,7 +83,9 @@ PCS, tcp_window.py
 """
 
 import pcs
+import pcs.packets.ethernet
 from pcs.packets.ipv4 import *
+import pcs.packets.tcp
 from socket import inet_ntoa, inet_aton, ntohl,  IPPROTO_TCP
 
 def main():
@@ -102,6 +104,14 @@ def main():
     (options, args) = parser.parse_args()
 
     file = pcs.PcapConnector(options.file)
+    # We only ever look at the addresses and ports so don't bother
+    # decoding anything else.
+    file.project({pcs.packets.ethernet.ethernet: ['type'],
+                  ipv4: ['protocol', 'src', 'dst'],
+                  pcs.packets.tcp.tcp: ['sport', 'dport']})
+    # Nor read anything but TCP over IPv4 at all.
+    file.narrow(pcs.packets.ethernet.ethernet(type=0x800) /
+                ipv4(protocol=IPPROTO_TCP))
 
     done = False
     
@@ -136,7 +146,7 @@ def main():
         connection_map.append(quad)
 
     if (options.streams == False):
-        print "Analyzed %d packets, found %d connections:" % (packets,
+        print "Analyzed %d TCP packets, found %d connections:" % (packets,
                                                               len(connection_map))
     for connection in connection_map:
         if (options.streams):
@@ -59,6 +59,8 @@ each packet from a stream, indicated by the -s, -d, -S and -D
 flags, and either graphs or prints as text the changes in the
 window size.  Note that the program cannot tell if the window
 scaling option is on so the user must figure this out on their own.
+Only the packets of the stream are read from the file, so a change
+is shown at the number of the packet within the stream.
 
 Example
 
@@ -77,7 +79,9 @@ PCS, tcp_streams.py
 
 
 import pcs
+from pcs.packets.ethernet import ethernet
 from pcs.packets.ipv4 import *
+import pcs.packets.tcp
 from socket import inet_ntoa, inet_aton, ntohl,  IPPROTO_TCP
 
 import tempfile
@@ -128,6 +132,9 @@ def main():
 
     (options, args) = parser.parse_args()
 
+    if None in (options.source, options.dest, options.sport, options.dport):
+        parser.error("the source and destination addresses and ports are needed")
+
     file = pcs.PcapConnector(options.file)
 
     max = options.max
@@ -136,6 +143,12 @@ def main():
     
     dest = pcs.inet_atol(options.dest)
 
+    # Only read the packets going one way in the one stream, packets
+    # counts them and no others.
+    file.narrow(ethernet(type=0x800) /
+                ipv4(protocol=IPPROTO_TCP, src=source, dst=dest) /
+                pcs.packets.tcp.tcp(sport=options.sport, dport=options.dport))
+
     done = False
     packets = 0
     win_prev = 0
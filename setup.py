@@ -40,7 +40,8 @@
 from distutils.core import setup
 from distutils.command import config, clean
 from distutils.extension import Extension
-from Cython.Distutils import build_ext
+from distutils.errors import CCompilerError, DistutilsError
+from Cython.Distutils import build_ext as cython_build_ext
 import glob, os, sys
 
 class config_pcap(config.config):
@@ -101,6 +102,20 @@ class config_pcap(config.config):
     def run(self):
         self._pcap_config([ self.with_pcap ])
 
+class build_ext(cython_build_ext):
+    """Build the extensions, warning rather than failing when an
+    optional one cannot be built.  Distutils in Python 2 does not know
+    about the optional flag on an Extension, so we handle it here."""
+
+    def build_extension(self, ext):
+        try:
+            cython_build_ext.build_extension(self, ext)
+        except (CCompilerError, DistutilsError), e:
+            if not getattr(ext, 'optional', False):
+                raise
+            self.warn('building optional extension "%s" failed: %s' %
+                      (ext.name, e))
+
 # XXX The Pyrex Distutils extension is currently unable to propagate
 # dependencies on *.pxd files. If you change them you SHOULD rebuild from
 # scratch to be sure dependencies are not stale.
@@ -125,6 +140,15 @@ clock = Extension(name='pcs.clock',
                   libraries=[],
 	)
 
+# The bit field codec is optional, pcs falls back to pure Python
+# when it has not been built, so a failure to build it is not fatal.
+fast = Extension(name='pcs.fast',
+                 sources=[ 'pcs/fast/fast.pyx' ],
+                 library_dirs=[],
+                 libraries=[],
+	)
+fast.optional = True
+
 pcs_cmds = { 'config': config_pcap, 'build_ext':build_ext }
 
 setup(name='pcs',
@@ -137,7 +161,7 @@ setup(name='pcs',
       keywords='networking',
       packages = ['pcs', 'pcs.packets'],
       cmdclass=pcs_cmds,
-      ext_modules = [ bpf, clock, pcap, ],
+      ext_modules = [ bpf, clock, fast, pcap, ],
       scripts=['scripts/arpwhohas.py', 'scripts/dns_query.py',
       'scripts/http_get.py', 'scripts/pcap_info.py',
       'scripts/pcap_slice.py', 'scripts/ptptimes.py', 'scripts/tcp_sieve.py',
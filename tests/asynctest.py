@@ -0,0 +1,131 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check the asynchronous calls of the Connectors, which
+# hand back asyncio Futures rather than block.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    from pcs import *
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+
+class asyncTestCase(unittest.TestCase):
+    def setUp(self):
+        try:
+            import asyncio
+        except ImportError:
+            try:
+                import trollius as asyncio
+            except ImportError:
+                self.skipTest("neither asyncio nor trollius is installed")
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def udp(self):
+        """Return a pair of UDP connectors, the second sending to the
+        first."""
+        first = UDP4Connector()
+        first.file.bind(("127.0.0.1", 0))
+        second = UDP4Connector("127.0.0.1", first.file.getsockname()[1])
+        return (first, second)
+
+    def test_pcap(self):
+        """Packets which have been captured already come at once."""
+        first = PcapConnector("wwwtcp.out").readpkt()
+        file = PcapConnector("wwwtcp.out")
+        packet = self.loop.run_until_complete(
+            file.read_packet_async(self.loop))
+        self.assertEqual(packet.bytes, first.bytes)
+        chain = self.loop.run_until_complete(
+            file.read_chain_async(self.loop))
+        self.assertEqual(chain.packets[2].sport, 80)
+        chains = self.loop.run_until_complete(
+            file.try_read_n_chains_async(3, self.loop))
+        self.assertEqual(len(chains), 3)
+
+        file = PcapConnector("wwwtcp.out")
+        reply = ethernet() / ipv4() / tcp(sport=80)
+        future = file.expect_async([reply], loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(future), 0)
+        self.assertEqual(file.matches[0].packets[2].sport, 80)
+
+    def test_udp(self):
+        """Reads wait for the data, and get it in the order they
+        were made."""
+        (first, second) = self.udp()
+        reads = [first.read_packet_async(self.loop),
+                 first.read_chain_async(self.loop)]
+        self.assert_(not reads[0].done())
+        writes = [second.write_async("one", loop=self.loop),
+                  second.write_async("two", loop=self.loop)]
+        self.loop.run_until_complete(reads[1])
+        self.assertEqual([w.result() for w in writes], [3, 3])
+        self.assertEqual(reads[0].result().payload, "one")
+        self.assertEqual(reads[1].result().packets[0].payload, "two")
+        self.assertEqual(first.waiting, ([], []))
+        first.close()
+        second.close()
+
+    def test_expect(self):
+        """expect_async() waits for a match, a limit or a timeout."""
+        (first, second) = self.udp()
+        future = first.expect_async([TIMEOUT()], 0.05, loop=self.loop)
+        self.assertEqual(self.loop.run_until_complete(future), 0)
+        future = first.expect_async([], 0.05, loop=self.loop)
+        self.assertRaises(TimeoutError, self.loop.run_until_complete,
+                          future)
+
+        future = first.expect_async([LIMIT(), TIMEOUT()], 1, 2,
+                                    loop=self.loop)
+        second.write("one")
+        second.write("two")
+        self.assertEqual(self.loop.run_until_complete(future), 0)
+        first.close()
+        second.close()
+
+if __name__ == '__main__':
+    unittest.main()
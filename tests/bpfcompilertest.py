@@ -0,0 +1,158 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that filter chains compiled into BPF programs
+# accept the packets the chains match, and drop the ones they do not.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import Chain, PcapConnector
+    from pcs.bpfcompiler import make_program
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+    from pcs.packets.udp import udp
+
+def read_all(name):
+    """Read every packet in a file as a list of (bytes, chain)."""
+    file = PcapConnector(name)
+    result = []
+    while True:
+        try:
+            bytes = file.read()
+        except:
+            break
+        packet = file.unpack(bytes, file.dlink, file.dloff, 0)
+        result.append((bytes, packet.chain()))
+    return result
+
+class bpfcompilerTestCase(unittest.TestCase):
+    def check(self, patterns, packets):
+        """Check that the program for patterns accepts every packet
+        one of them matches, and return how many it accepts."""
+        prog = make_program(patterns)
+        self.assert_(prog.validate())
+        accepted = 0
+        for (bytes, chain) in packets:
+            matched = False
+            for pattern in patterns:
+                if pattern.matches(chain):
+                    matched = True
+            if prog.filter(bytes):
+                accepted += 1
+            else:
+                self.failIf(matched)
+        return accepted
+
+    def test_fields(self):
+        """Whole and partial bytes are tested."""
+        packets = read_all("wwwtcp.out")
+        http = ethernet(type=0x800) / ipv4(protocol=6) / tcp(dport=80)
+        self.assertEqual(self.check([http], packets),
+                         len([c for (b, c) in packets if http.matches(c)]))
+        # sub byte fields
+        syn = ethernet() / ipv4(hlen=5) / tcp(syn=1, ack=0)
+        self.assertEqual(self.check([syn], packets), 1)
+        nothing = ethernet() / ipv4() / tcp(sport=1)
+        self.assertEqual(self.check([nothing], packets), 0)
+        self.assertEqual(self.check([nothing, syn], packets), 1)
+        # fields with comparisons of their own are left to matches()
+        src = ethernet() / ipv4(src=0)
+        src.packets[1]._fieldnames["src"].compare = lambda p, f, o, of: True
+        self.assertEqual(self.check([src], packets), len(packets))
+
+    def test_header_length(self):
+        """Packets after an IPv4 header with options are found."""
+        ip = ipv4(version=4, hlen=6, protocol=17, ttl=64)
+        bytes = ethernet(type=0x800).bytes + ip.bytes + "\x94\x04\x00\x00"
+        bytes += udp(sport=1, dport=53).bytes
+        pattern = ethernet() / ipv4() / udp(dport=53)
+        prog = make_program(pattern)
+        self.assert_(prog.filter(bytes))
+        pattern.packets[2].dport = 54
+        prog = make_program(pattern)
+        self.failIf(prog.filter(bytes))
+
+    def test_long_program(self):
+        """Jumps past 255 instructions go through trampolines."""
+        def header(i):
+            return ethernet(src="\x00\x01\x02\x03\x04" + chr(i),
+                            dst="\x00\x0a\x0b\x0c\x0d" + chr(i),
+                            type=0x800 + i)
+        patterns = [Chain([header(i + j) for i in range(60)])
+                    for j in range(2)]
+        prog = make_program(patterns)
+        self.assert_(len(prog.instructions) > 512)
+        self.assert_(prog.validate())
+        for j in range(2):
+            bytes = "".join([header(i + j).bytes for i in range(60)])
+            self.assert_(prog.filter(bytes))
+            for k in (0, 400, len(bytes) - 1):
+                bad = bytes[:k] + chr(ord(bytes[k]) ^ 1) + bytes[k + 1:]
+                self.failIf(prog.filter(bad))
+
+    def test_filter_many(self):
+        """A list of buffers, or one buffer and a table of where each
+        packet is in it, is filtered in one call."""
+        packets = read_all("wwwtcp.out")
+        prog = make_program(ethernet() / ipv4() / tcp(sport=80))
+        frames = [bytes for (bytes, chain) in packets]
+        expected = [i for i in range(len(frames))
+                    if prog.filter(frames[i])]
+        self.assert_(0 < len(expected) < len(frames))
+        self.assertEqual(prog.filter_many(frames), expected)
+        self.assertEqual(prog.filter_many([]), [])
+        table = []
+        offset = 0
+        for frame in frames:
+            table.append((offset, len(frame)))
+            offset += len(frame)
+        whole = "".join(frames)
+        self.assertEqual(prog.filter_many(whole, table), expected)
+        self.assertEqual(prog.filter_many(buffer(whole), table), expected)
+        self.assertRaises(ValueError, prog.filter_many, whole,
+                          [(offset - 1, 2)])
+
+if __name__ == '__main__':
+    unittest.main()
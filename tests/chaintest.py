@@ -94,6 +94,177 @@ class chainTestCase(unittest.TestCase):
                          "strings not equal \ngot\n'%s'\nexpected\n'%s'" %
                          (string, test_string))
 
+    def test_chain_bytes(self):
+        """The bytes of a chain are put together when they are asked
+        for, and again only when a packet has changed."""
+        ether = ethernet(type=0x800)
+        ip = ipv4(ttl=64)
+        chain = ether / ip
+        self.assertEqual(chain._parts, None)
+        bytes = chain.bytes
+        self.assertEqual(bytes, ether.bytes + ip.bytes)
+        self.assert_(chain.bytes is bytes)
+        ip.ttl = 1
+        self.assertEqual(chain.bytes, ether.bytes + ip.bytes)
+        self.assertEqual(ipv4(chain.bytes[14:]).ttl, 1)
+        self.assert_(chain.clone().bytes is chain.bytes)
+
+    def test_encode_into(self):
+        """A chain can be written into a buffer of the caller's."""
+        chain = ethernet(type=0x800) / ipv4(ttl=64)
+        buf = bytearray(64)
+        self.assertEqual(chain.encode_into(buf, 10), 44)
+        self.assertEqual(str(buf[10:44]), chain.bytes)
+        self.assertEqual(str(buf[:10]), "\0" * 10)
+        self.assertEqual(chain.packets[1].encode_into(buf), 20)
+        self.assertEqual(str(buf[:20]), chain.packets[1].bytes)
+        self.assertRaises(IndexError, chain.encode_into, buf, 40)
+
+    def test_fixup(self):
+        """A chain fixed up in one pass has the same lengths and
+        checksums as one whose payload is put together for each layer,
+        including payloads of an odd length."""
+        from pcs.packets.udp import udp
+        from pcs.packets.payload import payload
+        ip = ipv4(src=0x0a000001, dst=0x0a000002, protocol=17, ttl=64)
+        udpp = udp(sport=53, dport=5353)
+        chain = ethernet(type=0x800) / ip / udpp / payload(payload="abc") / \
+                payload(payload="defgh")
+        chain.fixup()
+        self.assertEqual(chain.length_following(ip), 16)
+        self.assertEqual(len(chain.collate_following(ip)), 16)
+        self.assertEqual(ip.length, 36)
+        self.assertEqual(udpp.length, 16)
+        self.assertEqual(ipv4.ipv4_cksum(ip.bytes), 0)
+        following = chain.collate_following(udpp)
+        udpp.checksum = 0
+        expected = ipv4.ipv4_cksum(ip.bytes[12:20] + "\0\x11\0\x10" +
+                                   udpp.bytes + following)
+        chain.fixup()
+        self.assertEqual(udpp.checksum, expected)
+        # Changing the payload changes the checksum.
+        chain.packets[4].payload = "defgi"
+        chain.fixup()
+        self.assertNotEqual(udpp.checksum, expected)
+
+    def test_index(self):
+        """Packets are found by position and type after the chain
+        has changed."""
+        from pcs.packets.udp import udp
+        from pcs.packets.tcp import tcp
+        ether = ethernet(type=0x800)
+        ip = ipv4()
+        udpp = udp()
+        chain = ether / ip / udpp
+        self.assertEqual(chain.index_of(udpp), 2)
+        self.assertEqual(chain.find_first_of(ipv4), (ip, 1))
+        self.assertEqual(chain.find_preceding(udpp, ipv4), (ip, 1))
+        self.assertEqual(chain.find_preceding(ip, ipv4), (None, None))
+        tcpp = tcp()
+        chain.packets[2] = tcpp
+        self.assertEqual(chain.index_of(tcpp), 2)
+        self.assertEqual(chain.find_first_of(udp), (None, None))
+        self.assertEqual(chain.find_first_of(tcp), (tcpp, 2))
+        outer = ethernet()
+        chain.packets.insert(0, outer)
+        self.assertEqual(chain.find_preceding(tcpp, ipv4), (ip, 2))
+        self.assertEqual(chain.find_preceding(tcpp, ethernet), (ether, 1))
+        self.assertEqual(chain.find_preceding(ip, ethernet), (ether, 1))
+        self.assertEqual(chain.find_first_of(ethernet), (outer, 0))
+
+    def test_matches(self):
+        """Patterns match on the fields they compare, whole bytes, bits
+        and custom comparisons alike, and follow changes to them."""
+        from pcs.packets.tcp import tcp
+        file = PcapConnector("wwwtcp.out")
+        chain = file.readpkt().chain()
+        ip = chain.packets[1]
+        pattern = ipv4()
+        pattern.wildcard_mask()
+        self.assert_(pattern.matches(ip))
+        self.assert_(not pattern.matches(chain.packets[2]))
+        pattern.protocol = 6
+        pattern.hlen = 5
+        self.assert_(pattern.matches(ip))
+        pattern.hlen = 6
+        self.assert_(not pattern.matches(ip))
+        pattern._fieldnames['hlen'].compare = None
+        self.assert_(pattern.matches(ip))
+        pattern.src = ip.src ^ 1
+        self.assert_(not pattern.matches(ip))
+        pattern._fieldnames['src'].compare = lambda lp, lf, rp, rf: \
+                                             lf.value ^ rf.value == 1
+        self.assert_(pattern.matches(ip))
+        # Compound fields may have their comparisons changed in place.
+        pattern.options.compare = lambda lp, lf, rp, rf: False
+        self.assert_(not pattern.matches(ip))
+        pattern.options.compare = None
+        self.assert_(pattern.matches(ip))
+        # A chain of patterns matches the head of a chain.
+        filter = ethernet() / pattern / tcp()
+        filter.wildcard_mask()
+        filter.packets[2].dport = 80
+        self.assert_(filter.matches(chain))
+        filter.packets[2].dport = 81
+        self.assert_(not filter.matches(chain))
+        # Packets short of bytes are matched on the fields they have.
+        from pcs.packets.udp import udp
+        short = udp("\x00\x35\x00\x50")
+        pattern = udp()
+        pattern.wildcard_mask()
+        pattern.dport = 80
+        self.assert_(pattern.matches(short))
+        pattern.dport = 53
+        self.assert_(not pattern.matches(short))
+
+    def test_matches_layout(self):
+        """Packets laid out differently from a pattern are not matched
+        on its bytes."""
+        from pcs.packets.payload import payload
+        from pcs.packets.dns import dnsheader
+        pattern = payload(payload="two")
+        self.assert_(pattern.matches(payload("two")))
+        self.assert_(not pattern.matches(payload("twoXX")))
+        pattern = dnsheader(id=1)
+        pattern.wildcard_mask()
+        pattern.id = 1
+        self.assert_(pattern.matches(dnsheader(id=1)))
+        self.assert_(not pattern.matches(dnsheader(tcp=1, length=1)))
+        self.assert_(pattern.matches(dnsheader(tcp=1, id=1)))
+
+    def test_matches_clean(self):
+        """Matching a packet does not mark it for encoding, even when
+        its option list is compared."""
+        from pcs.packets.tcp import tcp
+        file = PcapConnector("wwwtcp.out")
+        t = file.readpkt().chain().packets[2]
+        t.bytes
+        def has_mss(lp, lf, rp, rf):
+            return len(rf.get_byname("mss")) > 0
+        patterns = []
+        for port in (80, 53678):
+            pattern = tcp()
+            pattern.wildcard_mask()
+            pattern.sport = port
+            pattern.options.compare = has_mss
+            pattern._fieldnames['window'].compare = \
+                lambda lp, lf, rp, rf: rf.value > 0
+            patterns.append(pattern)
+        for i in xrange(3):
+            self.assert_(patterns[0].matches(t) or patterns[1].matches(t))
+            self.assert_(patterns[1]._slow_matches(t) or
+                         patterns[0]._slow_matches(t))
+        self.assertEqual(t._needencode, False)
+        # Nor does it decode a lazily read packet.
+        file = PcapConnector("wwwtcp.out", lazy=True)
+        t = file.readpkt().chain().packets[2]
+        pattern = tcp()
+        pattern.wildcard_mask()
+        pattern.options.compare = has_mss
+        self.assert_(pattern.matches(t))
+        self.assert_(pattern._slow_matches(t))
+        self.assert_("window" in t._undecoded)
+
 if __name__ == '__main__':
     unittest.main()
 
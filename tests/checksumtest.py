@@ -0,0 +1,189 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check the Internet checksum module against a word by
+# word sum, and the checking of the checksums of captured packets.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import PcapConnector
+    from pcs import checksum
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.ipv4 import pseudoipv4
+    from pcs.packets.tcp import tcp
+
+import struct
+
+def slow_checksum(bytes):
+    """The Internet checksum, a word at a time."""
+    if len(bytes) % 2 == 1:
+        bytes += "\0"
+    total = 0
+    for i in range(len(bytes) / 2):
+        total += struct.unpack("!H", bytes[2*i:2*i+2])[0]
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+class checksumTestCase(unittest.TestCase):
+    def test_checksum(self):
+        """Sums of whole buffers match sums a word at a time, at
+        any length, odd or even."""
+        bytes = "".join([chr((i * 7 + 3) & 0xff) for i in range(3001)])
+        for length in [0, 1, 2, 3, 20, 1023, 1024, 1025, 3000, 3001]:
+            self.assertEqual(checksum.checksum(bytes[:length]),
+                             slow_checksum(bytes[:length]))
+        self.assertEqual(checksum.checksum(bytearray(bytes[:21])),
+                         slow_checksum(bytes[:21]))
+        self.assertEqual(ipv4.ipv4_cksum(bytes[:21]),
+                         slow_checksum(bytes[:21]))
+
+    def test_streaming(self):
+        """Buffers summed one at a time, however they are split, give
+        the same checksum as when they are put together."""
+        bytes = "".join([chr((i * 13 + 5) & 0xff) for i in range(101)])
+        expected = slow_checksum(bytes)
+        for split in [0, 1, 2, 7, 50, 101]:
+            self.assertEqual(checksum.checksum(bytes[:split],
+                                               buffer(bytes, split)),
+                             expected)
+        sum = checksum.Checksum()
+        sum.update(bytes[:3])
+        copy = sum.copy()
+        sum.update(bytes[3:])
+        self.assertEqual(sum.digest(), expected)
+        copy.add(checksum.wordsum(bytes[3:]), len(bytes) - 3)
+        self.assertEqual(copy.digest(), expected)
+
+    def test_pseudo(self):
+        """The sum of a pseudo header is that of its packet."""
+        pip = pseudoipv4()
+        pip.src = 0x0a000001
+        pip.dst = 0xc0a80101
+        pip.protocol = 6
+        pip.length = 1480
+        self.assertEqual(checksum.fold(checksum.pseudo4(0x0a000001,
+                                                        0xc0a80101, 6, 1480)),
+                         checksum.wordsum(pip.bytes))
+
+    def test_verify(self):
+        """Captured packets are checked against the bytes they were
+        captured as, and a changed byte is noticed."""
+        file = PcapConnector("wwwtcp.out", verify=True)
+        bytes = file.read()
+        packet = ethernet(bytes)
+        self.assertEqual(checksum.verify(packet, bytes), [])
+        corrupt = bytes[:40] + chr(ord(bytes[40]) ^ 1) + bytes[41:]
+        packet = ethernet(corrupt)
+        bad = checksum.verify(packet, corrupt)
+        self.assertEqual(len(bad), 1)
+        self.assert_(isinstance(bad[0], tcp))
+        corrupt = bytes[:22] + chr(ord(bytes[22]) ^ 1) + bytes[23:]
+        bad = checksum.verify(ethernet(corrupt), corrupt)
+        self.assert_(isinstance(bad[0], ipv4))
+        # The connector checks every packet it reads.
+        while True:
+            try:
+                file.readpkt()
+            except:
+                break
+            self.assertEqual(file.bad, [])
+        self.assertEqual(file.corrupt, 0)
+
+    def test_fragments(self):
+        """What a fragment carries above its network header is not
+        checked, as it is not the whole datagram."""
+        from pcs.packets.ipv4 import IP_MF
+        from pcs.packets.udp import udp
+        data = "".join([chr(i) for i in range(32)])
+        datagram = udp(sport=1, dport=2, length=40)
+        total = checksum.pseudo4(0x0a000001, 0x0a000002, 17, 40) + \
+                checksum.wordsum(datagram.bytes + data)
+        datagram.checksum = ~checksum.fold(total) & 0xffff
+        def fragment(offset, flags, payload):
+            ip = ipv4(version=4, hlen=5, length=20 + len(payload), ttl=64,
+                      flags=flags, offset=offset, protocol=17,
+                      src=0x0a000001, dst=0x0a000002)
+            ip.checksum = ipv4.ipv4_cksum(ip.bytes)
+            return ip.bytes + payload
+        whole = fragment(0, 0, datagram.bytes + data)
+        self.assertEqual(checksum.verify(ipv4(whole), whole), [])
+        first = fragment(0, IP_MF, datagram.bytes + data[:16])
+        self.assertEqual(checksum.verify(ipv4(first), first), [])
+        last = fragment(3, 0, data[16:])
+        self.assertEqual(checksum.verify(ipv4(last), last), [])
+        # The network header of a fragment is still checked.
+        first = first[:10] + chr(ord(first[10]) ^ 1) + first[11:]
+        bad = checksum.verify(ipv4(first), first)
+        self.assertEqual(len(bad), 1)
+        self.assert_(isinstance(bad[0], ipv4))
+
+    def test_extension_headers(self):
+        """The network header is found past any IPv6 extension
+        headers."""
+        from pcs.packets.ipv6 import ipv6, IPV6_DSTOPTS
+        from pcs.packets.udp import udp
+        from pcs.packets.payload import payload
+        class options(pcs.Packet):
+            _layout = pcs.Layout([pcs.Field("next_header", 8),
+                                  pcs.Field("length", 8),
+                                  pcs.Field("pad", 48)])
+        src = "\x20\x01\x0d\xb8" + "\0" * 11 + "\x01"
+        dst = "\x20\x01\x0d\xb8" + "\0" * 11 + "\x02"
+        data = "".join([chr(i) for i in range(32)])
+        datagram = udp(sport=1, dport=2, length=40)
+        total = checksum.pseudo6(src, dst, 17, 40) + \
+                checksum.wordsum(datagram.bytes + data)
+        datagram.checksum = ~checksum.fold(total) & 0xffff
+        ip = ipv6(next_header=0, length=56, hop=64, src=src, dst=dst)
+        chain = pcs.Chain([ip, options(next_header=IPV6_DSTOPTS),
+                           options(next_header=17), datagram,
+                           payload(payload=data)])
+        self.assertEqual(checksum.verify(chain), [])
+        datagram.checksum ^= 1
+        self.assertEqual(checksum.verify(chain), [datagram])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that the compiled layout codecs encode and decode
+# exactly as the original field by field code does.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import Codec, Field, StringField, OptionListField
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+    from pcs import PcapConnector
+
+def slow_encode(layout, values):
+    """Encode values one field at a time."""
+    bytearray = []
+    byte = 0
+    byteBR = 8
+    for (field, value) in zip(layout, values):
+        [byte, byteBR] = field.encode(bytearray, value, byte, byteBR)
+    return ''.join(bytearray)
+
+def slow_decode(layout, bytes):
+    """Decode values one field at a time."""
+    values = []
+    curr = 0
+    byteBR = 8
+    for field in layout:
+        [value, curr, byteBR] = field.decode(bytes, curr, byteBR)
+        values.append(value)
+    return values
+
+class codecTestCase(unittest.TestCase):
+    def test_codec_bitfields(self):
+        """Odd sized bit fields which add up to whole bytes are compiled."""
+        layout = [Field("a", 1), Field("b", 3), Field("c", 12),
+                  Field("d", 24), Field("e", 5), Field("f", 11),
+                  StringField("g", 3 * 8), Field("h", 64), Field("i", 72)]
+        codec = Codec.compile(layout)
+        self.assertEqual(codec.count, len(layout))
+        self.assertEqual(codec.size, 27)
+        values = [1, 5, 0xabc, 0x123456, 17, 0x7ff, "xyz",
+                  0x0123456789abcdefL, 0xff0123456789abcdefL]
+        bytes = codec.encode(values)
+        self.assertEqual(bytes, slow_encode(layout, values))
+        self.assertEqual(codec.decode(bytes), values)
+        self.assertEqual(codec.decode(bytes), slow_decode(layout, bytes))
+
+    def test_codec_prefix(self):
+        """Compilation stops at the first field it cannot handle, or at
+        the last byte boundary before it."""
+        layout = [Field("a", 16), Field("b", 4),
+                  OptionListField("options")]
+        codec = Codec.compile(layout)
+        self.assertEqual(codec.count, 1)
+        self.assertEqual(codec.size, 2)
+
+    def test_codec_shared(self):
+        """Packets of the same shape share one codec."""
+        self.assertTrue(ipv4()._codec is ipv4()._codec)
+        self.assertEqual(tcp()._codec.size, 20)
+
+    def test_codec_ipv4(self):
+        """Check a captured IPv4 header decodes the same both ways."""
+        file = PcapConnector("loopping.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        names = ip._codec.names
+        values = slow_decode([ip._fieldnames[name] for name in names[:12]],
+                             ip.bytes)
+        for i in xrange(12):
+            self.assertEqual(getattr(ip, names[i]), values[i],
+                             "%s not equal" % names[i])
+        self.assertEqual(ip.getbytes(), packet[file.dloff:file.dloff+20])
+
+    def test_codec_off(self):
+        """With pcs.codecs turned off nothing is compiled, and packets
+        come out the same."""
+        file = PcapConnector("loopping.out")
+        packet = file.read()
+        bytes = packet[file.dloff:file.dloff+20]
+        ip = ipv4(bytes)
+        pcs.codecs = False
+        try:
+            self.assertEqual(ipv4()._codec.count, 0)
+            plain = ipv4(bytes)
+            self.assertEqual(plain.ttl, ip.ttl)
+            self.assertEqual(plain.src, ip.src)
+            plain.ttl = 1
+            ip.ttl = 1
+            self.assertEqual(plain.getbytes(), ip.getbytes())
+        finally:
+            pcs.codecs = True
+        self.assertEqual(ipv4()._codec.count, 12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that decoding a capture into NumPy arrays gives the
+# same values as decoding it packet by packet.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import PcapConnector
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.localhost import localhost
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.icmpv4 import icmpv4
+    from pcs.packets.tcp import tcp
+
+def read_all(file):
+    """Read every packet in a file as a list of chains."""
+    chains = []
+    while True:
+        try:
+            chains.append(file.readpkt().chain())
+        except:
+            break
+    return chains
+
+class columnsTestCase(unittest.TestCase):
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+    def check(self, name):
+        """Every layer of every packet in a file is a row of the arrays
+        of its class, with the same values."""
+        columns = PcapConnector(name).read_columns()
+        chains = read_all(PcapConnector(name))
+        self.assertEqual(len(columns.lengths), len(chains))
+        self.assertEqual(len(columns.timestamps), len(chains))
+        rows = 0
+        for (frame, chain) in enumerate(chains):
+            offset = 0
+            for packet in chain.packets:
+                if type(packet) in columns:
+                    table = columns[type(packet)]
+                    row = table[(table["_frame"] == frame) &
+                                (table["_offset"] == offset)]
+                    self.assertEqual(len(row), 1)
+                    for field in table.dtype.names[2:]:
+                        value = row[0][field]
+                        if table.dtype[field].kind == "V":
+                            value = value.tobytes()
+                        self.assertEqual(getattr(packet, field), value)
+                    rows += 1
+                offset += len(packet.bytes)
+        self.assertEqual(rows, sum([len(table)
+                                    for table in columns.itervalues()]))
+        return columns
+
+    def test_tcp(self):
+        """Decode a TCP capture."""
+        columns = self.check("wwwtcp.out")
+        self.assertEqual(len(columns[tcp]), 18)
+        self.assertEqual(columns[tcp]["_offset"][0], 34)
+        self.assertEqual(list(columns[tcp]["dport"][:2]), [80, 53678])
+
+    def test_ping(self):
+        """Decode ping captures, with bit fields and a loopback link."""
+        columns = self.check("etherping.out")
+        self.assertEqual(set(columns[ipv4]["version"]), set([4]))
+        self.assertEqual(len(columns[icmpv4]), 10)
+        columns = self.check("loopping.out")
+        self.assert_(localhost in columns)
+
+    def test_dtype(self):
+        """The dtype of a class comes from its layout."""
+        from pcs.columns import dtype
+        import numpy
+        d = dtype(ipv4)
+        self.assertEqual(d.names[:3], ("_frame", "_offset", "version"))
+        self.assertEqual(d["flags"], numpy.dtype(numpy.uint8))
+        self.assertEqual(d["src"], numpy.dtype(numpy.uint32))
+        self.assert_("options" not in d.names)
+        self.assertEqual(dtype(ethernet)["src"], numpy.dtype("V6"))
+
+    def test_bytes(self):
+        """Byte fields keep the NULs at their ends."""
+        from pcs.columns import decode
+        src = "\x00\x01\x02\x03\x04\x00"
+        frame = ethernet(src=src, dst="\xff" * 6, type=0x88b5)
+        columns = decode([(0.0, frame.bytes)], ethernet)
+        self.assertEqual(columns[ethernet]["src"][0].tobytes(), src)
+
+    def test_count(self):
+        """Only count packets are read."""
+        columns = PcapConnector("wwwtcp.out").read_columns(5)
+        self.assertEqual(len(columns[ethernet]), 5)
+
+if __name__ == '__main__':
+    unittest.main()
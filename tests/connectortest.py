@@ -190,6 +190,172 @@ class pcapTestCase(unittest.TestCase):
         assert (ipnew != None)
         self.assertEqual(ip, ipnew, "packets should be equal but are not")
 
+    def test_expect_index(self):
+        """expect() only tries the patterns a chain may match, and still
+        returns the first of them which does."""
+        from pcs.packets.tcp import tcp
+
+        def pattern(dport):
+            e = ethernet(type=0x0800)
+            ip = ipv4()
+            t = tcp(dport=dport)
+            e.wildcard_mask()
+            ip.wildcard_mask()
+            t.wildcard_mask()
+            e.wildcard_mask(['type'], False)
+            t.wildcard_mask(['dport'], False)
+            return Chain([e, ip, t])
+
+        patterns = [pattern(port) for port in range(1000, 1100)]
+        patterns.append(pattern(80))
+        patterns.append(EOF())
+        index = PatternIndex(patterns)
+        self.assertEqual(index.rest, [])
+        self.assertEqual(len(index.keys), 1)
+
+        chain = PcapConnector("wwwtcp.out").readpkt().chain()
+        self.assertEqual(index.candidates(chain), [100])
+        self.assertEqual(index.match(chain), 100)
+
+        # A pattern without a key is tried along with the rest, in
+        # the order given.
+        anything = Chain([ethernet(), ipv4()])
+        anything.wildcard_mask()
+        patterns.insert(50, anything)
+        index = PatternIndex(patterns)
+        self.assertEqual(index.rest, [50])
+        self.assertEqual(index.candidates(chain), [50, 101])
+        self.assertEqual(index.match(chain), 50)
+
+        file = PcapConnector("wwwtcp.out")
+        self.assertEqual(file.expect(patterns[:50] + patterns[51:]), 100)
+        self.assertEqual(file.match_index, 100)
+
+    def test_expect_offload(self):
+        """With offload set, expect() filters with BPF while it runs,
+        along with any filter set beforehand, and puts that filter back
+        afterwards."""
+        from pcs.packets.tcp import tcp
+        reply = ethernet() / ipv4() / tcp(sport=80)
+
+        # The first packet in the file is not a reply, the second is.
+        file = PcapConnector("wwwtcp.out")
+        self.assertEqual(file.offload, False)
+        self.assertEqual(file.expect([reply, LIMIT()], limit=1), 1)
+        file = PcapConnector("wwwtcp.out")
+        file.offload = True
+        self.assertEqual(file.expect([reply, LIMIT()], limit=1), 0)
+        self.assertEqual(file.matches[0].packets[2].sport, 80)
+        self.assertEqual(file.readpkt().data.data.sport, 53678)
+
+        # Only SYNs get through the filter set beforehand.
+        file = PcapConnector("wwwtcp.out")
+        syn = file.make_bpf_program(ethernet() / ipv4() / tcp(syn=1))
+        file.set_bpf_program(syn)
+        file.offload = True
+        data = ethernet() / ipv4() / tcp(syn=0)
+        self.assertEqual(file.expect([data, TIMEOUT()], 0.1), 1)
+        self.assert_(file.program is syn)
+
+    def test_narrow(self):
+        """narrow() only lets through packets which may match, along
+        with any filter set beforehand."""
+        from pcs.packets.tcp import tcp
+        def sports(file):
+            result = []
+            while True:
+                try:
+                    result.append(file.readpkt().data.data.sport)
+                except:
+                    return result
+        every = sports(PcapConnector("wwwtcp.out"))
+
+        file = PcapConnector("wwwtcp.out")
+        self.assert_(file.narrow(ethernet(type=0x800) / ipv4() /
+                                 tcp(sport=80)))
+        self.assertEqual(sports(file), [p for p in every if p == 80])
+
+        # A pattern for each direction lets through both of them.
+        file = PcapConnector("wwwtcp.out")
+        self.assert_(file.narrow([ethernet() / ipv4() / tcp(sport=80),
+                                  ethernet() / ipv4() / tcp(dport=80)]))
+        self.assertEqual(sports(file), every)
+
+        file = PcapConnector("wwwtcp.out")
+        file.set_bpf_program(file.make_bpf_program(ethernet() / ipv4() /
+                                                   tcp(syn=1)))
+        self.assert_(file.narrow(ethernet() / ipv4() / tcp(sport=80)))
+        self.assertEqual(sports(file), [80])
+
+    def test_expect_timeout(self):
+        """expect() times out on the monotonic clock, polling the same
+        file descriptor all along."""
+        from pcs.packets.tcp import tcp
+        file = PcapConnector("wwwtcp.out")
+        # Nothing in the file is from port 7.
+        never = ethernet() / ipv4() / tcp(sport=7)
+        start = monotonic()
+        self.assertEqual(file.expect([never, TIMEOUT()], 0.2), 1)
+        self.assert_(monotonic() - start >= 0.2)
+        poller = file.poller
+        self.assertEqual(poller.fds, [file.file.fileno()])
+        self.assertRaises(TimeoutError, file.expect, [never], 0.05)
+        self.assert_(file.poller is poller)
+
+    def test_poller(self):
+        """A Poller reports the file descriptors which may be read."""
+        import os
+        (r, w) = os.pipe()
+        poller = Poller()
+        poller.register(r)
+        poller.register(r)
+        self.assertEqual(poller.fds, [r])
+        self.assertEqual(poller.wait(0), [])
+        start = monotonic()
+        self.assertEqual(poller.wait(0.05), [])
+        self.assert_(monotonic() - start >= 0.05)
+        os.write(w, "x")
+        self.assertEqual(poller.wait(0), [r])
+        self.assertEqual(poller.wait(), [r])
+        poller.unregister(r)
+        self.assertEqual(poller.fds, [])
+        os.close(r)
+        os.close(w)
+
+    def test_expect_any(self):
+        """expect_any() reports which of its connectors matched."""
+        from pcs.packets.payload import payload
+        from pcs.packets.tcp import tcp
+        def udp():
+            first = UDP4Connector()
+            first.file.bind(("127.0.0.1", 0))
+            second = UDP4Connector("127.0.0.1", first.file.getsockname()[1])
+            return (first, second)
+        (a, b) = udp()
+        (c, d) = udp()
+        two = payload("two")
+        two.payload = "two"
+        pattern = Chain([two])
+        b.write("one")
+        d.write("two")
+        self.assertEqual(expect_any([a, c], [pattern, TIMEOUT()], 1),
+                         (c, 0))
+        self.assertEqual(c.matches[0].packets[0].payload, "two")
+        self.assertEqual(a.matches, None)
+        self.assertEqual(expect_any([a, c], [pattern, TIMEOUT()], 0.05),
+                         (None, 1))
+        self.assertRaises(TimeoutError, expect_any, [a, c], [pattern], 0.05)
+
+        file = PcapConnector("wwwtcp.out")
+        reply = ethernet() / ipv4() / tcp(sport=80)
+        self.assertEqual(expect_any([a, file], [reply], 1), (file, 0))
+        self.assertEqual(file.is_nonblocking, False)
+        b.write("three")
+        self.assertEqual(expect_any([a, c], [pattern, LIMIT()], 1, 1),
+                         (None, 1))
+        for connector in [a, b, c, d, file]:
+            connector.close()
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -409,5 +409,79 @@ class copyTestCase(unittest.TestCase):
         self.assert_(id(p2._fieldnames['id']) != id(p1._fieldnames['id']))
         pass
 
+    def test_clone_packet(self):
+        """A clone shares its values and bytes with the packet it came
+           from until either of them is changed."""
+        from pcs.packets.udp import udp
+        p1 = udp(sport=123, dport=53)
+        bytes = p1.bytes
+        p2 = p1.clone()
+        self.assert_(isinstance(p2, udp))
+        self.assert_(p2._values is p1._values)
+        self.assert_(p2.bytes is p1.bytes)
+        self.assertEqual(p2.description, p1.description)
+
+        p2.sport = 456
+        self.assert_(p2._values is not p1._values)
+        self.assertEqual(p1.sport, 123)
+        self.assertEqual(p1.bytes, bytes)
+        self.assertEqual(udp(p2.bytes).sport, 456)
+
+        # Changing the original does not change the clone either.
+        p3 = p1.clone()
+        p1.dport = 1
+        self.assertEqual(p3.dport, 53)
+        p1._fieldnames['sport'].value = 789
+        self.assertEqual(p3.sport, 123)
+        self.assertEqual(udp(p3.bytes).dport, 53)
+
+        # Compound fields are copied straight away.
+        from pcs.packets.tcp import tcp
+        t1 = tcp()
+        t1.options.append(pcs.Field("nop", 8, default=1))
+        t2 = t1.clone()
+        self.assert_(t2.options is not t1.options)
+        self.assert_(t2.options.packet is t2)
+        t2.options.append(pcs.Field("nop", 8, default=1))
+        self.assertEqual(len(t1.options), 1)
+
+    def test_clone_lazy(self):
+        """A clone of a lazily decoded packet decodes its own fields."""
+        from pcs.packets.ipv4 import ipv4
+        bytes = ipv4(id=123, ttl=64).bytes
+        with pcs.decoding(lazy=True):
+            p1 = ipv4(bytes)
+        p2 = p1.clone()
+        self.assertEqual(p2.id, 123)
+        self.assert_('ttl' in p1._undecoded)
+        p2.ttl = 1
+        self.assertEqual(p1.ttl, 64)
+        self.assertEqual(ipv4(p2.bytes).ttl, 1)
+        self.assertEqual(ipv4(p2.bytes).id, 123)
+
+    def test_clone_chain(self):
+        """A clone of a Chain shares its packets' values until they
+           are changed, and keeps the links between them."""
+        from pcs.packets.ethernet import ethernet
+        from pcs.packets.ipv4 import ipv4
+        from pcs.packets.udp import udp
+        c1 = ethernet(type=0x800) / ipv4(id=123) / udp(sport=123)
+        c1.packets[0].data = c1.packets[1]
+        c2 = c1.clone()
+        self.assertEqual(c2.bytes, c1.bytes)
+        for (p1, p2) in zip(c1.packets, c2.packets):
+            self.assert_(p2 is not p1)
+            self.assert_(p2._head is c2)
+        self.assert_(c2.packets[0]._values is c1.packets[0]._values)
+        self.assert_(c2.packets[2]._values is c1.packets[2]._values)
+        self.assert_(c2.packets[0].data is c2.packets[1])
+
+        c2.packets[1].id = 456
+        c2.encode()
+        self.assertEqual(c1.packets[1].id, 123)
+        self.assert_(c2.packets[0]._values is c1.packets[0]._values)
+        self.assertNotEqual(c2.bytes, c1.bytes)
+        self.assertEqual(c2.bytes[:14], c1.bytes[:14])
+
 if __name__ == '__main__':
     unittest.main()
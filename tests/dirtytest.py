@@ -0,0 +1,188 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that packets are only re-encoded when something
+# in them has changed, and that their length is known without encoding.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import PcapConnector
+    from pcs.packets.ipv4 import ipv4, ipv4opt
+    from pcs.packets.tcp import tcp
+    from pcs.packets.payload import payload
+
+class counter(object):
+    """Count the calls made to a packet's encode method."""
+    def __init__(self, packet):
+        self.calls = 0
+        self.encode = packet.encode
+        packet.encode = self
+
+    def __call__(self):
+        self.calls += 1
+        self.encode()
+
+class dirtyTestCase(unittest.TestCase):
+    def test_decoded_is_clean(self):
+        """A decoded packet hands back its own bytes without encoding."""
+        file = PcapConnector("wwwtcp.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        encodes = counter(ip)
+        self.assertEqual(ip.ttl, 64)
+        self.assertEqual(ip.src, ip.src)
+        self.assertEqual(ip.bytes, packet[file.dloff:file.dloff + 20])
+        self.assertEqual(len(ip), 20)
+        self.assertEqual(encodes.calls, 0)
+
+    def test_field_write(self):
+        """Setting a field packs just that field into the bytes, the
+        packet is not encoded again."""
+        file = PcapConnector("wwwtcp.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        encodes = counter(ip)
+        ip.ttl = 1
+        self.assertEqual(ip.bytes[8], '\x01')
+        ip.bytes
+        len(ip)
+        self.assertEqual(encodes.calls, 0)
+        self.assertEqual(ip.bytes[:8], packet[file.dloff:file.dloff + 8])
+        self.assertEqual(ip.bytes[9:], packet[file.dloff + 9:file.dloff + 20])
+        self.assertEqual(ipv4(ip.bytes).ttl, 1)
+
+    def test_patch_bits(self):
+        """Fields which share bytes with a changed field keep their
+        values when it is packed."""
+        file = PcapConnector("wwwtcp.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        encodes = counter(ip)
+        ip.offset = 5
+        ip._fieldnames["id"].value = 7
+        copy = ipv4(ip.bytes)
+        self.assertEqual(encodes.calls, 0)
+        self.assertEqual((copy.flags, copy.offset, copy.id),
+                         (ip.flags, 5, 7))
+        ip.options.set_value([])
+        ip.tos = 8
+        self.assertEqual(ipv4(ip.bytes).tos, 8)
+        self.assertEqual(encodes.calls, 1)
+
+    def test_patch_lazy(self):
+        """Fields left in the bytes by a lazy decode survive a change
+        to a field they share bytes with."""
+        file = PcapConnector("wwwtcp.out", lazy=True)
+        ip = file.readpkt().data
+        eager = ipv4(ip.bytes)
+        encodes = counter(ip)
+        ip.hlen = 5
+        self.assert_('version' in ip._undecoded)
+        self.assert_('ttl' in ip._undecoded)
+        self.assertEqual(ip.bytes, eager.bytes)
+        self.assertEqual(encodes.calls, 0)
+        self.assert_('version' not in ip._undecoded)
+        self.assert_('ttl' in ip._undecoded)
+
+    def test_option_append(self):
+        """Changing an option list marks the packet as changed."""
+        ip = ipv4()
+        self.assertEqual(len(ip.bytes), 20)
+        ip.options.append(ipv4opt(148))
+        self.assertEqual(len(ip), 24)
+        self.assertEqual(len(ip.bytes), 24)
+        ip.options.set_value([])
+        self.assertEqual(len(ip.bytes), 20)
+
+    def test_option_read(self):
+        """Reading an option list is free, changing it or an option in
+        it marks the packet as changed."""
+        file = PcapConnector("wwwtcp.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        t = ip.data
+        t.bytes
+        encodes = counter(t)
+        self.assertEqual(len(t.options), 9)
+        self.assertEqual(t.options[1], 1)
+        t._fieldnames["options"]
+        t.bytes
+        self.assertEqual(encodes.calls, 0)
+        mss = t.options.get_byname("mss")[0]
+        mss.value = pcs.Field("v", 16, default=536)
+        self.assertEqual(t.bytes[22:24], "\x02\x18")
+        self.assertEqual(encodes.calls, 1)
+        t.options[1] = 0
+        self.assertEqual(t.bytes[24], "\x00")
+        self.assertEqual(encodes.calls, 2)
+
+    def test_len_from_widths(self):
+        """The length of a changed packet comes from its field widths."""
+        file = PcapConnector("wwwtcp.out")
+        packet = file.read()
+        ip = ipv4(packet[file.dloff:len(packet)])
+        t = ip.data
+        t.window = 1024
+        encodes = counter(t)
+        self.assertEqual(len(t), t.offset * 4)
+        self.assertEqual(encodes.calls, 0)
+        self.assertEqual(len(t.bytes), t.offset * 4)
+        self.assertEqual(encodes.calls, 1)
+        data = payload("1234")
+        self.assertEqual(len(data), 4)
+
+    def test_lengthvalue_change(self):
+        """Changing a length value field marks its packet as changed."""
+        lv = pcs.LengthValueField("lv", pcs.Field("l", 8),
+                                  pcs.StringField("v", 3 * 8))
+        p = pcs.Packet([pcs.Field("f", 8), lv])
+        p.bytes
+        self.assertEqual(p._needencode, False)
+        lv.set_value("abc")
+        self.assertEqual(p._needencode, True)
+        self.assertEqual(p.bytes, "\x00\x03abc")
+        self.assertEqual(len(p), 5)
+
+if __name__ == '__main__':
+    unittest.main()
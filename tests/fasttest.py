@@ -0,0 +1,195 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that the compiled bit field codec, pcs.fast, and the
+# pure Python code in Field give the same results, field by field and
+# for every case in the other tests.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+
+import glob
+import random
+import StringIO
+
+class codec(object):
+    """Run a block of code with pcs.fast, or without it."""
+    def __init__(self, fast):
+        self.fast = fast
+
+    def __enter__(self):
+        self.saved = pcs.fast
+        if not self.fast:
+            pcs.fast = None
+
+    def __exit__(self, *args):
+        pcs.fast = self.saved
+
+class perfield(object):
+    """Run a block of code with pcs.codecs turned off, so that every
+    field goes through Field.decode and Field.encode."""
+    def __enter__(self):
+        self.saved = pcs.codecs
+        pcs.codecs = False
+
+    def __exit__(self, *args):
+        pcs.codecs = self.saved
+
+def decode(field, bytes, curr, byteBR):
+    """Decode a field, returning the result or the exception raised."""
+    try:
+        return field.decode(bytes, curr, byteBR)
+    except Exception, e:
+        return type(e)
+
+def encode(field, value, byte, byteBR):
+    """Encode a field, returning the result and the bytes, or the
+    exception raised."""
+    bytearray = []
+    try:
+        return (field.encode(bytearray, value, byte, byteBR), bytearray)
+    except Exception, e:
+        return type(e)
+
+def outcomes(path):
+    """Run the tests in a test file and return the outcome of each."""
+    env = {'__name__': '__main__', '__file__': path}
+    main = unittest.main
+    unittest.main = lambda *args, **kv: None
+    try:
+        try:
+            execfile(path, env)
+        except Exception, e:
+            return {path: type(e)}
+    finally:
+        unittest.main = main
+    suite = unittest.TestSuite()
+    for value in env.values():
+        if isinstance(value, type) and issubclass(value, unittest.TestCase):
+            suite.addTests(unittest.makeSuite(value))
+    result = unittest.TextTestRunner(stream=StringIO.StringIO()).run(suite)
+    outcome = dict([(test.id(), "ok") for test in suite])
+    for (test, trace) in result.failures:
+        outcome[test.id()] = "failed"
+    for (test, trace) in result.errors:
+        outcome[test.id()] = "error"
+    return outcome
+
+class fastTestCase(unittest.TestCase):
+    def setUp(self):
+        if pcs.fast is None:
+            self.skipTest("pcs.fast has not been built")
+
+    def test_decode(self):
+        """Every width of field decodes the same from every position."""
+        random.seed(0)
+        bytes = "".join([chr(random.randrange(256)) for i in range(24)])
+        for width in range(0, 130):
+            field = pcs.Field("f", width)
+            for byteBR in range(1, 9):
+                for curr in (0, 1, 3, 16, 23, 24, 30):
+                    for data in (bytes, buffer(bytes, 2)):
+                        with codec(True):
+                            fast = decode(field, data, curr, byteBR)
+                        with codec(False):
+                            slow = decode(field, data, curr, byteBR)
+                        # repr() so that an int and a long differ
+                        self.assertEqual(repr(fast), repr(slow),
+                                         (width, byteBR, curr, fast, slow))
+
+    def test_encode(self):
+        """Every width of field encodes the same into every position,
+        including values which are too wide for their fields."""
+        random.seed(0)
+        for width in range(0, 130):
+            field = pcs.Field("f", width)
+            values = [0, (1 << width) - 1, (1 << (width + 3)) + 5, -1,
+                      random.getrandbits(width + 1)]
+            for value in values:
+                for byteBR in range(1, 9):
+                    byte = random.randrange(256) & ~((1 << byteBR) - 1)
+                    with codec(True):
+                        fast = encode(field, value, byte, byteBR)
+                    with codec(False):
+                        slow = encode(field, value, byte, byteBR)
+                    self.assertEqual(fast, slow,
+                                     (width, value, byteBR, fast, slow))
+
+    def test_crc32c(self):
+        """The CRC-32c comes out the same at every length, from every
+        kind of buffer."""
+        from pcs.packets import crc32c
+        random.seed(0)
+        bytes = "".join([chr(random.randrange(256)) for i in range(100)])
+        for length in range(100):
+            for data in (bytes[:length], buffer(bytes, 0, length),
+                         bytearray(bytes[:length])):
+                fast = crc32c.add(0xffffffffL, data)
+                saved = crc32c.fast
+                crc32c.fast = None
+                try:
+                    slow = crc32c.add(0xffffffffL, data)
+                finally:
+                    crc32c.fast = saved
+                self.assertEqual(fast, slow, length)
+
+    def test_suites(self):
+        """Every other test comes out the same with and without
+        pcs.fast.  The Codec would decode and encode most fields
+        itself, so it is turned off and every field goes through
+        Field."""
+        for path in sorted(glob.glob("*test.py")):
+            # maptest changes the ethernet map for good, so it can only
+            # be run once.
+            if path in ("fasttest.py", "maptest.py"):
+                continue
+            with perfield():
+                with codec(True):
+                    fast = outcomes(path)
+                with codec(False):
+                    slow = outcomes(path)
+            self.assertEqual(fast, slow, path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that packet classes declare their layouts once,
+# at class level, and that packets sharing a layout share nothing else.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4, ipv4opt
+    from pcs.packets.udp import udp
+    from pcs.packets.dns import dnsheader
+
+class layoutTestCase(unittest.TestCase):
+    def test_class_layout(self):
+        """A class's layout is compiled once and used by every packet."""
+        self.assert_(isinstance(udp._layout, pcs.Layout))
+        self.assertEqual(udp._layout.shared, True)
+        self.assertEqual(udp._layout.names,
+                         ["sport", "dport", "length", "checksum"])
+        self.assertEqual(udp._layout.bitlength, 64)
+        self.assertEqual(udp._layout.offsets, [0, 16, 32, 48])
+        self.assert_(ipv4._layout.discriminator is
+                     ipv4._layout[ipv4._layout.index["protocol"]])
+        u1 = udp(sport = 53)
+        u2 = udp(sport = 54)
+        self.assert_(u1._layout is udp._layout)
+        self.assert_(u2._layout is u1._layout)
+        self.assertEqual(udp().sport, 0)
+
+    def test_plain_list(self):
+        """A class may declare its layout as a plain list of fields."""
+        class plain(pcs.Packet):
+            _layout = [pcs.Field("a", 8), pcs.Field("b", 8)]
+        self.assert_(isinstance(plain._layout, pcs.Layout))
+        p = plain(bytes = "\x01\x02")
+        self.assertEqual((p.a, p.b), (1, 2))
+
+    def test_values_not_shared(self):
+        """Packets of one class do not share field values."""
+        e1 = ethernet(bytes = "\x00\x01\x02\x03\x04\x05" \
+                              "\x06\x07\x08\x09\x0a\x0b\x08\x00")
+        e2 = ethernet()
+        e2.type = 0x86dd
+        self.assertEqual(e1.type, 0x800)
+        self.assertEqual(e1.dst, "\x00\x01\x02\x03\x04\x05")
+        self.assertEqual(e2.dst, "")
+        self.assertEqual(ethernet._layout[2].value, 0)
+
+    def test_options_not_shared(self):
+        """Each packet has its own copy of the compound fields of the
+        class's layout."""
+        i1 = ipv4()
+        i2 = ipv4()
+        self.assert_(i1.options is not i2.options)
+        self.assert_(i1.options is not \
+                     ipv4._layout[ipv4._layout.index["options"]])
+        i1.options.append(ipv4opt(pcs.packets.ipv4.IPOPT_NOP))
+        self.assertEqual(len(i1.options), 1)
+        self.assertEqual(len(i2.options), 0)
+        self.assertEqual(len(ipv4().options), 0)
+
+    def test_fieldnames(self):
+        """Fields reached through _fieldnames write through to the
+        packet, and the class's fields are untouched."""
+        u = udp()
+        u._fieldnames["dport"].value = 4242
+        self.assertEqual(u.dport, 4242)
+        self.assertEqual(u._fieldnames["dport"].value, 4242)
+        self.assertEqual(udp._layout[1].value, 0)
+        self.assertEqual(u.bytes, "\x00\x00\x10\x92\x00\x00\x00\x00")
+        self.assertEqual(u._fieldnames.keys(),
+                         ["sport", "dport", "length", "checksum"])
+
+    def test_alternate_layout(self):
+        """A class may keep more than one shape of layout."""
+        d1 = dnsheader()
+        d2 = dnsheader(tcp = True)
+        self.assert_(d1._layout is dnsheader._layout)
+        self.assert_(d2._layout is dnsheader._tcplayout)
+        self.assertEqual(len(d1.bytes), 12)
+        self.assertEqual(len(d2.bytes), 14)
+
+    def test_two_discriminators(self):
+        """A class with two discriminators cannot be declared."""
+        def declare():
+            class bad(pcs.Packet):
+                _layout = pcs.Layout([pcs.Field("a", 8, discriminator=True),
+                                      pcs.Field("b", 8, discriminator=True)])
+        self.assertRaises(pcs.LayoutDiscriminatorError, declare)
+
+if __name__ == '__main__':
+    unittest.main()
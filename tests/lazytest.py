@@ -0,0 +1,191 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that lazily decoded and projected packets carry
+# the same values as fully decoded ones, and that layers are only
+# decoded when they are used.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import PcapConnector
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+
+def read_all(file):
+    """Read every packet in a file as a list of chains."""
+    chains = []
+    while True:
+        try:
+            chains.append(file.readpkt().chain())
+        except:
+            break
+    return chains
+
+class lazyTestCase(unittest.TestCase):
+    def test_lazy_values(self):
+        """Lazily decoded packets carry the same values as eager ones."""
+        eager = read_all(PcapConnector("wwwtcp.out"))
+        lazy = read_all(PcapConnector("wwwtcp.out", lazy=True))
+        self.assertEqual(len(eager), len(lazy))
+        self.assert_(len(eager) > 0)
+        for (e, l) in zip(eager, lazy):
+            self.assertEqual(len(e.packets), len(l.packets))
+            for (ep, lp) in zip(e.packets, l.packets):
+                self.assertEqual(type(ep), type(lp))
+                codec = ep._codec
+                for name in codec.names[:codec.count]:
+                    self.assertEqual(getattr(ep, name), getattr(lp, name))
+                self.assertEqual(ep.bytes, lp.bytes)
+
+    def test_lazy_on_access(self):
+        """Fields are only decoded when they are read."""
+        file = PcapConnector("wwwtcp.out", lazy=True)
+        ether = file.readpkt()
+        ip = ether.data
+        self.assert_('ttl' in ip._undecoded)
+        self.assertEqual(ip.ttl, 64)
+        self.assert_('ttl' not in ip._undecoded)
+        # Asking for the fields themselves decodes all of them.
+        ip._fieldnames
+        self.assertEqual(len(ip._undecoded), 0)
+
+    def test_projection(self):
+        """Projected fields are decoded up front, the rest on demand."""
+        file = PcapConnector("wwwtcp.out")
+        file.project({ipv4: ['src', 'dst'], tcp: ['sport', 'dport']})
+        ip = file.readpkt().data
+        tcpp = ip.data
+        for name in ['src', 'dst']:
+            self.assert_(name not in ip._undecoded)
+        self.assert_('id' in ip._undecoded)
+        for name in ['sport', 'dport']:
+            self.assert_(name not in tcpp._undecoded)
+        self.assert_('window' in tcpp._undecoded)
+        self.assertEqual(tcpp.sport, 53678)
+        self.assertEqual(tcpp.dport, 80)
+        file.project(None)
+        ip = file.readpkt().data
+        self.assertEqual(ip._undecoded, None)
+        self.assertRaises(TypeError, file.project, {int: ['src']})
+
+    def test_lazy_set(self):
+        """Setting a field which was never decoded encodes the new value."""
+        file = PcapConnector("wwwtcp.out", lazy=True)
+        ip = file.readpkt().data
+        ip.ttl = 1
+        copy = ipv4(ip.bytes)
+        self.assertEqual(copy.ttl, 1)
+        self.assertEqual(copy.src, ip.src)
+        self.assertEqual(copy.id, ip.id)
+
+    def test_decoding_scope(self):
+        """The decoding options only hold inside the with block."""
+        bytes = PcapConnector("wwwtcp.out").read()
+        with pcs.decoding(lazy=True):
+            self.assertEqual(pcs.decoding.lazy, True)
+            lazy = ethernet(bytes)
+        self.assertEqual(pcs.decoding.lazy, False)
+        self.assertEqual(pcs.decoding.fields, None)
+        eager = ethernet(bytes)
+        self.assertNotEqual(lazy._undecoded, None)
+        self.assertEqual(eager._undecoded, None)
+        self.assertEqual(lazy.src, eager.src)
+
+    def test_lazy_data(self):
+        """The next layer is only decoded when data is used."""
+        file = PcapConnector("wwwtcp.out")
+        ether = file.readpkt()
+        self.assertNotEqual(ether._decap, None)
+        ip = ether.data
+        self.assertEqual(ether._decap, None)
+        self.assert_(isinstance(ip, ipv4))
+        self.assert_(ether.data is ip)
+        self.assert_(isinstance(ip.data, tcp))
+
+    def test_decode_depth(self):
+        """Nothing below decode_depth layers is decoded."""
+        from pcs.packets.payload import payload
+        file = PcapConnector("wwwtcp.out")
+        ether = file.readpkt(decode_depth=2)
+        self.assert_(isinstance(ether.data, ipv4))
+        self.assert_(isinstance(ether.data.data, payload))
+        self.assertEqual(len(ether.chain().packets), 3)
+        chains = file.try_read_n_chains(2, decode_depth=1)
+        self.assertEqual(len(chains), 2)
+        for c in chains:
+            self.assert_(isinstance(c.packets[0], ethernet))
+            self.assert_(isinstance(c.packets[1], payload))
+
+    def test_stop_at(self):
+        """Decoding stops beneath a stop_at layer."""
+        from pcs.packets.payload import payload
+        file = PcapConnector("wwwtcp.out")
+        ip = file.readpkt(stop_at=ipv4).data
+        self.assert_(isinstance(ip, ipv4))
+        self.assert_(isinstance(ip.data, payload))
+        ether = file.readpkt()
+        self.assert_(isinstance(ether.data.data, tcp))
+
+    def test_no_copy(self):
+        """Each layer is handed a buffer onto the packet, not a copy,
+        and keeps only its own bytes once it is decoded."""
+        from pcs.packets.payload import payload
+        bytes = PcapConnector("wwwtcp.out").read()
+        self.assertEqual(type(bytes), str)
+        ether = ethernet(bytes)
+        self.assertEqual(type(ether._decap[0]), buffer)
+        self.assertEqual(str(ether._decap[0]), bytes[14:])
+        ip = ether.data
+        self.assertEqual(type(ip.bytes), str)
+        self.assertEqual(ip.bytes, bytes[14:34])
+        self.assertEqual(type(ip._decap[0]), buffer)
+        self.assertEqual(str(ip._decap[0]), bytes[34:])
+        tcp = ip.data
+        self.assertEqual(type(tcp.bytes), str)
+        self.assertEqual(ether.bytes + ip.bytes, bytes[:34])
+        self.assertEqual(payload(buffer(bytes, 20)).payload, bytes[20:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -81,5 +81,37 @@ class sctpTestCase(unittest.TestCase):
                          "strings are not equal \nexpected %s \ngot %s " % \
                          (expected, got))
 
+    def test_sctp_checksum(self):
+        """The CRC-32c of a message is that of its header and chunks,
+        however they are split up."""
+        from pcs import Chain
+        from pcs import checksum
+        from pcs.packets import crc32c
+        self.assertEqual(~crc32c.add(0xffffffffL, "123456789") & 0xffffffffL,
+                         0xE3069283L)
+        self.assertEqual(~crc32c.add(0xffffffffL, "\0" * 32) & 0xffffffffL,
+                         0x8A9136AAL)
+        bytes = "".join([chr(i) for i in range(61)])
+        crc = crc32c.CRC32C(bytes[:5])
+        crc.update(buffer(bytes, 5))
+        self.assertEqual(crc.digest(), crc32c.cksum(bytes))
+        ip = ipv4(protocol=132, src=0x0a000001, dst=0x0a000002, ttl=64)
+        header = common(sport=9999, dport=123, tag=10000)
+        chunk = payload(type=0, length=16, tsn=1)
+        chain = Chain([ip, header, chunk])
+        chain.fixup()
+        self.assertEqual(header.checksum,
+                         crc32c.cksum(header.bytes[:8] + "\0\0\0\0" +
+                                      chunk.bytes))
+        self.assertEqual(checksum.verify(chain), [])
+
+    def test_sctp_verify(self):
+        """The checksums of a capture, which are Adler-32s from before
+        RFC 3309, are checked as they are read."""
+        file = PcapConnector("sctp.pcap", verify=True)
+        for i in range(4):
+            file.readpkt()
+        self.assertEqual(file.corrupt, 0)
+
 if __name__ == '__main__':
     unittest.main()
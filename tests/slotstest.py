@@ -0,0 +1,103 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that packets and fields keep their state in slots,
+# without a __dict__ each, and still behave as they did.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs.packets.ethernet import ethernet
+    from pcs.packets.ipv4 import ipv4
+    from pcs.packets.tcp import tcp
+
+class slotsTestCase(unittest.TestCase):
+    def test_packet_slots(self):
+        """A decoded chain keeps no per packet dictionaries."""
+        file = pcs.PcapConnector("wwwtcp.out")
+        packet = file.readpkt()
+        file.close()
+        for p in packet.chain():
+            self.assertEqual(p.__dict__, {})
+        self.assert_(isinstance(packet.data, ipv4))
+        self.assert_(isinstance(packet.data.data, tcp))
+        self.assertNotEqual(packet.timestamp, None)
+
+    def test_field_slots(self):
+        """Fields keep their state in slots."""
+        for field in [pcs.Field("a", 8), pcs.StringField("s", 32),
+                      pcs.LengthValueField("lv", pcs.Field("", 8),
+                                           pcs.StringField("", 32)),
+                      pcs.TypeLengthValueField("tlv", pcs.Field("", 8),
+                                               pcs.Field("", 8),
+                                               pcs.Field("", 16)),
+                      pcs.OptionListField("options")]:
+            self.assert_(not hasattr(field, '__dict__'), field.name)
+
+    def test_views(self):
+        """The fields a packet hands out look like the class's fields
+        but carry the packet's values."""
+        ip = ipv4(ttl = 32)
+        field = ip._fieldnames["ttl"]
+        self.assertEqual(field.name, "ttl")
+        self.assertEqual(field.width, 8)
+        self.assertEqual(field.value, 32)
+        self.assertEqual(field.compare, pcs.Field.default_compare)
+        self.assertEqual(ipv4._layout[ipv4._layout.index["ttl"]].value, 64)
+        copy = field.__copy__()
+        self.assertEqual((copy.name, copy.width, copy.value),
+                         ("ttl", 8, 32))
+        self.assertEqual(copy.packet, None)
+        self.assertEqual(ip._fieldnames["protocol"].discriminator, True)
+
+    def test_extra_attributes(self):
+        """Packet classes may still keep attributes of their own."""
+        class tagged(pcs.Packet):
+            _layout = [pcs.Field("a", 8)]
+        p = tagged(bytes = "\x01")
+        p.tag = "red"
+        self.assertEqual((p.a, p.tag), (1, "red"))
+        self.assertEqual(p.bytes, "\x01")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# Copyright (c) 2005-2016, Neville-Neil Consulting
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither the name of Neville-Neil Consulting nor the names of its 
+# contributors may be used to endorse or promote products derived from 
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# File: $Id$
+#
+# Author: George V. Neville-Neil
+#
+# Description: Check that packets stamped out of a Template are the
+# same as the chains they stand for, fixed up in full.
+
+import unittest
+
+import sys
+
+if __name__ == '__main__':
+
+    if "-l" in sys.argv:
+        sys.path.insert(0, "../") # Look locally first
+        sys.argv.remove("-l") # Needed because unittest has issues
+                              # with extra arguments.
+
+    import pcs
+    from pcs import *
+    from pcs.packets.ethernet import *
+    from pcs.packets.ipv4 import *
+    from pcs.packets.icmpv4 import *
+    from pcs.packets.udp import *
+    from pcs.packets.payload import *
+
+import random
+
+def echo(id = 0, sequence = 0, dst = "10.0.0.2"):
+    """Return an ICMP echo request chain."""
+    return ethernet(src=ether_atob("00:01:02:03:04:05"),
+                    dst=ether_atob("00:01:02:03:04:06")) / \
+           ipv4(ttl=64, id=id, src=inet_atol("10.0.0.1"),
+                dst=inet_atol(dst)) / \
+           icmpv4(type=8) / icmpv4echo(id=12345, sequence=sequence) / \
+           payload(payload="foobar")
+
+def datagram(sport = 1, src = 1):
+    """Return a UDP datagram chain."""
+    return ethernet(type=0x800) / ipv4(src=src, dst=2, protocol=17) / \
+           udp(sport=sport, dport=7) / payload(payload="hello")
+
+class templateTestCase(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_echo(self):
+        """Stamped echo requests are the same as fixed up ones."""
+        template = echo().template(["ipv4.id", "icmpv4echo.sequence"])
+        for n in xrange(200):
+            id = random.randrange(65536)
+            sequence = random.randrange(65536)
+            chain = echo(id, sequence)
+            chain.fixup()
+            self.assertEqual(template.stamp(id, sequence), chain.bytes)
+
+    def test_pseudo_header(self):
+        """The UDP checksum follows the IP source address."""
+        template = datagram().template(["udp.sport", "ipv4.src"])
+        for n in xrange(200):
+            sport = random.randrange(65536)
+            src = random.getrandbits(32)
+            chain = datagram(sport, src)
+            chain.fixup()
+            self.assertEqual(template.stamp(sport, src), chain.bytes)
+
+    def test_packet_variables(self):
+        """Variables may be given as packets and field names."""
+        chain = echo()
+        template = Template(chain, [(chain.packets[0], "dst"),
+                                    (chain.packets[1], "dst")])
+        mac = ether_atob("00:01:02:03:04:07")
+        stamped = template.stamp(mac, inet_atol("10.0.0.3"))
+        chain = echo(dst="10.0.0.3")
+        chain.packets[0].dst = mac
+        chain.fixup()
+        self.assertEqual(stamped, chain.bytes)
+        self.assertEqual(template.stamp_many([(mac, inet_atol("10.0.0.3"))]),
+                         [stamped])
+
+    def test_errors(self):
+        """Fields which change more than their own bytes and checksums
+        cannot be variables."""
+        self.assertRaises(TemplateError, echo().template, ["ipv4.length"])
+        self.assertRaises(TemplateError, echo().template, ["tcp.sport"])
+        self.assertRaises(TemplateError, echo().template, ["ipv4.options"])
+        template = echo().template(["ipv4.id"])
+        self.assertRaises(TypeError, template.stamp, 1, 2)
+
+if __name__ == '__main__':
+    unittest.main()